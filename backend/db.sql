@@ -44,7 +44,8 @@ CREATE TABLE excel_inputs (
     
     -- File information
     original_filename VARCHAR(255) NOT NULL,
-    file_hash VARCHAR(64) UNIQUE,
+    file_hash VARCHAR(64),
+    model_version VARCHAR(20),
     file_size_bytes BIGINT,
     
     -- Excel processing information
@@ -65,7 +66,8 @@ CREATE TABLE excel_inputs (
     FOREIGN KEY (user_id) REFERENCES users(id),
     INDEX idx_user_created (user_id, created_at),
     INDEX idx_status (status),
-    INDEX idx_file_hash (file_hash)
+    INDEX idx_file_hash (file_hash),
+    UNIQUE KEY uq_user_file_model (user_id, file_hash, model_version)
 ); 
 
 
@@ -114,3 +116,29 @@ CREATE TABLE users (
     updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     PRIMARY KEY (id)
 );
+
+
+-- Counter prediction_number per user (alokasi blok nomor secara atomik)
+CREATE TABLE prediction_counters (
+    user_id INT PRIMARY KEY,
+    last_number BIGINT NOT NULL DEFAULT 0,
+    FOREIGN KEY (user_id) REFERENCES users(id)
+);
+
+
+-- Summary per user (total, waktu terakhir) dan jumlah per label, dipelihara inkremental
+CREATE TABLE prediction_summaries (
+    user_id INT PRIMARY KEY,
+    total_count BIGINT NOT NULL DEFAULT 0,
+    last_prediction_at DATETIME NULL,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users(id)
+);
+
+CREATE TABLE prediction_label_counts (
+    user_id INT NOT NULL,
+    prediction VARCHAR(100) NOT NULL,
+    prediction_count BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, prediction),
+    FOREIGN KEY (user_id) REFERENCES users(id)
+);
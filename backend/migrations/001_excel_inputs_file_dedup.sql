@@ -0,0 +1,12 @@
+-- Migrasi: deduplikasi upload file berdasarkan hash isi file
+-- excel_inputs.file_hash tidak lagi UNIQUE global; upload unik per (user, hash, versi model)
+-- predictions.excel_input_id menautkan setiap hasil prediksi ke upload asalnya
+
+ALTER TABLE excel_inputs
+    DROP INDEX file_hash,
+    ADD COLUMN model_version VARCHAR(20) NULL AFTER file_hash,
+    ADD UNIQUE KEY uq_user_file_model (user_id, file_hash, model_version);
+
+ALTER TABLE predictions
+    ADD COLUMN excel_input_id INT NULL,
+    ADD INDEX idx_excel_input_number (excel_input_id, prediction_number);
@@ -0,0 +1,17 @@
+-- Migrasi: counter prediction_number per user
+-- Menggantikan SELECT MAX(prediction_number) + 1 sebelum setiap insert; blok nomor
+-- direservasi secara atomik dengan INSERT ... ON DUPLICATE KEY UPDATE LAST_INSERT_ID(...)
+
+CREATE TABLE IF NOT EXISTS prediction_counters (
+    user_id INT PRIMARY KEY,
+    last_number BIGINT NOT NULL DEFAULT 0,
+    FOREIGN KEY (user_id) REFERENCES users(id)
+);
+
+-- Seed dari history yang sudah ada
+INSERT INTO prediction_counters (user_id, last_number)
+SELECT user_id, COALESCE(MAX(prediction_number), 0)
+FROM predictions
+WHERE user_id IS NOT NULL
+GROUP BY user_id
+ON DUPLICATE KEY UPDATE last_number = GREATEST(last_number, VALUES(last_number));
@@ -0,0 +1,11 @@
+-- Migrasi: index komposit untuk history dengan keyset pagination
+-- GET /predictions/<user_id> mengurutkan ORDER BY created_at DESC, id DESC dan melanjutkan
+-- halaman dengan (created_at, id) < cursor; filter opsional prediction / quality_assessment
+-- / rentang tanggal memakai index dengan prefix yang sama sehingga tidak ada filesort.
+-- idx_user_number untuk lookup (user_id, prediction_number) dari writer write-behind.
+
+ALTER TABLE predictions
+    ADD INDEX idx_user_created_id (user_id, created_at, id),
+    ADD INDEX idx_user_prediction_created (user_id, prediction, created_at, id),
+    ADD INDEX idx_user_quality_created (user_id, quality_assessment, created_at, id),
+    ADD INDEX idx_user_number (user_id, prediction_number);
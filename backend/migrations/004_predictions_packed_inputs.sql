@@ -0,0 +1,7 @@
+-- Migrasi: P1-P30 disimpan sebagai blob float32 (30 x 4 byte little-endian) di inputs_packed
+-- menggantikan teks JSON di kolom inputs. Baris lama tetap memakai inputs (JSON) dan tetap
+-- terbaca; baris baru hanya mengisi inputs_packed sehingga inputs dibuat nullable.
+
+ALTER TABLE predictions
+    ADD COLUMN inputs_packed VARBINARY(120) NULL AFTER inputs,
+    MODIFY COLUMN inputs TEXT NULL;
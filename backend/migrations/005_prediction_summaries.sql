@@ -0,0 +1,35 @@
+-- Migrasi: summary per user yang dipelihara secara inkremental
+-- Setiap batch insert (dan hapus) memperbarui summary di transaksi yang sama, sehingga
+-- /predictions/count dan dashboard membaca satu baris, bukan COUNT(*) atas history user.
+-- Drift bisa diperiksa/diperbaiki dengan: flask --app app summaries [--user-id N] [--rebuild]
+
+CREATE TABLE IF NOT EXISTS prediction_summaries (
+    user_id INT PRIMARY KEY,
+    total_count BIGINT NOT NULL DEFAULT 0,
+    last_prediction_at DATETIME NULL,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users(id)
+);
+
+CREATE TABLE IF NOT EXISTS prediction_label_counts (
+    user_id INT NOT NULL,
+    prediction VARCHAR(100) NOT NULL,
+    prediction_count BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, prediction),
+    FOREIGN KEY (user_id) REFERENCES users(id)
+);
+
+-- Seed dari history yang sudah ada
+INSERT INTO prediction_summaries (user_id, total_count, last_prediction_at)
+SELECT user_id, COUNT(*), MAX(created_at)
+FROM predictions
+WHERE user_id IS NOT NULL
+GROUP BY user_id
+ON DUPLICATE KEY UPDATE total_count = VALUES(total_count), last_prediction_at = VALUES(last_prediction_at);
+
+INSERT INTO prediction_label_counts (user_id, prediction, prediction_count)
+SELECT user_id, prediction, COUNT(*)
+FROM predictions
+WHERE user_id IS NOT NULL AND prediction IS NOT NULL
+GROUP BY user_id, prediction
+ON DUPLICATE KEY UPDATE prediction_count = VALUES(prediction_count);
@@ -0,0 +1,88 @@
+-- Migrasi: partisi RANGE bulanan pada predictions.created_at
+-- History, count dan delete hanya menyentuh partisi yang relevan, dan retensi cukup
+-- meng-ARSIP + DROP PARTITION (metadata) alih-alih DELETE jutaan baris.
+-- Partisi dibuat relatif terhadap bulan saat migrasi dijalankan: semua data lama masuk
+-- p_legacy, lalu bulan berjalan + 3 bulan ke depan, lalu pmax. Partisi bulan berikutnya
+-- dipecah dari pmax oleh aplikasi (worker retensi di setiap proses Flask/gunicorn,
+-- setiap PREDICTION_RETENTION_INTERVAL detik, atau manual: flask --app app retention).
+--
+-- Syarat tabel InnoDB berpartisi: tidak ada foreign key, dan setiap unique key termasuk
+-- PRIMARY KEY harus memuat kolom partisi, sehingga PK menjadi (id, created_at).
+-- Migrasi ini MENGHAPUS SEMUA foreign key predictions (user_id -> users, excel_input_id ->
+-- excel_inputs). Penggantinya di aplikasi:
+--   - user diverifikasi sebelum prediksi disimpan (/predict dan pipeline /predict-file)
+--   - excel_input_id hanya diisi dari register_upload (baris excel_inputs milik user yang sama)
+--   - prediksi user dihapus lewat DELETE /predictions/all/<user_id> (termasuk arsip Parquet);
+--     hapus user di tabel users setelah job tersebut selesai
+-- Pemeriksaan baris yatim (seharusnya 0):
+--   SELECT COUNT(*) FROM predictions p LEFT JOIN users u ON u.id = p.user_id WHERE u.id IS NULL;
+
+DROP PROCEDURE IF EXISTS drop_predictions_foreign_keys;
+
+DELIMITER //
+CREATE PROCEDURE drop_predictions_foreign_keys()
+BEGIN
+    DECLARE done INT DEFAULT 0;
+    DECLARE fk_name VARCHAR(64);
+    DECLARE fk_cursor CURSOR FOR
+        SELECT CONSTRAINT_NAME
+        FROM information_schema.TABLE_CONSTRAINTS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'predictions' AND CONSTRAINT_TYPE = 'FOREIGN KEY';
+    DECLARE CONTINUE HANDLER FOR NOT FOUND SET done = 1;
+
+    OPEN fk_cursor;
+    drop_loop: LOOP
+        FETCH fk_cursor INTO fk_name;
+        IF done THEN
+            LEAVE drop_loop;
+        END IF;
+        SET @drop_fk_sql = CONCAT('ALTER TABLE predictions DROP FOREIGN KEY `', fk_name, '`');
+        PREPARE drop_fk_stmt FROM @drop_fk_sql;
+        EXECUTE drop_fk_stmt;
+        DEALLOCATE PREPARE drop_fk_stmt;
+    END LOOP;
+    CLOSE fk_cursor;
+END //
+DELIMITER ;
+
+CALL drop_predictions_foreign_keys();
+DROP PROCEDURE drop_predictions_foreign_keys;
+
+UPDATE predictions SET created_at = NOW() WHERE created_at IS NULL;
+
+ALTER TABLE predictions
+    MODIFY COLUMN created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    DROP PRIMARY KEY,
+    ADD PRIMARY KEY (id, created_at);
+
+-- Batas partisi harus literal, jadi DDL dirangkai dari tanggal hari ini lalu dijalankan sebagai prepared statement
+DROP PROCEDURE IF EXISTS partition_predictions;
+
+DELIMITER //
+CREATE PROCEDURE partition_predictions(IN premake_months INT)
+BEGIN
+    DECLARE month_start DATE DEFAULT DATE_FORMAT(CURDATE(), '%Y-%m-01');
+    DECLARE month_offset INT DEFAULT 0;
+
+    SET @partition_sql = CONCAT(
+        'ALTER TABLE predictions PARTITION BY RANGE (TO_DAYS(created_at)) (',
+        'PARTITION p_legacy VALUES LESS THAN (TO_DAYS(''', month_start, '''))'
+    );
+    WHILE month_offset <= premake_months DO
+        SET @partition_sql = CONCAT(
+            @partition_sql,
+            ', PARTITION p', DATE_FORMAT(DATE_ADD(month_start, INTERVAL month_offset MONTH), '%Y%m'),
+            ' VALUES LESS THAN (TO_DAYS(''', DATE_ADD(month_start, INTERVAL month_offset + 1 MONTH), '''))'
+        );
+        SET month_offset = month_offset + 1;
+    END WHILE;
+    SET @partition_sql = CONCAT(@partition_sql, ', PARTITION pmax VALUES LESS THAN MAXVALUE)');
+
+    PREPARE partition_stmt FROM @partition_sql;
+    EXECUTE partition_stmt;
+    DEALLOCATE PREPARE partition_stmt;
+END //
+DELIMITER ;
+
+CALL partition_predictions(3);
+DROP PROCEDURE partition_predictions;
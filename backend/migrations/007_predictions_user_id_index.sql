@@ -0,0 +1,8 @@
+-- Migrasi: index (user_id, id) untuk job penghapusan prediksi
+-- DELETE /predictions/all/<user_id> mengambil chunk dengan
+--   WHERE user_id = ? AND id <= ? ORDER BY id LIMIT ? FOR UPDATE
+-- Dengan index ini chunk dibaca berurutan dari index tanpa filesort, dan setiap chunk
+-- mengunci rentang id yang sama bila job diulang (urutan lock deterministik).
+
+ALTER TABLE predictions
+    ADD INDEX idx_user_id_id (user_id, id);
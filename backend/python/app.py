@@ -1,26 +1,132 @@
 # app.py - Flask ML Service dengan BATCH PROCESSING OPTIMIZATION + HISTORY ENDPOINT
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context, g, has_request_context
 from flask_cors import CORS
+import click
 import mysql.connector
-from mysql.connector import pooling
 import numpy as np
 import pandas as pd
+import openpyxl
 from catboost import CatBoostClassifier
 import os
 import json
+import base64
+import logging
+import logging.handlers
+import contextvars
+import csv
 import joblib
-from datetime import datetime
-import traceback
+from datetime import datetime, timedelta
 import time
 import threading
+import queue
+import atexit
+import signal
+import sys
 from concurrent.futures import ThreadPoolExecutor
 import re
 import hashlib
-from multiprocessing import Pool, cpu_count
+import itertools
+from collections import OrderedDict
+from contextlib import contextmanager
+import tempfile
+import uuid
+import multiprocessing
+from multiprocessing import cpu_count
+
+try:
+    import fcntl
+except ImportError:  # Windows (dev XAMPP): satu proses, kunci antarproses tidak diperlukan
+    fcntl = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+    import pyarrow.csv as pacsv
+except ImportError:  # arsip Parquet dan reader CSV pyarrow opsional
+    pa = pc = pq = pacsv = None
 
 app = Flask(__name__)
 CORS(app)
 
+# Logging: level dari LOG_LEVEL, output teks atau JSON (LOG_FORMAT). Record dikirim lewat
+# QueueHandler dan ditulis ke stdout oleh thread listener, sehingga request tidak menunggu stdout.
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+LOG_FORMAT = os.environ.get('LOG_FORMAT', 'text')  # text | json
+LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', 10000))  # record di atas ini dibuang, tidak memblokir
+LOG_SAMPLE_EVERY = int(os.environ.get('LOG_SAMPLE_EVERY', 100))  # pesan frekuensi tinggi: 1 dari N
+LOG_SAMPLED = {'sample_every': LOG_SAMPLE_EVERY}  # extra= untuk pesan yang disampling
+logger = logging.getLogger('optipredict')
+request_id_var = contextvars.ContextVar('request_id', default='-')
+log_state = {'listener': None, 'dropped': 0}
+log_sample_counters = {}  # template pesan -> itertools.count
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler yang tidak memformat record di thread pemanggil dan tidak pernah memblokir:
+    record dibuang (dan dihitung) jika antrian penuh
+    """
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            log_state['dropped'] += 1
+
+class LogContextFilter(logging.Filter):
+    """
+    Sampling record bertanda sample_every (per template pesan) dan request_id untuk korelasi
+    """
+    def filter(self, record):
+        every = getattr(record, 'sample_every', 0)
+        if every > 1 and next(log_sample_counters.setdefault(record.msg, itertools.count())) % every:
+            return False
+        record.request_id = request_id_var.get()
+        return True
+
+class JsonLogFormatter(logging.Formatter):
+    def format(self, record):
+        payload = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+            'request_id': getattr(record, 'request_id', '-'),
+            'thread': record.threadName
+        }
+        if record.exc_info:
+            payload['exc'] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+def setup_logging():
+    """
+    Pasang QueueHandler + QueueListener (stdout) pada logger 'optipredict'; aman dipanggil ulang.
+    Listener di-flush saat exit (atexit) setelah hook lain yang masih menulis log.
+    """
+    if log_state['listener']:
+        return
+    stream_handler = logging.StreamHandler(sys.stdout)
+    if LOG_FORMAT == 'json':
+        stream_handler.setFormatter(JsonLogFormatter())
+    else:
+        stream_handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s [%(request_id)s] %(message)s'))
+
+    log_queue = queue.Queue(LOG_QUEUE_SIZE)
+    queue_handler = NonBlockingQueueHandler(log_queue)
+    queue_handler.addFilter(LogContextFilter())
+    logger.addHandler(queue_handler)
+    logger.setLevel(LOG_LEVEL)
+    logger.propagate = False
+
+    listener = logging.handlers.QueueListener(log_queue, stream_handler)
+    listener.start()
+    log_state['listener'] = listener
+    atexit.register(listener.stop)
+
+setup_logging()
+
 # Konfigurasi Database dengan Connection Pool untuk XAMPP MySQL
 DB_CONFIG = {
     'host': 'localhost',
@@ -28,9 +134,6 @@ DB_CONFIG = {
     'user': 'root',
     'password': '',
     'database': 'optipredict_database',
-    'pool_name': 'mypool',
-    'pool_size': 5,  # PERBAIKAN: Increased pool size
-    'pool_reset_session': True,
     'autocommit': True,
     'connect_timeout': 30,
     'sql_mode': '',
@@ -38,12 +141,45 @@ DB_CONFIG = {
     'use_unicode': True,
     'connection_timeout': 30,
     'read_timeout': 60,
-    'write_timeout': 60
+    'write_timeout': 60,
+    'allow_local_infile': False
 }
 
+# PERBAIKAN: Pool koneksi dikelola sendiri (lihat acquire_pool_connection)
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))  # maksimum koneksi terbuka per proses
+DB_POOL_WAIT_TIMEOUT = float(os.environ.get('DB_POOL_WAIT_TIMEOUT', 5))  # detik menunggu koneksi bebas
+DB_POOL_MAX_WAITERS = int(os.environ.get('DB_POOL_MAX_WAITERS', 64))  # di atas ini checkout langsung ditolak
+DB_POOL_PING_INTERVAL = float(os.environ.get('DB_POOL_PING_INTERVAL', 30))  # ping hanya jika menganggur selama ini
+
+# Konfigurasi bulk insert predictions
+BULK_INSERT_BACKEND = os.environ.get('BULK_INSERT_BACKEND', 'multirow')  # multirow | executemany | auto | load_data
+# LOAD DATA LOCAL INFILE (opt-in lewat auto/load_data) hanya boleh membaca file dari direktori khusus ini
+LOAD_DATA_TEMP_DIR = os.path.realpath(os.environ.get(
+    'LOAD_DATA_TEMP_DIR', os.path.join(tempfile.gettempdir(), 'optipredict_load_data')
+))
+if BULK_INSERT_BACKEND in ('auto', 'load_data'):
+    DB_CONFIG['allow_local_infile_in_path'] = LOAD_DATA_TEMP_DIR  # server juga harus local_infile=ON
+BULK_INSERT_ROWS = int(os.environ.get('BULK_INSERT_ROWS', 2000))  # baris per statement multi-row
+BULK_INSERT_SINGLE_TRANSACTION = os.environ.get('BULK_INSERT_SINGLE_TRANSACTION', '1') == '1'
+LOAD_DATA_DISABLED_ERRNOS = (1148, 2068, 3948)  # LOAD DATA LOCAL ditolak client/server
+ER_NO_SUCH_TABLE = 1146
+PREDICTION_INSERT_COLUMNS = (
+    'user_id', 'prediction_number', 'snr', 'snr_normalized', 'inputs_packed',
+    'prediction', 'confidence', 'quality_assessment', 'input_type',
+    'model_version', 'created_at'
+)
+BINARY_INSERT_COLUMNS = ('inputs_packed',)  # dikirim sebagai hex di LOAD DATA
+INPUT_FEATURE_COUNT = 30
+PACKED_INPUTS_DTYPE = np.dtype('<f4')  # P1-P30 disimpan sebagai 30 x float32 little-endian (120 byte)
+FLOAT32_SIGNIFICANT_DIGITS = 7  # presisi desimal float32 saat inputs di-decode untuk response
+PARAMETER_KEYS = [f'P{i + 1}' for i in range(INPUT_FEATURE_COUNT)]
+FILE_FEATURE_COLUMNS = ['snr'] + [f'p{i + 1}' for i in range(INPUT_FEATURE_COUNT)]  # header file ternormalisasi
+load_data_available = True
+
 # Path model dan scaler
 MODEL_PATH = os.path.join(os.path.dirname(__file__), 'catboost_model_2.cbm')
 SNR_SCALER_PATH = os.path.join(os.path.dirname(__file__), 'snr_minmax_scaler_untuk_prediksi.pkl')
+MODEL_VERSION = '2.0'
 
 # Label prediksi
 PREDICTION_LABELS = {
@@ -59,513 +195,3865 @@ PREDICTION_LABELS = {
 
 model = None
 snr_scaler = None
-executor = ThreadPoolExecutor(max_workers=4)  # PERBAIKAN: Increased workers
-connection_pool = None
+snr_transform = None  # parameter MinMaxScaler yang sudah diekstrak (lihat build_snr_transform)
+snr_transform_state = {'status': 'not_loaded', 'max_abs_diff': None}
+SNR_TRANSFORM_PARITY_ROWS = 1000
+SNR_TRANSFORM_PARITY_TOLERANCE = 1e-6
+
+# Konfigurasi inference engine: matriks besar dipecah per shard dan diprediksi paralel
+INFERENCE_BACKEND = os.environ.get('INFERENCE_BACKEND', 'thread')  # thread | process | serial
+INFERENCE_WORKERS = int(os.environ.get('INFERENCE_WORKERS', 0))  # 0 = ikuti kuota CPU container
+INFERENCE_MIN_SHARD_ROWS = int(os.environ.get('INFERENCE_MIN_SHARD_ROWS', 1000))
+CATBOOST_THREADS_PER_SHARD = int(os.environ.get('CATBOOST_THREADS_PER_SHARD', 1))
+# Worker process tidak di-fork dari proses yang sudah punya thread (deadlock lock warisan): spawn | forkserver
+INFERENCE_PROCESS_START_METHOD = os.environ.get('INFERENCE_PROCESS_START_METHOD', 'spawn')
+# Engine evaluasi (opt-in): 'compiled' = evaluator NumPy dari ekspor oblivious trees (tanpa overhead Pool CatBoost)
+INFERENCE_ENGINE = os.environ.get('INFERENCE_ENGINE', 'catboost')  # catboost | auto | compiled
+COMPILED_MODEL_MAX_ROWS = int(os.environ.get('COMPILED_MODEL_MAX_ROWS', 8))  # auto: batch <= ini lewat evaluator NumPy
+COMPILED_MODEL_BLOCK_BYTES = 16 * 1024 * 1024  # batas buffer gather leaf per blok baris
+COMPILED_MODEL_PARITY_ROWS = int(os.environ.get('COMPILED_MODEL_PARITY_ROWS', 2000))
+COMPILED_MODEL_PARITY_TOLERANCE = 1e-6  # selisih probabilitas maksimum terhadap predict_proba
+# Hasil kompilasi disimpan sebagai .npz per fingerprint model: ekspor JSON (besar) hanya sekali per file model
+COMPILED_MODEL_CACHE_DIR = os.environ.get(
+    'COMPILED_MODEL_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'compiled_model_cache')
+)
+COMPILED_MODEL_FORMAT = 1  # naikkan jika susunan array hasil compile_catboost_model berubah
+compiled_model = None
+compiled_model_state = {'status': 'not_loaded', 'source': None, 'parity': None, 'error': None}
+inference_executor = None
+inference_process_pool = None
+inference_pool_fingerprint = None  # fingerprint model yang dimuat worker process_pool
+inference_lock = threading.Lock()
+
+# Cache hasil prediksi: hash(model version + vektor fitur) -> (label, confidence, snr_normalized)
+PREDICTION_CACHE_ENABLED = os.environ.get('PREDICTION_CACHE_ENABLED', '1') == '1'
+PREDICTION_CACHE_MAX_BYTES = int(os.environ.get('PREDICTION_CACHE_MAX_MB', 64)) * 1024 * 1024
+PREDICTION_CACHE_TTL = int(os.environ.get('PREDICTION_CACHE_TTL', 3600))  # detik
+# Hashing per baris hanya sepadan untuk batch kecil (/predict, micro-batch); chunk /predict-file langsung ke model
+PREDICTION_CACHE_MAX_BATCH_ROWS = int(os.environ.get('PREDICTION_CACHE_MAX_BATCH_ROWS', 256))
+PREDICTION_CACHE_ENTRY_BYTES = 320  # perkiraan memori per entry (key 16 byte + tuple + node OrderedDict)
+prediction_cache = OrderedDict()
+prediction_cache_lock = threading.Lock()
+prediction_cache_stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0, 'invalidations': 0}
+model_fingerprint = b''
+
+# Micro-batching untuk /predict: request yang datang bersamaan diprediksi dalam satu panggilan.
+# Default nonaktif: worker sync gunicorn hanya melayani satu request sekaligus sehingga tidak ada
+# yang bisa digabung; gunicorn.conf.py mengaktifkannya untuk worker gthread (threads > 1).
+MICROBATCH_ENABLED = os.environ.get('MICROBATCH_ENABLED', '0') == '1'
+MICROBATCH_MAX_WAIT_MS = float(os.environ.get('MICROBATCH_MAX_WAIT_MS', 2))
+MICROBATCH_MAX_SIZE = int(os.environ.get('MICROBATCH_MAX_SIZE', 64))
+MICROBATCH_RESULT_TIMEOUT = float(os.environ.get('MICROBATCH_RESULT_TIMEOUT', 30))  # detik
+microbatch_queue = queue.Queue()
+microbatch_thread = None
+microbatch_lock = threading.Lock()
+microbatch_stats = {'batches': 0, 'items': 0, 'max_batch_size': 0}
+
+# Write-behind: prediksi disimpan ke MySQL oleh writer thread, response tidak menunggu database
+WRITE_BEHIND_ENABLED = os.environ.get('WRITE_BEHIND_ENABLED', '0') == '1'  # opt-in
+WRITE_BEHIND_WRITERS = int(os.environ.get('WRITE_BEHIND_WRITERS', 2))
+WRITE_BEHIND_MAX_PENDING_ROWS = int(os.environ.get('WRITE_BEHIND_MAX_PENDING_ROWS', 20000))  # lebih dari ini langsung ke journal
+WRITE_BEHIND_BATCH_ROWS = int(os.environ.get('WRITE_BEHIND_BATCH_ROWS', 5000))
+WRITE_BEHIND_MAX_WAIT_MS = float(os.environ.get('WRITE_BEHIND_MAX_WAIT_MS', 50))
+WRITE_BEHIND_MAX_RETRIES = int(os.environ.get('WRITE_BEHIND_MAX_RETRIES', 3))
+WRITE_BEHIND_RETRY_BACKOFF = float(os.environ.get('WRITE_BEHIND_RETRY_BACKOFF', 0.5))  # detik, dikali 2 setiap percobaan
+WRITE_BEHIND_ACK_TIMEOUT_MS = float(os.environ.get('WRITE_BEHIND_ACK_TIMEOUT_MS', 250))  # /predict menunggu id selama ini
+WRITE_BEHIND_REPLAY_INTERVAL = int(os.environ.get('WRITE_BEHIND_REPLAY_INTERVAL', 30))  # detik
+WRITE_BEHIND_SHUTDOWN_TIMEOUT = float(os.environ.get('WRITE_BEHIND_SHUTDOWN_TIMEOUT', 30))  # detik
+WRITE_BEHIND_JOURNAL_DIR = os.environ.get(
+    'WRITE_BEHIND_JOURNAL_DIR', os.path.join(os.path.dirname(__file__), 'write_behind_journal')
+)
+write_behind_queues = []
+write_behind_threads = []
+write_behind_lock = threading.Lock()
+write_behind_journal_lock = threading.Lock()
+write_behind_state = {'pending_rows': 0, 'stopping': False, 'last_replay': 0.0, 'shutdown_registered': False}
+write_behind_uploads = {}  # excel_input_id -> baris yang belum tersimpan (termasuk di journal) + status akhir yang menunggu
+background_services_state = {'pid': None}
+write_behind_stats = {
+    'enqueued_rows': 0, 'written_rows': 0, 'batches': 0, 'retries': 0,
+    'journaled_rows': 0, 'replayed_rows': 0, 'lost_rows': 0
+}
+executor = ThreadPoolExecutor(max_workers=int(os.environ.get('JOB_WORKERS', 4)))  # PERBAIKAN: Increased workers
+db_pool_cond = threading.Condition()
+db_pool_state = {'initialized': False, 'idle': [], 'size': 0, 'in_use': 0, 'waiters': 0}  # idle: [(conn, last_used)]
+db_pool_stats = {
+    'checkouts': 0, 'request_reuses': 0, 'wait_seconds_total': 0.0, 'wait_seconds_max': 0.0,
+    'max_waiters': 0, 'timeouts': 0, 'rejected': 0, 'created': 0, 'discarded': 0, 'pings': 0
+}
+
+# Job store untuk mode asinkron /predict-file: status (<job_id>.job.json) dan hasil per blok
+# (<job_id>.results.ndjson) disimpan di JOB_UPLOAD_DIR sehingga worker gunicorn mana pun bisa
+# menjawab polling; memori proses hanya memegang job yang sedang berjalan di proses itu
+JOB_UPLOAD_DIR = os.environ.get('JOB_UPLOAD_DIR', os.path.join(tempfile.gettempdir(), 'optipredict_jobs'))
+MAX_PENDING_JOBS = int(os.environ.get('MAX_PENDING_JOBS', 16))
+JOB_RESULT_TTL = int(os.environ.get('JOB_RESULT_TTL', 3600))  # detik
+JOB_STATE_WRITE_INTERVAL = float(os.environ.get('JOB_STATE_WRITE_INTERVAL', 0.5))  # detik antar tulis progress
+JSON_NON_FINITE_PATTERN = re.compile(r'(?<=[\[:,\s])(-?Infinity|NaN)(?=\s*[,\]}])')  # NaN/Infinity dari json.dumps
+FILE_DEDUP_ENABLED = os.environ.get('FILE_DEDUP_ENABLED', '1') == '1'
+FILE_DEDUP_STALE_SECONDS = int(os.environ.get('FILE_DEDUP_STALE_SECONDS', 6 * 3600))
+UPLOAD_HASH_BLOCK_SIZE = 1024 * 1024
+FILE_CHUNK_SIZE = int(os.environ.get('FILE_CHUNK_SIZE', 20000))  # baris per chunk saat membaca file
+CSV_READER_ENGINE = os.environ.get('CSV_READER_ENGINE', 'auto')  # auto (pyarrow jika terpasang) | pandas
+CSV_HEADER_PEEK_BYTES = 64 * 1024  # sampel awal file untuk header dan perkiraan byte per baris
+CSV_MIN_BLOCK_BYTES = 1024 * 1024
+CSV_MAX_BLOCK_BYTES = 64 * 1024 * 1024
+NDJSON_MIMETYPE = 'application/x-ndjson'
+RESULT_FORMATS = ('rows', 'columnar')
+RESULT_COLUMNS = ('row', 'prediction', 'confidence', 'snr_raw', 'snr_normalized')
+NDJSON_BLOCK_ROWS = int(os.environ.get('NDJSON_BLOCK_ROWS', 1000))  # baris per baris NDJSON
+HISTORY_DEFAULT_LIMIT = 100
+ANALYTICS_CONFIDENCE_BIN = 10  # lebar bin histogram confidence (persen)
+ANALYTICS_SNR_BIN = 1.0  # lebar bin histogram SNR (dB)
+HISTORY_MAX_LIMIT = int(os.environ.get('HISTORY_MAX_LIMIT', 1000))
+QUALITY_LEVELS = ('High', 'Medium', 'Low')
+PIPELINE_STAGES = ['file_read', 'preprocessing', 'prediction', 'formatting', 'database']
+
+# Metrik untuk /metrics (format Prometheus): name -> (type, help, buckets histogram)
+METRICS_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+METRICS_THROUGHPUT_BUCKETS = (100, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000, 250000, 500000)
+METRIC_DEFINITIONS = {
+    'optipredict_http_request_duration_seconds': ('histogram', 'Latensi request HTTP per rute', METRICS_LATENCY_BUCKETS),
+    'optipredict_http_requests_total': ('counter', 'Jumlah request HTTP per rute dan status', None),
+    'optipredict_stage_duration_seconds': ('histogram', 'Durasi tiap tahap /predict dan /predict-file', METRICS_LATENCY_BUCKETS),
+    'optipredict_rows_processed_total': ('counter', 'Jumlah baris yang diprediksi per endpoint', None),
+    'optipredict_throughput_rows_per_second': ('histogram', 'Throughput baris per detik per file', METRICS_THROUGHPUT_BUCKETS),
+    'optipredict_inference_duration_seconds': ('histogram', 'Latensi satu panggilan inference model', METRICS_LATENCY_BUCKETS),
+    'optipredict_inference_rows_total': ('counter', 'Jumlah baris yang masuk inference model (cache miss)', None),
+    'optipredict_db_pool_wait_seconds': ('histogram', 'Waktu tunggu checkout koneksi pool', METRICS_LATENCY_BUCKETS),
+    'optipredict_db_pool_connections': ('gauge', 'Koneksi pool per state', None),
+    'optipredict_db_pool_max_connections': ('gauge', 'Ukuran maksimum pool (DB_POOL_SIZE)', None),
+    'optipredict_db_pool_waiters': ('gauge', 'Thread yang sedang menunggu koneksi pool', None),
+    'optipredict_db_pool_timeouts_total': ('counter', 'Checkout pool yang timeout', None),
+    'optipredict_db_pool_rejected_total': ('counter', 'Checkout pool yang ditolak karena antrian penuh', None),
+    'optipredict_prediction_cache_lookups_total': ('counter', 'Lookup prediction cache per hasil', None),
+    'optipredict_prediction_cache_hit_ratio': ('gauge', 'Rasio hit prediction cache sejak start', None),
+    'optipredict_prediction_cache_entries': ('gauge', 'Jumlah entry prediction cache', None),
+    'optipredict_write_behind_pending_rows': ('gauge', 'Baris yang menunggu ditulis writer write-behind', None),
+    'optipredict_write_behind_journaled_rows_total': ('counter', 'Baris write-behind yang masuk journal disk', None),
+    'optipredict_microbatch_items_total': ('counter', 'Request /predict yang diproses micro-batcher', None),
+    'optipredict_microbatch_batches_total': ('counter', 'Batch yang dijalankan micro-batcher', None),
+    'optipredict_model_loaded': ('gauge', '1 jika model dan scaler sudah dimuat', None)
+}
+metrics_lock = threading.Lock()
+metrics_histograms = {}  # (name, labels) -> {'buckets', 'sum', 'count'}
+metrics_counters = {}  # (name, labels) -> nilai
+DELETE_CHUNK_ROWS = int(os.environ.get('DELETE_CHUNK_ROWS', 5000))  # baris per transaksi DELETE
+DELETE_CHUNK_PAUSE_MS = int(os.environ.get('DELETE_CHUNK_PAUSE_MS', 50))  # jeda antar chunk (throttling)
+# Executor terpisah dari job predict-file agar penghapusan tidak mengantre di belakang upload besar
+delete_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get('DELETE_JOB_WORKERS', 2)), thread_name_prefix='delete-job'
+)
+jobs = {}  # job /predict-file yang sedang antre/berjalan di proses ini
+jobs_lock = threading.Lock()
+job_state_written = {}  # job_id -> waktu status terakhir ditulis ke disk
+delete_jobs = {}  # job penghapusan yang sedang antre/berjalan di proses ini (status di <job_id>.delete.json)
+delete_jobs_lock = threading.Lock()
+# Job hapus aktif yang tidak diperbarui selama ini dianggap mati (worker-nya berhenti)
+DELETE_JOB_STALE_SECONDS = int(os.environ.get('DELETE_JOB_STALE_SECONDS', 600))
+
+# Partisi bulanan predictions (migrasi 006) dan retensi: partisi yang lebih tua dari
+# PREDICTION_RETENTION_MONTHS diarsipkan ke Parquet lalu di-DROP dari MySQL
+# Default aktif hanya jika pyarrow terpasang (arsip Parquet membutuhkannya); 0 = nonaktif
+PREDICTION_RETENTION_MONTHS = int(os.environ.get('PREDICTION_RETENTION_MONTHS', 12 if pq is not None else 0))
+PREDICTION_RETENTION_INTERVAL = int(os.environ.get('PREDICTION_RETENTION_INTERVAL', 24 * 3600))  # detik, 0 = hanya CLI
+PREDICTION_PARTITION_PREMAKE_MONTHS = int(os.environ.get('PREDICTION_PARTITION_PREMAKE_MONTHS', 3))
+PREDICTION_ARCHIVE_DIR = os.environ.get(
+    'PREDICTION_ARCHIVE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'prediction_archive')
+)
+PREDICTION_ARCHIVE_COMPRESSION = os.environ.get('PREDICTION_ARCHIVE_COMPRESSION', 'zstd')
+PREDICTION_ARCHIVE_FETCH_ROWS = int(os.environ.get('PREDICTION_ARCHIVE_FETCH_ROWS', 50000))  # baris per row group
+PREDICTION_ARCHIVE_COLUMNS = (
+    'id', 'user_id', 'prediction_number', 'snr', 'snr_normalized', 'inputs', 'inputs_packed',
+    'prediction', 'confidence', 'quality_assessment', 'input_type', 'model_version',
+    'created_at', 'excel_input_id'
+)
+RETENTION_LOCK_NAME = 'optipredict_prediction_retention'
+prediction_archive_lock = threading.Lock()
+retention_state = {'thread': None, 'last_run': None, 'last_result': None}
 
 def init_connection_pool():
-    global connection_pool
+    """
+    Aktifkan pool (koneksi dibuat lazily sampai DB_POOL_SIZE) dan uji satu koneksi
+    """
+    db_pool_state['initialized'] = True
     try:
-        connection_pool = pooling.MySQLConnectionPool(**DB_CONFIG)
-        print("✅ MySQL connection pool initialized successfully for XAMPP")
+        release_pool_connection(acquire_pool_connection())
+        logger.info("✅ MySQL connection pool initialized successfully for XAMPP (max %s connections)", DB_POOL_SIZE)
         return True
     except Exception as e:
-        print(f"❌ Error initializing connection pool: {e}")
-        print("⚠️ Pastikan XAMPP MySQL sudah berjalan di port 3306")
+        logger.error("❌ Error initializing connection pool: %s", e)
+        logger.warning("⚠️ Pastikan XAMPP MySQL sudah berjalan di port 3306")
         return False
 
 def load_model_and_scaler():
-    global model, snr_scaler
+    global model, snr_scaler, model_fingerprint
     try:
-        print("🔄 Loading CatBoost model and SNR scaler...")
+        logger.info("🔄 Loading CatBoost model and SNR scaler...")
         if os.path.exists(MODEL_PATH):
             model = CatBoostClassifier()
             model.load_model(MODEL_PATH)
-            print(f"✅ Model '{MODEL_PATH}' berhasil dimuat.")
+            model_stat = os.stat(MODEL_PATH)
+            model_fingerprint = hashlib.blake2b(
+                f"{MODEL_VERSION}:{model_stat.st_size}:{model_stat.st_mtime_ns}".encode(), digest_size=32
+            ).digest()
+            invalidate_prediction_cache()
+            logger.info("✅ Model '%s' berhasil dimuat.", MODEL_PATH)
+            prepare_compiled_model()
         else:
-            print(f"❌ File model '{MODEL_PATH}' tidak ditemukan!")
+            logger.error("❌ File model '%s' tidak ditemukan!", MODEL_PATH)
             return False
         if os.path.exists(SNR_SCALER_PATH):
             snr_scaler = joblib.load(SNR_SCALER_PATH)
-            print(f"✅ Scaler SNR '{SNR_SCALER_PATH}' berhasil dimuat.")
+            logger.info("✅ Scaler SNR '%s' berhasil dimuat.", SNR_SCALER_PATH)
+            prepare_snr_transform()
         else:
-            print(f"❌ File scaler SNR '{SNR_SCALER_PATH}' tidak ditemukan!")
+            logger.error("❌ File scaler SNR '%s' tidak ditemukan!", SNR_SCALER_PATH)
             return False
         return True
     except Exception as e:
-        print(f"❌ Error loading model/scaler: {e}")
-        traceback.print_exc()
+        logger.exception("❌ Error loading model/scaler: %s", e)
         return False
 
-# PERBAIKAN: Optimized batch prediction function
-def predict_batch_optimized(model, snr_scaler, snr_values, inputs_matrix):
+def build_snr_transform(scaler):
     """
-    Optimized batch prediction using vectorized operations
+    Ambil parameter MinMaxScaler (scale_, min_, clip) sekali saat load agar normalisasi
+    SNR cukup `x * scale + min` in-place, tanpa validasi sklearn di setiap request.
+    scale/min tetap array float64 (1,) seperti di sklearn sehingga hasil float32-nya identik.
+    """
+    if not all(hasattr(scaler, attr) for attr in ('scale_', 'min_', 'feature_range')):
+        raise ValueError(f'{type(scaler).__name__} bukan MinMaxScaler yang sudah di-fit')
+    if np.shape(scaler.scale_) != (1,):
+        raise ValueError(f'Scaler SNR harus 1 fitur, bukan {np.shape(scaler.scale_)}')
+    return {
+        'scaler': scaler,
+        'scale': np.asarray(scaler.scale_, dtype=np.float64),
+        'min': np.asarray(scaler.min_, dtype=np.float64),
+        'clip': tuple(scaler.feature_range) if getattr(scaler, 'clip', False) else None
+    }
+
+def apply_snr_transform(transform, snr_column):
     """
+    Normalisasi in-place kolom SNR (view float32 dari matriks fitur)
+    """
+    snr_column *= transform['scale']
+    snr_column += transform['min']
+    if transform['clip']:
+        np.clip(snr_column, transform['clip'][0], transform['clip'][1], out=snr_column)
+
+def check_snr_transform_parity(scaler, transform):
+    """
+    Bandingkan transform hasil ekstraksi dengan scaler.transform pada rentang data fit ± 50%
+    """
+    data_min = float(getattr(scaler, 'data_min_', [0.0])[0])
+    data_max = float(getattr(scaler, 'data_max_', [1.0])[0])
+    margin = max(data_max - data_min, 1.0) * 0.5
+    sample = np.linspace(data_min - margin, data_max + margin, SNR_TRANSFORM_PARITY_ROWS, dtype=np.float32)
+    expected = scaler.transform(sample.reshape(-1, 1)).ravel()
+    actual = sample.copy()
+    apply_snr_transform(transform, actual)
+    return float(np.abs(actual.astype(np.float64) - expected).max())
+
+def prepare_snr_transform():
+    """
+    Siapkan snr_transform dari scaler global; jika scaler bukan MinMaxScaler atau hasilnya
+    berbeda dari sklearn, normalisasi tetap lewat snr_scaler.transform
+    """
+    global snr_transform
+    snr_transform = None
     try:
-        start_time = time.time()
-        
-        # Convert to numpy arrays for faster processing
-        snr_array = np.array(snr_values, dtype=np.float32).reshape(-1, 1)
-        inputs_array = np.array(inputs_matrix, dtype=np.float32)
-        
-        print(f"📊 Processing batch of {len(snr_values)} samples...")
-        
-        # PERBAIKAN: Vectorized SNR normalization
-        snr_normalized = snr_scaler.transform(snr_array).flatten()
-        
-        # PERBAIKAN: Combine features efficiently
-        features_matrix = np.column_stack([snr_normalized, inputs_array])
-        
-        print(f"📊 Features matrix shape: {features_matrix.shape}")
-        
-        # PERBAIKAN: Single batch prediction call
-        probabilities = model.predict_proba(features_matrix)
-        predicted_classes = np.argmax(probabilities, axis=1)
-        confidence_scores = np.max(probabilities, axis=1)
-        
-        # PERBAIKAN: Vectorized label mapping
-        predictions = [PREDICTION_LABELS.get(cls, "Unknown") for cls in predicted_classes]
-        confidences = confidence_scores * 100
-        
-        processing_time = time.time() - start_time
-        print(f"✅ Batch prediction completed in {processing_time:.2f} seconds")
-        
-        return predictions, confidences, snr_normalized
-        
+        transform = build_snr_transform(snr_scaler)
+        max_diff = check_snr_transform_parity(snr_scaler, transform)
+        if max_diff > SNR_TRANSFORM_PARITY_TOLERANCE:
+            snr_transform_state.update(status='parity_failed', max_abs_diff=max_diff)
+            logger.error("❌ Parity transform SNR gagal (max diff %.3g), normalisasi lewat sklearn", max_diff)
+            return
+        snr_transform = transform
+        snr_transform_state.update(status='ready', max_abs_diff=max_diff)
+        logger.info(
+            "✅ Transform SNR siap: x * %.6g + %.6g (parity max diff %.3g)",
+            transform['scale'][0], transform['min'][0], max_diff
+        )
     except Exception as e:
-        print(f"❌ Error in batch prediction: {e}")
-        traceback.print_exc()
-        return None, None, None
+        snr_transform_state.update(status='unsupported', max_abs_diff=None)
+        logger.warning("⚠️ Transform SNR tidak tersedia (%s), normalisasi lewat sklearn", e)
 
-# PERBAIKAN: Optimized database batch insert
-def batch_insert_predictions(user_id, predictions_data, batch_size=1000):
+def assemble_features(scaler, snr_values, inputs_matrix):
     """
-    Insert predictions in batches for better performance
+    Bangun matriks fitur float32 (N, 31) dalam satu buffer: SNR di kolom 0 dinormalisasi
+    in-place, P1-P30 disalin langsung ke kolom 1-30 (tanpa column_stack).
+    Mengembalikan (features_matrix, snr_normalized) dengan snr_normalized view kolom 0.
+    """
+    snr_values = np.asarray(snr_values)
+    features_matrix = np.empty((len(snr_values), INPUT_FEATURE_COUNT + 1), dtype=np.float32)
+    features_matrix[:, 0] = snr_values.reshape(-1)
+    features_matrix[:, 1:] = inputs_matrix
+    return features_matrix, normalize_snr_column(scaler, features_matrix)
+
+def normalize_snr_column(scaler, features_matrix):
+    """
+    Normalisasi in-place kolom SNR (kolom 0) matriks fitur float32; mengembalikan view kolom tersebut
+    """
+    if snr_transform is not None and snr_transform['scaler'] is scaler:
+        apply_snr_transform(snr_transform, features_matrix[:, 0])
+    else:
+        features_matrix[:, :1] = scaler.transform(features_matrix[:, :1])
+    return features_matrix[:, 0]
+
+def detect_cpu_quota():
+    """
+    Jumlah CPU efektif untuk proses ini: kuota cgroup v2 (cpu.max), cgroup v1
+    (cfs_quota_us / cfs_period_us), lalu CPU affinity sebagai fallback.
     """
-    conn = None
-    cursor = None
     try:
-        conn = get_db_connection()
-        if not conn:
-            return False
-        
-        cursor = conn.cursor()
-        
-        # PERBAIKAN: Prepare batch insert query
-        insert_query = """
-            INSERT INTO predictions (
-                user_id, prediction_number, snr, snr_normalized, inputs, 
-                prediction, confidence, quality_assessment, input_type, 
-                model_version, created_at
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """
-        
-        # Process in batches
-        total_inserted = 0
-        for i in range(0, len(predictions_data), batch_size):
-            batch = predictions_data[i:i + batch_size]
-            cursor.executemany(insert_query, batch)
-            conn.commit()
-            total_inserted += len(batch)
-            print(f"📊 Inserted batch {i//batch_size + 1}: {total_inserted}/{len(predictions_data)} records")
-        
-        print(f"✅ Successfully inserted {total_inserted} predictions")
-        return True
-        
-    except Exception as e:
-        print(f"❌ Error in batch insert: {e}")
-        return False
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()
+            if quota != 'max':
+                return max(1, int(quota) // int(period))
+    except (OSError, ValueError):
+        pass
+
+    try:
+        with open('/sys/fs/cgroup/cpu/cpu.cfs_quota_us') as f:
+            quota = int(f.read())
+        with open('/sys/fs/cgroup/cpu/cpu.cfs_period_us') as f:
+            period = int(f.read())
+        if quota > 0 and period > 0:
+            return max(1, quota // period)
+    except (OSError, ValueError):
+        pass
+
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return cpu_count()
+
+def get_inference_workers():
+    """
+    Jumlah worker inference; total thread CatBoost = workers x CATBOOST_THREADS_PER_SHARD
+    sehingga tidak melebihi kuota CPU walaupun banyak request berjalan bersamaan
+    """
+    if INFERENCE_WORKERS > 0:
+        return INFERENCE_WORKERS
+    return max(1, detect_cpu_quota() // max(1, CATBOOST_THREADS_PER_SHARD))
+
+def compile_catboost_model(cb_model):
+    """
+    Ekspor model CatBoost (JSON) ke array NumPy untuk evaluator oblivious trees.
+    Split disusun per level (D, T) sehingga bit setiap level bisa dihitung dengan satu
+    perbandingan vektor; tree yang lebih dangkal dipad dengan border +inf (bit selalu 0).
+    Hanya fitur float (tanpa fitur kategorikal/teks) dengan loss MultiClass atau Logloss.
+    """
+    fd, json_path = tempfile.mkstemp(prefix='catboost_model_', suffix='.json')
+    os.close(fd)
+    try:
+        cb_model.save_model(json_path, format='json')
+        with open(json_path) as json_file:
+            exported = json.load(json_file)
     finally:
-        close_db_connection(conn, cursor)
+        os.remove(json_path)
 
-def get_db_connection():
-    global connection_pool
-    conn = None
+    features_info = exported.get('features_info', {})
+    if any(features_info.get(kind) for kind in ('categorical_features', 'text_features', 'embedding_features')):
+        raise ValueError('Model memakai fitur non-float')
+    trees = exported.get('oblivious_trees')
+    if not trees:
+        raise ValueError('Model tidak berisi oblivious trees')
+
+    loss_function = exported['model_info'].get('params', {}).get('loss_function', {}).get('type')
+    if loss_function not in ('MultiClass', 'Logloss'):
+        raise ValueError(f'Loss function {loss_function} tidak didukung')
+
+    float_features = sorted(features_info['float_features'], key=lambda feature: feature['flat_feature_index'])
+    tree_count = len(trees)
+    depth = max(len(tree['splits']) for tree in trees)
+    dimension = len(trees[0]['leaf_values']) >> len(trees[0]['splits'])
+
+    split_features = np.zeros((depth, tree_count), dtype=np.intp)
+    split_borders = np.full((depth, tree_count), np.inf, dtype=np.float32)
+    leaf_values = np.zeros((tree_count, 1 << depth, dimension), dtype=np.float64)
+    for tree_index, tree in enumerate(trees):
+        for level, split in enumerate(tree['splits']):
+            if split.get('split_type') != 'FloatFeature':
+                raise ValueError(f"Split {split.get('split_type')} tidak didukung")
+            split_features[level, tree_index] = split['float_feature_index']
+            split_borders[level, tree_index] = split['border']
+        values = np.asarray(tree['leaf_values'], dtype=np.float64).reshape(-1, dimension)
+        leaf_values[tree_index, :len(values)] = values
+
+    scale, bias = exported.get('scale_and_bias', [1, [0.0] * dimension])
+    return {
+        'loss_function': loss_function,
+        'feature_count': len(float_features),
+        'tree_count': tree_count,
+        'depth': depth,
+        'split_features': split_features.ravel(),
+        'split_borders': split_borders.ravel(),
+        'level_weights': (2.0 ** np.arange(depth)).astype(np.float32),
+        'leaf_offsets': (np.arange(tree_count, dtype=np.intp) << depth)[:, None],
+        'leaf_values': leaf_values.reshape(-1, dimension),
+        'scale': float(scale),
+        'bias': np.asarray(bias, dtype=np.float64).reshape(dimension),
+        # NaN: AsTrue -> lebih besar dari semua border, selain itu lebih kecil
+        'nan_fill': np.array([
+            np.inf if feature.get('nan_value_treatment') == 'AsTrue' else -np.inf for feature in float_features
+        ], dtype=np.float32),
+        'block_rows': max(1, COMPILED_MODEL_BLOCK_BYTES // (tree_count * dimension * 8))
+    }
+
+def compiled_model_cache_path(fingerprint):
+    return os.path.join(
+        COMPILED_MODEL_CACHE_DIR, f'compiled_{fingerprint.hex()[:32]}_v{COMPILED_MODEL_FORMAT}.npz'
+    )
+
+def save_compiled_model(compiled, path):
+    """
+    Simpan hasil compile_catboost_model ke .npz (array NumPy + metadata JSON), atomik lewat rename.
+    Artefak fingerprint lain di direktori yang sama dihapus.
+    """
+    arrays = {key: value for key, value in compiled.items() if isinstance(value, np.ndarray)}
+    meta = {key: value for key, value in compiled.items() if not isinstance(value, np.ndarray)}
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(prefix='compiled_', suffix='.npz.tmp', dir=directory)
     try:
-        if connection_pool is None:
-            print("🔄 Initializing connection pool...")
-            init_connection_pool()
-        
-        if connection_pool:
-            conn = connection_pool.get_connection()
-            if conn and conn.is_connected():
-                print("✅ Database connection successful from pool (XAMPP)")
-                return conn
-            else:
-                print("❌ Connection from pool is not active")
-                if conn:
-                    try:
-                        conn.close()
-                    except:
-                        pass
-                return None
-        else:
-            print("❌ Connection pool is None")
-            return None
-            
-    except Exception as e:
-        print(f"❌ Error getting connection from pool: {e}")
-        if conn:
+        with os.fdopen(fd, 'wb') as cache_file:
+            np.savez(cache_file, meta=np.array(json.dumps(meta)), **arrays)
+        os.replace(temp_path, path)
+    except Exception:
+        os.remove(temp_path)
+        raise
+
+    for name in os.listdir(directory):
+        if name.startswith('compiled_') and name.endswith('.npz') and name != os.path.basename(path):
             try:
-                conn.close()
-            except:
+                os.remove(os.path.join(directory, name))
+            except OSError:
                 pass
-        
-        # Fallback to direct connection
+
+def load_compiled_model(cb_model, fingerprint):
+    """
+    Compiled model dari artefak cache milik `fingerprint`; jika belum ada (atau rusak) model
+    dikompilasi dari ekspor JSON lalu disimpan untuk load berikutnya.
+    Mengembalikan (compiled, sumber) dengan sumber 'cache' atau 'export'.
+    """
+    path = compiled_model_cache_path(fingerprint)
+    if os.path.exists(path):
         try:
-            print("🔄 Attempting fallback direct connection...")
-            conn = mysql.connector.connect(
-                host='localhost',
-                port=3306,
-                user='root',
-                password='',
-                database='optipredict_database',
-                autocommit=True,
-                connect_timeout=30,
-                charset='utf8mb4',
-                use_unicode=True
-            )
-            
-            if conn.is_connected():
-                print("✅ Fallback direct connection successful (XAMPP)")
-                return conn
-            else:
-                print("❌ Fallback connection failed")
-                return None
-                
-        except Exception as fallback_error:
-            print(f"❌ Fallback connection also failed: {fallback_error}")
-            print("⚠️ Pastikan XAMPP MySQL sudah berjalan dan database 'optipredict_database' sudah dibuat")
-            return None
+            with np.load(path, allow_pickle=False) as cached:
+                compiled = json.loads(str(cached['meta']))
+                compiled.update({key: cached[key] for key in cached.files if key != 'meta'})
+            return compiled, 'cache'
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("⚠️ Cache compiled model %s tidak terbaca (%s), kompilasi ulang", path, e)
 
-def close_db_connection(conn, cursor=None):
+    compiled = compile_catboost_model(cb_model)
+    try:
+        save_compiled_model(compiled, path)
+    except OSError as e:
+        logger.warning("⚠️ Cache compiled model tidak bisa ditulis (%s)", e)
+    return compiled, 'export'
+
+def compiled_predict_proba(compiled, features_matrix):
     """
-    Menutup cursor dan koneksi database dengan benar
+    predict_proba lewat evaluator NumPy: bit split dihitung dengan satu perbandingan
+    (N, D*T), indeks leaf = bobot 2^level @ bit, lalu nilai leaf dijumlahkan per tree.
+    Fitur dibandingkan sebagai float32 seperti di CatBoost.
+    """
+    features = np.asarray(features_matrix, dtype=np.float32)
+    if features.ndim != 2 or features.shape[1] != compiled['feature_count']:
+        raise ValueError(f"Matriks fitur harus (N, {compiled['feature_count']}), bukan {features.shape}")
+    if np.isnan(features).any():
+        features = np.where(np.isnan(features), compiled['nan_fill'], features)
+
+    depth = compiled['depth']
+    tree_count = compiled['tree_count']
+    output_columns = 2 if compiled['loss_function'] == 'Logloss' else compiled['bias'].shape[0]
+    probabilities = np.empty((len(features), output_columns), dtype=np.float64)
+
+    for start in range(0, len(features), compiled['block_rows']):
+        block = features[start:start + compiled['block_rows']]
+        bits = np.greater(block[:, compiled['split_features']], compiled['split_borders'])
+        bits = bits.astype(np.float32).reshape(len(block), depth, tree_count)
+        leaf_index = (compiled['level_weights'] @ bits).astype(np.intp).T + compiled['leaf_offsets']
+        raw = compiled['leaf_values'].take(leaf_index, axis=0).sum(axis=0) * compiled['scale'] + compiled['bias']
+
+        if compiled['loss_function'] == 'Logloss':
+            positive = 1.0 / (1.0 + np.exp(-raw[:, 0]))
+            probabilities[start:start + len(block), 0] = 1.0 - positive
+            probabilities[start:start + len(block), 1] = positive
+        else:
+            raw -= raw.max(axis=1, keepdims=True)
+            np.exp(raw, out=raw)
+            raw /= raw.sum(axis=1, keepdims=True)
+            probabilities[start:start + len(block)] = raw
+
+    return probabilities
+
+def compiled_model_parity_sample(compiled, rows, seed=0):
+    """
+    Sampel uji parity: nilai tepat di border, sedikit di atas border, acak di sekitar
+    rentang border, dan ~2% NaN, per kolom fitur
+    """
+    rng = np.random.default_rng(seed)
+    sample = np.empty((rows, compiled['feature_count']), dtype=np.float32)
+    used = np.isfinite(compiled['split_borders'])
+    for feature in range(compiled['feature_count']):
+        borders = np.unique(compiled['split_borders'][used & (compiled['split_features'] == feature)])
+        if not len(borders):
+            sample[:, feature] = rng.standard_normal(rows)
+            continue
+        low, high = borders[0] - 1.0, borders[-1] + 1.0
+        picked = rng.choice(borders, rows)
+        choice = rng.integers(0, 3, rows)
+        with np.errstate(over='ignore'):  # border nan_mode=Max bisa tepat float32 max
+            above = np.nextafter(picked, np.float32(np.inf))
+        sample[:, feature] = np.where(
+            choice == 0, picked, np.where(choice == 1, above, rng.uniform(low, high, rows))
+        )
+    sample[rng.random(sample.shape) < 0.02] = np.nan
+    return sample
+
+def check_compiled_model_parity(cb_model, compiled, rows=None):
+    """
+    Bandingkan evaluator NumPy dengan predict_proba CatBoost pada sampel parity.
+    Mengembalikan dict rows, max_abs_diff, label_agreement dan passed.
+    """
+    sample = compiled_model_parity_sample(compiled, rows or COMPILED_MODEL_PARITY_ROWS)
+    expected = cb_model.predict_proba(sample, thread_count=CATBOOST_THREADS_PER_SHARD)
+    actual = compiled_predict_proba(compiled, sample)
+    max_abs_diff = float(np.abs(actual - expected).max())
+    return {
+        'rows': len(sample),
+        'max_abs_diff': max_abs_diff,
+        'label_agreement': float(np.mean(actual.argmax(axis=1) == expected.argmax(axis=1))),
+        'passed': max_abs_diff <= COMPILED_MODEL_PARITY_TOLERANCE
+    }
+
+def prepare_compiled_model():
+    """
+    Siapkan model global untuk INFERENCE_ENGINE auto/compiled (dari cache per fingerprint, atau
+    kompilasi sekali) dan verifikasi parity. Jika model tidak didukung atau parity gagal,
+    inference tetap lewat CatBoost.
     """
+    global compiled_model
+    compiled_model = None
+    if INFERENCE_ENGINE == 'catboost':
+        compiled_model_state.update(status='disabled', source=None, parity=None, error=None)
+        return
+
     try:
-        if cursor:
-            cursor.close()
-            print("✅ Cursor closed")
-        if conn:
-            conn.close()
-            print("✅ Connection closed and returned to pool")
+        compile_start = time.time()
+        compiled, source = load_compiled_model(model, model_fingerprint)
+        parity = check_compiled_model_parity(model, compiled)
+        compiled_model_state.update(parity=parity, error=None, source=source)
+        if not parity['passed']:
+            compiled_model_state['status'] = 'parity_failed'
+            if source == 'cache':
+                os.remove(compiled_model_cache_path(model_fingerprint))  # load berikutnya kompilasi ulang
+            logger.error(
+                "❌ Compiled model parity gagal (max diff %.3g > %.3g), inference tetap lewat CatBoost",
+                parity['max_abs_diff'], COMPILED_MODEL_PARITY_TOLERANCE
+            )
+            return
+        compiled_model = compiled
+        compiled_model_state['status'] = 'ready'
+        logger.info(
+            "✅ Compiled model siap (%s): %s trees depth %s, parity max diff %.3g (%.2fs)",
+            source, compiled['tree_count'], compiled['depth'], parity['max_abs_diff'], time.time() - compile_start
+        )
     except Exception as e:
-        print(f"❌ Error closing connection: {e}")
+        compiled_model_state.update(status='unsupported', source=None, parity=None, error=str(e))
+        logger.warning("⚠️ Compiled model tidak tersedia (%s), inference lewat CatBoost", e)
 
-def verify_user_exists(user_id):
-    conn = None
-    cursor = None
+def use_compiled_model(rows):
+    """
+    Compiled model dipakai untuk semua batch (INFERENCE_ENGINE=compiled) atau hanya
+    batch kecil (auto): di atas COMPILED_MODEL_MAX_ROWS evaluator C++ CatBoost lebih cepat
+    """
+    return compiled_model is not None and (INFERENCE_ENGINE == 'compiled' or rows <= COMPILED_MODEL_MAX_ROWS)
+
+def compiled_model_info():
+    return {
+        'engine': INFERENCE_ENGINE,
+        'status': compiled_model_state['status'],
+        'max_rows': None if INFERENCE_ENGINE == 'compiled' else COMPILED_MODEL_MAX_ROWS,
+        'trees': compiled_model['tree_count'] if compiled_model else None,
+        'source': compiled_model_state['source'],
+        'parity': compiled_model_state['parity'],
+        'error': compiled_model_state['error']
+    }
+
+@app.cli.command('inference-parity')
+@click.option('--rows', type=int, default=None, help='Jumlah baris sampel (default COMPILED_MODEL_PARITY_ROWS)')
+def inference_parity_command(rows):
+    """Bandingkan evaluator compiled model dengan predict_proba CatBoost."""
+    if not load_model_and_scaler():
+        print("❌ Model atau scaler gagal dimuat")
+        sys.exit(1)
     try:
-        conn = get_db_connection()
-        if not conn:
-            return False
-        
-        cursor = conn.cursor()
-        cursor.execute("SELECT id, name, email FROM users WHERE id = %s", (user_id,))
-        result = cursor.fetchone()
-        
-        return result if result else False
-        
-    except Exception as e:
-        print(f"Error verifying user: {e}")
-        return False
-    finally:
-        close_db_connection(conn, cursor)
+        parity = check_compiled_model_parity(model, load_compiled_model(model, model_fingerprint)[0], rows)
+    except ValueError as e:
+        print(f"❌ Model tidak bisa dikompilasi: {e}")
+        sys.exit(1)
+    print(f"📊 {parity['rows']} baris: max diff {parity['max_abs_diff']:.3g}, "
+          f"label sama {parity['label_agreement']:.2%}")
+    if not parity['passed']:
+        print(f"❌ Parity gagal (toleransi {COMPILED_MODEL_PARITY_TOLERANCE})")
+        sys.exit(1)
+    print("✅ Compiled model identik dengan CatBoost")
 
-def normalize_headers(df):
+def init_inference_process(model_path, fingerprint, with_compiled):
     """
-    Normalisasi header: lowercase, hilangkan semua spasi (depan, belakang, tengah).
+    Initializer worker process inference: model dimuat sendiri dari file (worker dibuat dengan
+    spawn/forkserver, tidak mewarisi memori proses Flask). Compiled model diambil dari cache .npz
+    yang sudah ditulis proses induk.
     """
-    def clean(col):
-        return re.sub(r'\s+', '', str(col)).lower()
-    df.columns = [clean(col) for col in df.columns]
-    return df
+    global model, model_fingerprint, compiled_model
+    model = CatBoostClassifier()
+    model.load_model(model_path)
+    model_fingerprint = fingerprint
+    if with_compiled:
+        compiled_model = load_compiled_model(model, fingerprint)[0]
 
-def get_user_id_from_request(request):
+def predict_shard(shard, shard_model=None):
     """
-    Extract user_id dari berbagai sumber request
+    Prediksi satu shard dengan thread_count eksplisit. Mengembalikan (probabilities, detik).
+    Tanpa shard_model (mode process) memakai model global worker (init_inference_process).
     """
-    try:
-        # Cek dari form data (untuk file upload)
-        if hasattr(request, 'form') and request.form.get('userId'):
-            return int(request.form.get('userId'))
-        
-        # Cek dari JSON body (untuk manual prediction)
-        if hasattr(request, 'json') and request.json and request.json.get('userId'):
-            return int(request.json.get('userId'))
-        
-        # Cek dari query parameters
-        if hasattr(request, 'args') and request.args.get('userId'):
-            return int(request.args.get('userId'))
-        
-        print("⚠️ No user_id found in request")
-        return None
-        
-    except Exception as e:
-        print(f"❌ Error extracting user_id: {e}")
+    start_time = time.time()
+    if use_compiled_model(len(shard)):
+        probabilities = compiled_predict_proba(compiled_model, shard)
+    else:
+        probabilities = (shard_model or model).predict_proba(shard, thread_count=CATBOOST_THREADS_PER_SHARD)
+    return probabilities, time.time() - start_time
+
+def get_inference_pool():
+    """
+    Pool inference bersama untuk semua request (dibuat saat pertama dipakai). Process pool
+    dibuat ulang jika model dimuat ulang (fingerprint berubah); pool lama diselesaikan di latar.
+    """
+    global inference_executor, inference_process_pool, inference_pool_fingerprint
+    with inference_lock:
+        if INFERENCE_BACKEND == 'process':
+            if inference_process_pool is not None and inference_pool_fingerprint != model_fingerprint:
+                retired_pool = inference_process_pool
+                retired_pool.close()  # shard yang sudah dikirim tetap diselesaikan
+                threading.Thread(target=retired_pool.join, name='inference-pool-retire', daemon=True).start()
+                inference_process_pool = None
+                logger.info("🔄 Model berubah, inference process pool dibuat ulang")
+            if inference_process_pool is None:
+                context = multiprocessing.get_context(INFERENCE_PROCESS_START_METHOD)
+                inference_process_pool = context.Pool(
+                    processes=get_inference_workers(),
+                    initializer=init_inference_process,
+                    initargs=(MODEL_PATH, model_fingerprint, compiled_model is not None)
+                )
+                inference_pool_fingerprint = model_fingerprint
+                logger.info(
+                    "✅ Inference process pool started with %s workers (%s)",
+                    get_inference_workers(), INFERENCE_PROCESS_START_METHOD
+                )
+            return inference_process_pool
+
+        if inference_executor is None:
+            inference_executor = ThreadPoolExecutor(
+                max_workers=get_inference_workers(),
+                thread_name_prefix='inference'
+            )
+            logger.info("✅ Inference thread pool started with %s workers", get_inference_workers())
+        return inference_executor
+
+def run_sharded_inference(model, features_matrix, stats=None):
+    """
+    predict_proba untuk matriks fitur: matriks kecil diprediksi langsung, matriks besar
+    dipecah menjadi shard (minimal INFERENCE_MIN_SHARD_ROWS baris) yang dikerjakan paralel
+    di pool inference. Timing per shard dicatat ke `stats` jika diberikan.
+    """
+    total_rows = len(features_matrix)
+    workers = get_inference_workers()
+    inference_start = time.perf_counter()
+
+    if INFERENCE_BACKEND == 'serial' or workers == 1 or total_rows < 2 * INFERENCE_MIN_SHARD_ROWS:
+        start_time = time.time()
+        thread_count = workers * CATBOOST_THREADS_PER_SHARD if INFERENCE_BACKEND == 'serial' else CATBOOST_THREADS_PER_SHARD
+        engine = 'compiled' if use_compiled_model(total_rows) else 'catboost'
+        if engine == 'compiled':
+            probabilities = compiled_predict_proba(compiled_model, features_matrix)
+        else:
+            probabilities = model.predict_proba(features_matrix, thread_count=thread_count)
+        outputs = [(probabilities, time.time() - start_time)]
+        shard_sizes = [total_rows]
+    else:
+        shard_rows = max(INFERENCE_MIN_SHARD_ROWS, -(-total_rows // workers))
+        shards = [features_matrix[i:i + shard_rows] for i in range(0, total_rows, shard_rows)]
+        shard_sizes = [len(shard) for shard in shards]
+        engine = 'compiled' if use_compiled_model(shard_rows) else 'catboost'
+
+        pool = get_inference_pool()
+        if INFERENCE_BACKEND == 'process':
+            try:
+                outputs = pool.map(predict_shard, shards)
+            except ValueError:
+                # Pool baru saja dipensiunkan request lain (model dimuat ulang): ulangi di pool baru
+                outputs = get_inference_pool().map(predict_shard, shards)
+        else:
+            outputs = list(pool.map(lambda shard: predict_shard(shard, model), shards))
+        probabilities = np.vstack([output[0] for output in outputs])
+
+    observe_metric(
+        'optipredict_inference_duration_seconds', time.perf_counter() - inference_start,
+        backend=INFERENCE_BACKEND, engine=engine
+    )
+    increment_metric('optipredict_inference_rows_total', total_rows)
+
+    if stats is not None:
+        stats['backend'] = INFERENCE_BACKEND
+        stats['engine'] = engine
+        stats['workers'] = workers
+        stats['thread_count'] = CATBOOST_THREADS_PER_SHARD
+        stats.setdefault('shards', []).extend(
+            {'rows': rows, 'seconds': output[1]} for rows, output in zip(shard_sizes, outputs)
+        )
+
+    return probabilities
+
+def summarize_inference_stats(stats):
+    """
+    Ringkasan timing shard untuk response
+    """
+    shard_seconds = [shard['seconds'] for shard in stats.get('shards', [])]
+    if not shard_seconds:
         return None
+    return {
+        'backend': stats['backend'],
+        'engine': stats['engine'],
+        'workers': stats['workers'],
+        'thread_count': stats['thread_count'],
+        'shards': len(shard_seconds),
+        'shard_seconds': {
+            'min': round(min(shard_seconds), 4),
+            'max': round(max(shard_seconds), 4),
+            'mean': round(sum(shard_seconds) / len(shard_seconds), 4),
+            'total': round(sum(shard_seconds), 2)
+        }
+    }
 
-def get_next_prediction_number(user_id):
+def prediction_cache_max_entries():
+    return max(1, PREDICTION_CACHE_MAX_BYTES // PREDICTION_CACHE_ENTRY_BYTES)
+
+def prediction_cache_keys(features_matrix):
     """
-    Mendapatkan prediction number berikutnya untuk user tertentu
+    Key cache per baris: blake2b(model fingerprint + 31 float32 fitur)
+    """
+    features = np.ascontiguousarray(features_matrix, dtype=np.float32)
+    row_bytes = features.shape[1] * features.itemsize
+    buffer = memoryview(features.tobytes())
+    return [
+        hashlib.blake2b(buffer[offset:offset + row_bytes], digest_size=16, key=model_fingerprint).digest()
+        for offset in range(0, len(buffer), row_bytes)
+    ]
+
+def prediction_cache_get_many(keys):
+    """
+    Ambil hasil cache untuk setiap key (None jika miss atau sudah lewat TTL)
+    """
+    now = time.time()
+    values = []
+    with prediction_cache_lock:
+        for key in keys:
+            entry = prediction_cache.get(key)
+            if entry is not None and entry[1] < now:
+                del prediction_cache[key]
+                prediction_cache_stats['expirations'] += 1
+                entry = None
+            if entry is None:
+                prediction_cache_stats['misses'] += 1
+                values.append(None)
+            else:
+                prediction_cache.move_to_end(key)
+                prediction_cache_stats['hits'] += 1
+                values.append(entry[0])
+    return values
+
+def prediction_cache_put_many(keys, values):
+    """
+    Simpan hasil baru; entry paling lama dipakai dibuang jika melewati batas memori
+    """
+    expires_at = time.time() + PREDICTION_CACHE_TTL
+    max_entries = prediction_cache_max_entries()
+    with prediction_cache_lock:
+        for key, value in zip(keys, values):
+            prediction_cache[key] = (value, expires_at)
+            prediction_cache.move_to_end(key)
+        while len(prediction_cache) > max_entries:
+            prediction_cache.popitem(last=False)
+            prediction_cache_stats['evictions'] += 1
+
+def invalidate_prediction_cache():
+    """
+    Kosongkan cache (dipanggil setiap kali model dimuat ulang)
+    """
+    with prediction_cache_lock:
+        if prediction_cache:
+            prediction_cache_stats['invalidations'] += 1
+        prediction_cache.clear()
+
+def prediction_cache_info():
+    with prediction_cache_lock:
+        lookups = prediction_cache_stats['hits'] + prediction_cache_stats['misses']
+        return dict(
+            prediction_cache_stats,
+            enabled=PREDICTION_CACHE_ENABLED,
+            max_batch_rows=PREDICTION_CACHE_MAX_BATCH_ROWS,
+            entries=len(prediction_cache),
+            max_entries=prediction_cache_max_entries(),
+            ttl_seconds=PREDICTION_CACHE_TTL,
+            hit_rate=round(prediction_cache_stats['hits'] / lookups, 4) if lookups else 0.0
+        )
+
+# PERBAIKAN: Optimized batch prediction function
+def predict_batch_optimized(model, snr_scaler, snr_values, inputs_matrix, stats=None, features_matrix=None):
+    """
+    Optimized batch prediction using vectorized operations
+    Inference dijalankan lewat run_sharded_inference; `stats` (dict, opsional) diisi timing per shard.
+    Untuk batch sampai PREDICTION_CACHE_MAX_BATCH_ROWS baris, baris yang sudah ada di prediction
+    cache tidak diprediksi ulang; hanya cache miss yang masuk CatBoost.
+    Jika `features_matrix` (float32 (N, 31), SNR mentah di kolom 0) diberikan, buffer itu dipakai
+    langsung tanpa salinan: SNR dinormalisasi in-place, snr_values/inputs_matrix diabaikan.
     """
-    conn = None
-    cursor = None
     try:
-        conn = get_db_connection()
-        if not conn:
-            return 1
-        
-        cursor = conn.cursor()
-        
-        # Cek prediction number tertinggi untuk user ini
-        cursor.execute("""
-            SELECT COALESCE(MAX(prediction_number), 0) + 1 as next_number
-            FROM predictions 
-            WHERE user_id = %s
-        """, (user_id,))
+        start_time = time.time()
         
-        result = cursor.fetchone()
-        next_number = result[0] if result else 1
+        # PERBAIKAN: Matriks fitur float32 satu buffer, SNR dinormalisasi in-place
+        if features_matrix is None:
+            features_matrix, snr_normalized = assemble_features(snr_scaler, snr_values, inputs_matrix)
+        else:
+            snr_normalized = normalize_snr_column(snr_scaler, features_matrix)
+
+        logger.debug("📊 Processing batch of %s samples...", len(features_matrix))
         
-        print(f"📊 Next prediction number for user {user_id}: {next_number}")
-        return next_number
+        logger.debug("📊 Features matrix shape: %s", features_matrix.shape)
         
-    except Exception as e:
-        print(f"❌ Error getting next prediction number: {e}")
-        return 1
-    finally:
-        close_db_connection(conn, cursor)
+        # PERBAIKAN: Cache lookup, hanya baris yang miss diprediksi CatBoost
+        use_cache = PREDICTION_CACHE_ENABLED and len(features_matrix) <= PREDICTION_CACHE_MAX_BATCH_ROWS
+        cache_keys = prediction_cache_keys(features_matrix) if use_cache else None
+        cached = prediction_cache_get_many(cache_keys) if cache_keys else [None] * len(features_matrix)
+        miss_index = [idx for idx, value in enumerate(cached) if value is None]
 
-# PERBAIKAN: Endpoint batch prediksi file dengan OPTIMASI EKSTREM
+        predictions = [value[0] if value else None for value in cached]
+        confidences = np.array([value[1] if value else 0.0 for value in cached], dtype=np.float64)
+
+        if miss_index:
+            miss_features = features_matrix if len(miss_index) == len(cached) else features_matrix[miss_index]
+
+            # PERBAIKAN: Sharded multi-core prediction
+            probabilities = run_sharded_inference(model, miss_features, stats)
+            predicted_classes = np.argmax(probabilities, axis=1)
+            confidence_scores = np.max(probabilities, axis=1)
+
+            # PERBAIKAN: Vectorized label mapping
+            miss_predictions = [PREDICTION_LABELS.get(cls, "Unknown") for cls in predicted_classes]
+            miss_confidences = confidence_scores * 100
+
+            for position, idx in enumerate(miss_index):
+                predictions[idx] = miss_predictions[position]
+            confidences[miss_index] = miss_confidences
+
+            if cache_keys:
+                prediction_cache_put_many(
+                    [cache_keys[idx] for idx in miss_index],
+                    zip(miss_predictions, miss_confidences.tolist(), snr_normalized[miss_index].tolist())
+                )
+
+        if cache_keys and len(miss_index) < len(cached):
+            logger.debug("📊 Prediction cache: %s hits, %s misses", len(cached) - len(miss_index), len(miss_index))
+        
+        processing_time = time.time() - start_time
+        logger.info("✅ Batch prediction completed in %.2f seconds", processing_time, extra=LOG_SAMPLED)
+        
+        return predictions, confidences, snr_normalized
+        
+    except Exception as e:
+        logger.exception("❌ Error in batch prediction: %s", e)
+        return None, None, None
+
+def predict_single(snr_raw, inputs):
+    """
+    Prediksi satu vektor fitur. Jika micro-batching aktif, vektor dikirim ke dispatcher
+    dan digabung dengan request /predict lain yang datang dalam jendela MICROBATCH_MAX_WAIT_MS.
+    Mengembalikan (label, confidence, snr_normalized).
+    """
+    inputs_array = np.asarray(inputs, dtype=np.float32).reshape(1, 30)
+
+    if not MICROBATCH_ENABLED:
+        predictions, confidences, snr_normalized = predict_batch_optimized(
+            model, snr_scaler, [snr_raw], inputs_array
+        )
+        if predictions is None:
+            raise RuntimeError('Error during prediction')
+        return predictions[0], confidences[0], snr_normalized[0]
+
+    ensure_microbatch_dispatcher()
+    item = {
+        'snr': snr_raw,
+        'inputs': inputs_array[0],
+        'done': threading.Event(),
+        'result': None,
+        'error': None
+    }
+    microbatch_queue.put(item)
+
+    if not item['done'].wait(MICROBATCH_RESULT_TIMEOUT):
+        raise TimeoutError('Timeout menunggu hasil micro-batch')
+    if item['error'] is not None:
+        raise item['error']
+    return item['result']
+
+def ensure_microbatch_dispatcher():
+    """
+    Jalankan thread dispatcher jika belum ada (per proses, aman setelah fork gunicorn)
+    """
+    global microbatch_thread
+    if microbatch_thread is not None and microbatch_thread.is_alive():
+        return
+    with microbatch_lock:
+        if microbatch_thread is None or not microbatch_thread.is_alive():
+            microbatch_thread = threading.Thread(
+                target=microbatch_dispatcher_loop, name='microbatch-dispatcher', daemon=True
+            )
+            microbatch_thread.start()
+            logger.info(
+                "✅ Micro-batch dispatcher started (max %s items / %s ms)", MICROBATCH_MAX_SIZE, MICROBATCH_MAX_WAIT_MS
+            )
+
+def microbatch_dispatcher_loop():
+    """
+    Kumpulkan item dari antrian sampai MICROBATCH_MAX_SIZE atau MICROBATCH_MAX_WAIT_MS
+    sejak item pertama, lalu prediksi semuanya dalam satu panggilan
+    """
+    while True:
+        batch = [microbatch_queue.get()]
+        deadline = time.monotonic() + MICROBATCH_MAX_WAIT_MS / 1000.0
+
+        while len(batch) < MICROBATCH_MAX_SIZE:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(microbatch_queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        process_microbatch(batch)
+
+def process_microbatch(batch):
+    """
+    Satu predict_batch_optimized untuk seluruh batch, lalu bagikan hasil ke setiap pemanggil
+    """
+    try:
+        snr_values = np.array([item['snr'] for item in batch], dtype=np.float32)
+        inputs_matrix = np.stack([item['inputs'] for item in batch])
+
+        predictions, confidences, snr_normalized = predict_batch_optimized(
+            model, snr_scaler, snr_values, inputs_matrix
+        )
+        if predictions is None:
+            raise RuntimeError('Error during micro-batch prediction')
+
+        for idx, item in enumerate(batch):
+            item['result'] = (predictions[idx], confidences[idx], snr_normalized[idx])
+    except Exception as e:
+        for item in batch:
+            item['error'] = e
+    finally:
+        with microbatch_lock:
+            microbatch_stats['batches'] += 1
+            microbatch_stats['items'] += len(batch)
+            microbatch_stats['max_batch_size'] = max(microbatch_stats['max_batch_size'], len(batch))
+        for item in batch:
+            item['done'].set()
+
+def insert_with_load_data(cursor, columns, predictions_data):
+    """
+    Bulk load lewat LOAD DATA LOCAL INFILE dari file TSV sementara.
+    TSV ditulis dengan csv.writer (C) tanpa quoting; tab, newline dan backslash di-escape
+    dengan backslash sesuai default ESCAPED BY MySQL. Kolom biner (BINARY_INSERT_COLUMNS)
+    ditulis sebagai hex lalu di-UNHEX lewat variabel user.
+    """
+    load_columns = [f'@{column}' if column in BINARY_INSERT_COLUMNS else column for column in columns]
+    set_clause = ', '.join(f'{column} = UNHEX(@{column})' for column in columns if column in BINARY_INSERT_COLUMNS)
+    for idx, column in enumerate(columns):
+        if column in BINARY_INSERT_COLUMNS:
+            predictions_data = [row[:idx] + (row[idx].hex(),) + row[idx + 1:] for row in predictions_data]
+
+    os.makedirs(LOAD_DATA_TEMP_DIR, mode=0o700, exist_ok=True)
+    fd, tsv_path = tempfile.mkstemp(prefix='predictions_', suffix='.tsv', dir=LOAD_DATA_TEMP_DIR)
+    try:
+        with os.fdopen(fd, 'w', newline='', encoding='utf-8') as tsv_file:
+            writer = csv.writer(
+                tsv_file, delimiter='\t', quoting=csv.QUOTE_NONE,
+                escapechar='\\', quotechar=None, lineterminator='\n'
+            )
+            writer.writerows(predictions_data)
+
+        cursor.execute(f"""
+            LOAD DATA LOCAL INFILE %s
+            INTO TABLE predictions
+            CHARACTER SET utf8mb4
+            FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\'
+            LINES TERMINATED BY '\\n'
+            ({', '.join(load_columns)})
+            {f'SET {set_clause}' if set_clause else ''}
+        """, (tsv_path,))
+    finally:
+        try:
+            os.remove(tsv_path)
+        except OSError:
+            pass
+
+def insert_with_multirow(cursor, conn, columns, predictions_data, rows_per_statement, progress=None):
+    """
+    INSERT multi-row VALUES dengan `rows_per_statement` baris per statement.
+    Tanpa mode single-transaction setiap statement (beserta update summary-nya) di-commit sendiri.
+    """
+    row_placeholder = '(' + ', '.join(['%s'] * len(columns)) + ')'
+    prefix = f"INSERT INTO predictions ({', '.join(columns)}) VALUES "
+    full_statement = prefix + ', '.join([row_placeholder] * rows_per_statement)
+
+    total_inserted = 0
+    for i in range(0, len(predictions_data), rows_per_statement):
+        batch = predictions_data[i:i + rows_per_statement]
+        statement = full_statement if len(batch) == rows_per_statement else prefix + ', '.join([row_placeholder] * len(batch))
+        if not BULK_INSERT_SINGLE_TRANSACTION:
+            conn.start_transaction()
+        cursor.execute(statement, tuple(itertools.chain.from_iterable(batch)))
+        update_prediction_summaries(cursor, batch)
+        if not BULK_INSERT_SINGLE_TRANSACTION:
+            conn.commit()
+        total_inserted += len(batch)
+        if progress:
+            progress(total_inserted, len(predictions_data))
+
+def insert_with_executemany(cursor, conn, columns, predictions_data, batch_size, progress=None):
+    """
+    Jalur lama: cursor.executemany per `batch_size` baris dengan commit setiap batch
+    (satu transaksi per batch bersama update summary)
+    """
+    insert_query = f"""
+        INSERT INTO predictions ({', '.join(columns)})
+        VALUES ({', '.join(['%s'] * len(columns))})
+    """
+    total_inserted = 0
+    for i in range(0, len(predictions_data), batch_size):
+        batch = predictions_data[i:i + batch_size]
+        conn.start_transaction()
+        cursor.executemany(insert_query, batch)
+        update_prediction_summaries(cursor, batch)
+        conn.commit()
+        total_inserted += len(batch)
+        logger.debug("📊 Inserted batch %s: %s/%s records", i//batch_size + 1, total_inserted, len(predictions_data))
+        if progress:
+            progress(total_inserted, len(predictions_data))
+
+def update_prediction_summaries(cursor, predictions_data):
+    """
+    Terapkan baris prediksi yang baru di-insert ke prediction_summaries (total, waktu prediksi
+    terakhir) dan prediction_label_counts (jumlah per label), dalam transaksi pemanggil.
+    `predictions_data` berformat PREDICTION_INSERT_COLUMNS.
+    """
+    if not predictions_data:
+        return
+    user_index = PREDICTION_INSERT_COLUMNS.index('user_id')
+    label_index = PREDICTION_INSERT_COLUMNS.index('prediction')
+    created_index = PREDICTION_INSERT_COLUMNS.index('created_at')
+
+    totals = {}
+    labels = {}
+    for row in predictions_data:
+        user_id = row[user_index]
+        total = totals.get(user_id)
+        if total is None:
+            totals[user_id] = [1, row[created_index]]
+        else:
+            total[0] += 1
+            if row[created_index] > total[1]:
+                total[1] = row[created_index]
+        label_key = (user_id, row[label_index])
+        labels[label_key] = labels.get(label_key, 0) + 1
+
+    apply_prediction_summary_delta(cursor, totals, labels)
+
+def apply_prediction_summary_delta(cursor, totals, labels):
+    """
+    Upsert delta summary: `totals` {user_id: (jumlah, last_prediction_at|None)} dan
+    `labels` {(user_id, label): jumlah}. Jumlah negatif untuk penghapusan;
+    last_prediction_at hanya pernah dinaikkan (dikoreksi lewat rebuild).
+    """
+    cursor.execute(f"""
+        INSERT INTO prediction_summaries (user_id, total_count, last_prediction_at)
+        VALUES {', '.join(['(%s, %s, %s)'] * len(totals))}
+        ON DUPLICATE KEY UPDATE
+            total_count = total_count + VALUES(total_count),
+            last_prediction_at = GREATEST(
+                COALESCE(last_prediction_at, VALUES(last_prediction_at)),
+                COALESCE(VALUES(last_prediction_at), last_prediction_at)
+            )
+    """, tuple(itertools.chain.from_iterable(
+        (user_id, count, last_at) for user_id, (count, last_at) in totals.items()
+    )))
+    cursor.execute(f"""
+        INSERT INTO prediction_label_counts (user_id, prediction, prediction_count)
+        VALUES {', '.join(['(%s, %s, %s)'] * len(labels))}
+        ON DUPLICATE KEY UPDATE prediction_count = prediction_count + VALUES(prediction_count)
+    """, tuple(itertools.chain.from_iterable(
+        (user_id, label, count) for (user_id, label), count in labels.items()
+    )))
+
+def get_prediction_summary(user_id):
+    """
+    Ringkasan O(1) satu user dari prediction_summaries: total, jumlah per label, waktu terakhir.
+    Jatuh ke COUNT/GROUP BY pada predictions jika tabel summary belum ada (migrasi 005).
+    """
+    conn = None
+    cursor = None
+    try:
+        conn = get_db_connection()
+        if not conn:
+            return None
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                "SELECT total_count, last_prediction_at FROM prediction_summaries WHERE user_id = %s",
+                (user_id,)
+            )
+            summary_row = cursor.fetchone()
+            cursor.execute(
+                "SELECT prediction, prediction_count FROM prediction_label_counts WHERE user_id = %s AND prediction_count > 0",
+                (user_id,)
+            )
+            label_rows = cursor.fetchall()
+            source = 'summary'
+        except mysql.connector.Error as summary_error:
+            logger.warning("⚠️ Summary lookup failed (%s), falling back to COUNT(*)", summary_error)
+            summary_row, label_rows = compute_prediction_summary(cursor, user_id)
+            source = 'scan'
+
+        total_count, last_prediction_at = summary_row if summary_row else (0, None)
+        return {
+            'count': int(total_count),
+            'labels': {label: int(count) for label, count in label_rows},
+            'last_prediction_at': last_prediction_at.isoformat() if last_prediction_at else None,
+            'source': source
+        }
+    finally:
+        close_db_connection(conn, cursor)
+
+def compute_prediction_summary(cursor, user_id):
+    """
+    Hitung ulang summary satu user langsung dari tabel predictions ditambah arsip Parquet
+    (summary mencakup seluruh history, termasuk partisi yang sudah diarsipkan).
+    Mengembalikan ((total, last_prediction_at), [(label, count), ...]).
+    """
+    cursor.execute("""
+        SELECT prediction, COUNT(*), MAX(created_at)
+        FROM predictions
+        WHERE user_id = %s
+        GROUP BY prediction
+    """, (user_id,))
+    merged = {label: [count, last_at] for label, count, last_at in cursor.fetchall()}
+    for label, (count, last_at) in archived_label_counts(user_id).items():
+        if label in merged:
+            merged[label][0] += count
+            merged[label][1] = max(filter(None, (merged[label][1], last_at)), default=None)
+        else:
+            merged[label] = [count, last_at]
+    rows = [(label, count, last_at) for label, (count, last_at) in merged.items()]
+    if not rows:
+        return None, []
+    total_count = sum(count for _, count, _ in rows)
+    last_prediction_at = max((last_at for _, _, last_at in rows if last_at), default=None)
+    return (total_count, last_prediction_at), [(label, count) for label, count, _ in rows]
+
+def reconcile_prediction_summaries(user_id=None, rebuild=False):
+    """
+    Bandingkan summary tersimpan dengan hasil hitung ulang dari predictions, per user.
+    Dengan rebuild=True summary user yang drift ditulis ulang; baris summary dikunci
+    (FOR UPDATE) selama hitung ulang sehingga insert bersamaan tertahan dan tidak hilang.
+    Mengembalikan daftar drift: {'user_id', 'stored', 'actual'}.
+    """
+    conn = get_db_connection()
+    if not conn:
+        raise RuntimeError('Database connection failed')
+    cursor = conn.cursor()
+    drifts = []
+    try:
+        if user_id is not None:
+            user_ids = [user_id]
+        else:
+            cursor.execute("""
+                SELECT DISTINCT user_id FROM predictions WHERE user_id IS NOT NULL
+                UNION
+                SELECT user_id FROM prediction_summaries
+            """)
+            user_ids = sorted(row[0] for row in cursor.fetchall())
+
+        for summary_user_id in user_ids:
+            conn.start_transaction()
+            cursor.execute(
+                "SELECT total_count FROM prediction_summaries WHERE user_id = %s FOR UPDATE",
+                (summary_user_id,)
+            )
+            stored_row = cursor.fetchone()
+            cursor.execute(
+                "SELECT prediction, prediction_count FROM prediction_label_counts WHERE user_id = %s AND prediction_count <> 0",
+                (summary_user_id,)
+            )
+            stored = {
+                'count': int(stored_row[0]) if stored_row else 0,
+                'labels': {label: int(count) for label, count in cursor.fetchall()}
+            }
+
+            actual_row, actual_labels = compute_prediction_summary(cursor, summary_user_id)
+            actual = {
+                'count': int(actual_row[0]) if actual_row else 0,
+                'labels': {label: int(count) for label, count in actual_labels}
+            }
+
+            if stored != actual:
+                drifts.append({'user_id': summary_user_id, 'stored': stored, 'actual': actual})
+                if rebuild:
+                    cursor.execute("DELETE FROM prediction_label_counts WHERE user_id = %s", (summary_user_id,))
+                    cursor.execute("DELETE FROM prediction_summaries WHERE user_id = %s", (summary_user_id,))
+                    if actual_row:
+                        cursor.execute(
+                            "INSERT INTO prediction_summaries (user_id, total_count, last_prediction_at) VALUES (%s, %s, %s)",
+                            (summary_user_id, actual_row[0], actual_row[1])
+                        )
+                        cursor.executemany(
+                            "INSERT INTO prediction_label_counts (user_id, prediction, prediction_count) VALUES (%s, %s, %s)",
+                            [(summary_user_id, label, count) for label, count in actual_labels]
+                        )
+            conn.commit()
+        return drifts
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        close_db_connection(conn, cursor)
+
+@app.cli.command('summaries')
+@click.option('--user-id', type=int, default=None, help='Hanya periksa satu user')
+@click.option('--rebuild', is_flag=True, help='Tulis ulang summary yang drift dari tabel predictions')
+def summaries_command(user_id, rebuild):
+    """Verifikasi (atau rebuild) prediction_summaries terhadap tabel predictions."""
+    drifts = reconcile_prediction_summaries(user_id, rebuild=rebuild)
+    for drift in drifts:
+        print(f"⚠️ User {drift['user_id']}: tersimpan {drift['stored']} != aktual {drift['actual']}")
+    if not drifts:
+        print("✅ Summary konsisten dengan tabel predictions")
+    elif rebuild:
+        print(f"✅ Summary {len(drifts)} user ditulis ulang")
+    else:
+        print(f"❌ {len(drifts)} user drift, jalankan dengan --rebuild untuk memperbaiki")
+        sys.exit(1)
+
+# =========================================================================
+# PARTISI & RETENSI: partisi bulanan predictions dan arsip Parquet
+# =========================================================================
+
+def add_months(value, months):
+    """
+    Awal bulan (tanggal 1, 00:00) dari bulan `value` digeser `months` bulan
+    """
+    month_index = value.year * 12 + value.month - 1 + months
+    return datetime(month_index // 12, month_index % 12 + 1, 1)
+
+def list_prediction_partitions(cursor):
+    """
+    Partisi RANGE (TO_DAYS(created_at)) tabel predictions, urut dari yang tertua.
+    Mengembalikan [{'name', 'upper_bound' (datetime, None untuk MAXVALUE), 'rows'}];
+    list kosong jika tabel belum dipartisi (migrasi 006 belum dijalankan).
+    """
+    cursor.execute("""
+        SELECT PARTITION_NAME, PARTITION_DESCRIPTION, TABLE_ROWS
+        FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'predictions' AND PARTITION_NAME IS NOT NULL
+        ORDER BY PARTITION_ORDINAL_POSITION
+    """)
+    partitions = []
+    for name, description, table_rows in cursor.fetchall():
+        upper_bound = None
+        if description and description != 'MAXVALUE':
+            # TO_DAYS MySQL = ordinal Gregorian Python + 365
+            upper_bound = datetime.fromordinal(int(description) - 365)
+        partitions.append({'name': name, 'upper_bound': upper_bound, 'rows': int(table_rows or 0)})
+    return partitions
+
+def ensure_prediction_partitions(cursor, partitions, now=None):
+    """
+    Pecah partisi MAXVALUE menjadi partisi bulanan sampai PREDICTION_PARTITION_PREMAKE_MONTHS
+    ke depan, sehingga insert baru selalu jatuh ke partisi bulan berjalan (bukan pmax).
+    Mengembalikan nama partisi yang dibuat.
+    """
+    if not partitions or partitions[-1]['upper_bound'] is not None:
+        return []
+
+    now = now or datetime.now()
+    bounds = [partition['upper_bound'] for partition in partitions if partition['upper_bound']]
+    next_bound = max(bounds) if bounds else add_months(now, 0)
+    target = add_months(now, PREDICTION_PARTITION_PREMAKE_MONTHS + 1)
+
+    created = []
+    while next_bound < target:
+        month_start = next_bound
+        next_bound = add_months(month_start, 1)
+        created.append((f"p{month_start:%Y%m}", next_bound))
+
+    if created:
+        maxvalue_name = partitions[-1]['name']
+        definitions = ', '.join(
+            f"PARTITION {name} VALUES LESS THAN (TO_DAYS('{bound:%Y-%m-%d}'))" for name, bound in created
+        )
+        cursor.execute(f"""
+            ALTER TABLE predictions REORGANIZE PARTITION {maxvalue_name} INTO (
+                {definitions}, PARTITION {maxvalue_name} VALUES LESS THAN MAXVALUE
+            )
+        """)
+    return [name for name, _ in created]
+
+def require_pyarrow():
+    if pq is None:
+        raise RuntimeError('pyarrow belum terpasang (pip install pyarrow), arsip Parquet tidak tersedia')
+
+def prediction_archive_files():
+    """
+    File arsip Parquet terurut dari yang terbaru: [(batas atas partisi, path)].
+    Nama file: predictions_<YYYYMMDD batas atas>_<nama partisi>.parquet
+    """
+    try:
+        names = os.listdir(PREDICTION_ARCHIVE_DIR)
+    except FileNotFoundError:
+        return []
+    files = []
+    for name in names:
+        match = re.match(r'predictions_(\d{8})_\w+\.parquet$', name)
+        if match:
+            files.append((datetime.strptime(match.group(1), '%Y%m%d'), os.path.join(PREDICTION_ARCHIVE_DIR, name)))
+    return sorted(files, reverse=True)
+
+def prediction_archive_schema():
+    return pa.schema([
+        ('id', pa.int64()),
+        ('user_id', pa.int64()),
+        ('prediction_number', pa.int64()),
+        ('snr', pa.float64()),
+        ('snr_normalized', pa.float64()),
+        ('inputs', pa.string()),
+        ('inputs_packed', pa.binary()),
+        ('prediction', pa.string()),
+        ('confidence', pa.float64()),
+        ('quality_assessment', pa.string()),
+        ('input_type', pa.string()),
+        ('model_version', pa.string()),
+        ('created_at', pa.timestamp('us')),
+        ('excel_input_id', pa.int64())
+    ])
+
+def archive_rows_to_table(rows, schema):
+    """
+    Baris hasil SELECT PREDICTION_ARCHIVE_COLUMNS -> pyarrow.Table (DECIMAL -> float, bytearray -> bytes)
+    """
+    arrays = []
+    for field, values in zip(schema, zip(*rows)):
+        if pa.types.is_floating(field.type):
+            values = [None if value is None else float(value) for value in values]
+        elif pa.types.is_binary(field.type):
+            values = [None if value is None else bytes(value) for value in values]
+        arrays.append(pa.array(values, type=field.type))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+def archive_prediction_partition(conn, partition):
+    """
+    Salin satu partisi ke Parquet terkompresi, terurut (user_id, created_at, id) agar statistik
+    row group memangkas pembacaan per user. Setelah jumlah baris file cocok dengan partisi,
+    partisi di-DROP (dedup tidak memakai ulang upload yang prediksinya tidak lengkap lagi).
+    Mengembalikan (jumlah baris, path arsip).
+    """
+    require_pyarrow()
+    name = partition['name']
+    os.makedirs(PREDICTION_ARCHIVE_DIR, exist_ok=True)
+    archive_path = os.path.join(
+        PREDICTION_ARCHIVE_DIR, f"predictions_{partition['upper_bound']:%Y%m%d}_{name}.parquet"
+    )
+    temp_path = archive_path + '.tmp'
+    if os.path.exists(archive_path):
+        raise RuntimeError(f'Arsip {archive_path} sudah ada')
+
+    schema = prediction_archive_schema()
+    archived_rows = 0
+    published = False
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"""
+            SELECT {', '.join(PREDICTION_ARCHIVE_COLUMNS)}
+            FROM predictions PARTITION ({name})
+            ORDER BY user_id, created_at, id
+        """)
+        with pq.ParquetWriter(temp_path, schema, compression=PREDICTION_ARCHIVE_COMPRESSION) as writer:
+            while True:
+                rows = cursor.fetchmany(PREDICTION_ARCHIVE_FETCH_ROWS)
+                if not rows:
+                    break
+                writer.write_table(archive_rows_to_table(rows, schema))
+                archived_rows += len(rows)
+
+        cursor.execute(f"SELECT COUNT(*) FROM predictions PARTITION ({name})")
+        partition_rows = cursor.fetchone()[0]
+        file_rows = pq.ParquetFile(temp_path).metadata.num_rows
+        if not partition_rows == file_rows == archived_rows:
+            raise RuntimeError(
+                f'Verifikasi arsip {name} gagal: partisi {partition_rows}, file {file_rows}, disalin {archived_rows}'
+            )
+
+        with open(temp_path, 'rb') as archive_file:
+            os.fsync(archive_file.fileno())
+        os.replace(temp_path, archive_path)
+        published = True
+
+        cursor.execute(f"ALTER TABLE predictions DROP PARTITION {name}")
+        return archived_rows, archive_path
+
+    except Exception:
+        # Partisi belum di-DROP: buang arsip agar baris tidak terbaca dua kali
+        for path in (temp_path, archive_path if published else None):
+            if path and os.path.exists(path):
+                os.remove(path)
+        raise
+    finally:
+        cursor.close()
+
+def apply_prediction_retention(dry_run=False, now=None):
+    """
+    Kebijakan retensi: buat partisi bulan mendatang, lalu arsipkan dan DROP setiap partisi
+    yang seluruh isinya lebih tua dari PREDICTION_RETENTION_MONTHS. GET_LOCK memastikan
+    hanya satu proses (worker gunicorn/cron) yang menjalankan DDL sekaligus.
+    Mengembalikan {'partitioned', 'created', 'archived', 'pending', 'skipped'}.
+    """
+    result = {'partitioned': False, 'created': [], 'archived': [], 'pending': [], 'skipped': None}
+    conn = get_db_connection()
+    if not conn:
+        raise RuntimeError('Database connection failed')
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT GET_LOCK(%s, 0)", (RETENTION_LOCK_NAME,))
+        if not cursor.fetchone()[0]:
+            result['skipped'] = 'locked'
+            return result
+        try:
+            partitions = list_prediction_partitions(cursor)
+            if not partitions:
+                result['skipped'] = 'not_partitioned'
+                return result
+            result['partitioned'] = True
+
+            now = now or datetime.now()
+            if not dry_run:
+                result['created'] = ensure_prediction_partitions(cursor, partitions, now)
+
+            if PREDICTION_RETENTION_MONTHS > 0:
+                cutoff = add_months(now, -PREDICTION_RETENTION_MONTHS)
+                expired = [
+                    partition for partition in partitions
+                    if partition['upper_bound'] and partition['upper_bound'] <= cutoff
+                ]
+                for partition in expired:
+                    if dry_run:
+                        result['pending'].append({'partition': partition['name'], 'rows': partition['rows']})
+                        continue
+                    with prediction_archive_lock:
+                        rows, path = archive_prediction_partition(conn, partition)
+                    result['archived'].append({'partition': partition['name'], 'rows': rows, 'path': path})
+                    logger.info("📦 Partition %s archived (%s rows) -> %s", partition['name'], rows, path)
+        finally:
+            cursor.execute("DO RELEASE_LOCK(%s)", (RETENTION_LOCK_NAME,))
+    finally:
+        close_db_connection(conn, cursor)
+        if not dry_run:
+            retention_state['last_run'] = time.time()
+            retention_state['last_result'] = result
+    return result
+
+def retention_worker_loop():
+    while True:
+        try:
+            result = apply_prediction_retention()
+            if result['created'] or result['archived']:
+                logger.info("📦 Retention: %s partitions created, %s archived", len(result['created']), len(result['archived']))
+        except Exception as e:
+            logger.error("❌ Retention error: %s", e)
+        time.sleep(PREDICTION_RETENTION_INTERVAL)
+
+def ensure_retention_worker():
+    """
+    Jalankan retensi berkala di thread daemon (PREDICTION_RETENTION_INTERVAL > 0). Setiap putaran
+    juga membuat partisi bulan mendatang, jadi worker ini harus hidup di setiap proses layanan.
+    """
+    if PREDICTION_RETENTION_INTERVAL <= 0 or (retention_state['thread'] and retention_state['thread'].is_alive()):
+        return
+    retention_state['thread'] = threading.Thread(
+        target=retention_worker_loop, name='prediction-retention', daemon=True
+    )
+    retention_state['thread'].start()
+
+def archive_filter_expressions(user_id, filters):
+    """
+    Filter pq.read_table yang setara dengan history_where_clause (tanpa cursor)
+    """
+    expressions = [('user_id', '=', user_id)]
+    if 'prediction' in filters:
+        expressions.append(('prediction', '=', filters['prediction']))
+    if 'quality' in filters:
+        expressions.append(('quality_assessment', '=', filters['quality']))
+    if 'from' in filters:
+        expressions.append(('created_at', '>=', datetime.fromisoformat(filters['from'])))
+    if 'to' in filters:
+        expressions.append(('created_at', '<', datetime.fromisoformat(filters['to'])))
+    return expressions
+
+def read_archived_history(user_id, filters, page_cursor, limit):
+    """
+    Lanjutan history dari arsip Parquet, urut created_at DESC, id DESC dengan filter dan cursor
+    yang sama seperti history_where_clause. Seluruh baris arsip lebih tua dari tabel aktif dan
+    file tidak saling tumpang tindih, jadi file dibaca dari yang terbaru sampai `limit` terpenuhi.
+    """
+    files = prediction_archive_files()
+    if not files:
+        return []
+    require_pyarrow()
+
+    lower = datetime.fromisoformat(filters['from']) if 'from' in filters else None
+    expressions = archive_filter_expressions(user_id, filters)
+    if page_cursor:
+        expressions.append(('created_at', '<=', page_cursor[0]))
+
+    rows = []
+    for upper_bound, path in files:
+        if lower and upper_bound <= lower:
+            break
+        table = pq.read_table(path, filters=expressions)
+        if page_cursor:
+            created_at = pa.scalar(page_cursor[0], type=pa.timestamp('us'))
+            table = table.filter(pc.or_(
+                pc.less(table['created_at'], created_at),
+                pc.and_(pc.equal(table['created_at'], created_at), pc.less(table['id'], page_cursor[1]))
+            ))
+        if table.num_rows == 0:
+            continue
+        table = table.sort_by([('created_at', 'descending'), ('id', 'descending')])
+        for row in table.slice(0, limit - len(rows)).to_pylist():
+            row['archived'] = True
+            rows.append(row)
+        if len(rows) >= limit:
+            break
+    return rows
+
+def archived_label_counts(user_id):
+    """
+    Jumlah prediksi per label seorang user di arsip Parquet: {label: (count, max created_at)}
+    """
+    files = prediction_archive_files()
+    if not files:
+        return {}
+    require_pyarrow()
+
+    counts = {}
+    for _, path in files:
+        table = pq.read_table(path, columns=['prediction', 'created_at'], filters=[('user_id', '=', user_id)])
+        if table.num_rows == 0:
+            continue
+        grouped = table.group_by('prediction').aggregate([('created_at', 'count'), ('created_at', 'max')])
+        for row in grouped.to_pylist():
+            count, last_at = counts.get(row['prediction'], (0, None))
+            counts[row['prediction']] = (
+                count + row['created_at_count'],
+                max(filter(None, (last_at, row['created_at_max'])), default=None)
+            )
+    return counts
+
+def archived_analytics_rows(user_id, filters, confidence_bin, snr_bin):
+    """
+    Tiga agregat analytics (format baris sama dengan query MySQL di get_predictions_analytics)
+    dari arsip Parquet, dihitung dengan group_by pyarrow per file
+    """
+    daily_rows, confidence_rows, snr_rows = [], [], []
+    files = prediction_archive_files()
+    if not files:
+        return daily_rows, confidence_rows, snr_rows
+    require_pyarrow()
+
+    lower = datetime.fromisoformat(filters['from']) if 'from' in filters else None
+    columns = ['prediction', 'confidence', 'quality_assessment', 'snr', 'created_at']
+    for upper_bound, path in files:
+        if lower and upper_bound <= lower:
+            break
+        table = pq.read_table(path, columns=columns, filters=archive_filter_expressions(user_id, filters))
+        if table.num_rows == 0:
+            continue
+
+        table = table.append_column('day', pc.cast(table['created_at'], pa.date32()))
+        table = table.append_column(
+            'confidence_bucket', pc.floor(pc.divide(pc.cast(table['confidence'], pa.float64()), confidence_bin))
+        )
+        daily_rows.extend(
+            (row['day'], row['prediction'], row['count_all'], row['confidence_sum'])
+            for row in table.group_by(['day', 'prediction']).aggregate([([], 'count_all'), ('confidence', 'sum')]).to_pylist()
+        )
+        confidence_rows.extend(
+            (row['confidence_bucket'], row['quality_assessment'], row['count_all'])
+            for row in table.group_by(['confidence_bucket', 'quality_assessment']).aggregate([([], 'count_all')]).to_pylist()
+        )
+
+        snr = pc.cast(table['snr'], pa.float64()).drop_null()
+        if len(snr) == 0:
+            continue
+        snr_table = pa.table({'bucket': pc.floor(pc.divide(snr, snr_bin)), 'snr': snr, 'snr_square': pc.multiply(snr, snr)})
+        snr_rows.extend(
+            (row['bucket'], row['count_all'], row['snr_sum'], row['snr_square_sum'], row['snr_min'], row['snr_max'])
+            for row in snr_table.group_by('bucket').aggregate([
+                ([], 'count_all'), ('snr', 'sum'), ('snr_square', 'sum'), ('snr', 'min'), ('snr', 'max')
+            ]).to_pylist()
+        )
+    return daily_rows, confidence_rows, snr_rows
+
+def purge_user_from_archive(user_id):
+    """
+    Hapus baris seorang user dari semua file arsip (file ditulis ulang, dihapus jika kosong).
+    Mengembalikan {label: jumlah baris yang dihapus}.
+    """
+    files = prediction_archive_files()
+    if not files:
+        return {}
+    require_pyarrow()
+
+    removed_labels = {}
+    with prediction_archive_lock:
+        for _, path in files:
+            matches = pq.read_table(path, columns=['prediction'], filters=[('user_id', '=', user_id)])
+            if matches.num_rows == 0:
+                continue
+            for item in pc.value_counts(matches['prediction']).to_pylist():
+                removed_labels[item['values']] = removed_labels.get(item['values'], 0) + item['counts']
+
+            table = pq.read_table(path)
+            kept = table.filter(pc.not_equal(table['user_id'], user_id))
+            if kept.num_rows:
+                temp_path = path + '.tmp'
+                pq.write_table(
+                    kept, temp_path,
+                    compression=PREDICTION_ARCHIVE_COMPRESSION,
+                    row_group_size=PREDICTION_ARCHIVE_FETCH_ROWS
+                )
+                os.replace(temp_path, path)
+            else:
+                os.remove(path)
+    return removed_labels
+
+def retention_info():
+    files = prediction_archive_files()
+    last_run = retention_state['last_run']
+    return {
+        'retention_months': PREDICTION_RETENTION_MONTHS,
+        'interval': PREDICTION_RETENTION_INTERVAL,
+        'archive_dir': PREDICTION_ARCHIVE_DIR,
+        'archive_files': len(files),
+        'archive_bytes': sum(os.path.getsize(path) for _, path in files),
+        'parquet_available': pq is not None,
+        'last_run': datetime.fromtimestamp(last_run).isoformat() if last_run else None,
+        'last_result': retention_state['last_result']
+    }
+
+@app.cli.command('retention')
+@click.option('--dry-run', is_flag=True, help='Tampilkan partisi yang akan diarsipkan tanpa mengubah apa pun')
+def retention_command(dry_run):
+    """Buat partisi mendatang dan arsipkan partisi predictions yang melewati masa retensi."""
+    result = apply_prediction_retention(dry_run=dry_run)
+    if result['skipped'] == 'not_partitioned':
+        print("⚠️ Tabel predictions belum dipartisi, jalankan migrasi 006 terlebih dahulu")
+        return
+    if result['skipped'] == 'locked':
+        print("⚠️ Retensi sedang dijalankan proses lain")
+        return
+    for name in result['created']:
+        print(f"✅ Partisi {name} dibuat")
+    for item in result['pending']:
+        print(f"📦 Akan diarsipkan: {item['partition']} (~{item['rows']} baris)")
+    for item in result['archived']:
+        print(f"✅ {item['partition']}: {item['rows']} baris diarsipkan ke {item['path']}")
+    if not (result['created'] or result['pending'] or result['archived']):
+        print("✅ Tidak ada partisi yang perlu diproses")
+
+# PERBAIKAN: Optimized database batch insert
+def batch_insert_predictions(user_id, predictions_data, batch_size=None, progress=None, excel_input_id=None,
+                             conn=None):
+    """
+    Insert predictions in batches for better performance
+    Backend ditentukan BULK_INSERT_BACKEND (default 'multirow'): 'auto' mencoba LOAD DATA LOCAL
+    INFILE lalu jatuh ke multi-row VALUES; 'load_data', 'multirow' dan 'executemany' memaksa satu jalur.
+    `progress(inserted, total)` dipanggil setelah setiap batch (opsional)
+    Jika `excel_input_id` diisi, setiap tuple sudah memuat kolom excel_input_id di posisi terakhir.
+    Summary per user (prediction_summaries) diperbarui di transaksi yang sama dengan insert.
+    Koneksi milik pemanggil (`conn`) dipakai tanpa ditutup; tanpa itu diambil dari pool.
+    """
+    global load_data_available
+    if not predictions_data:
+        return True
+
+    batch_size = batch_size or BULK_INSERT_ROWS
+    columns = PREDICTION_INSERT_COLUMNS + (('excel_input_id',) if excel_input_id else ())
+    own_conn = conn is None
+    cursor = None
+    in_transaction = False
+    try:
+        if own_conn:
+            conn = get_db_connection()
+        if not conn:
+            return False
+        
+        cursor = conn.cursor()
+        insert_start = time.time()
+        backend = BULK_INSERT_BACKEND
+
+        if backend in ('auto', 'load_data') and load_data_available:
+            try:
+                conn.start_transaction()
+                in_transaction = True
+                insert_with_load_data(cursor, columns, predictions_data)
+                update_prediction_summaries(cursor, predictions_data)
+                conn.commit()
+                in_transaction = False
+                if progress:
+                    progress(len(predictions_data), len(predictions_data))
+            except Exception as load_error:
+                if in_transaction:
+                    conn.rollback()
+                    in_transaction = False
+                if backend == 'load_data':
+                    raise
+                if getattr(load_error, 'errno', None) in LOAD_DATA_DISABLED_ERRNOS:
+                    load_data_available = False
+                logger.warning("⚠️ LOAD DATA LOCAL INFILE gagal (%s), fallback ke multi-row INSERT", load_error)
+                backend = 'multirow'
+            else:
+                backend = 'load_data'
+
+        if backend in ('auto', 'multirow'):
+            backend = 'multirow'
+            if BULK_INSERT_SINGLE_TRANSACTION:
+                conn.start_transaction()
+                in_transaction = True
+            insert_with_multirow(cursor, conn, columns, predictions_data, batch_size, progress)
+            if in_transaction:
+                conn.commit()
+                in_transaction = False
+        elif backend == 'executemany':
+            insert_with_executemany(cursor, conn, columns, predictions_data, batch_size, progress)
+
+        insert_time = time.time() - insert_start
+        logger.debug("✅ Successfully inserted %s predictions via %s in %.2fs", len(predictions_data), backend, insert_time)
+        return True
+        
+    except Exception as e:
+        logger.error("❌ Error in batch insert: %s", e)
+        if conn:
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+        return False
+    finally:
+        close_db_connection(conn if own_conn else None, cursor)
+
+class PoolTimeout(Exception):
+    """Tidak ada koneksi pool yang bebas dalam DB_POOL_WAIT_TIMEOUT atau antrian tunggu penuh"""
+
+class PooledConnection:
+    """
+    Koneksi pinjaman dari pool: atribut diteruskan ke koneksi mysql asli, close()
+    menjalankan `on_close` (kembali ke pool, atau membebaskan koneksi milik request)
+    """
+    def __init__(self, raw, on_close):
+        self._raw = raw
+        self._on_close = on_close
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def is_connected(self):
+        # Liveness sudah dicek saat checkout; tanpa round trip ping di setiap pemanggilan
+        return self._raw is not None
+
+    def close(self):
+        raw, self._raw = self._raw, None
+        if raw is not None:
+            self._on_close(raw)
+
+def open_pool_connection():
+    conn = mysql.connector.connect(**DB_CONFIG)
+    with db_pool_cond:
+        db_pool_stats['created'] += 1
+    return conn
+
+def acquire_pool_connection(timeout=None):
+    """
+    Ambil koneksi mentah dari pool. Koneksi menganggur dipakai LIFO (yang terhangat dulu);
+    jika belum mencapai DB_POOL_SIZE koneksi baru dibuat, selain itu menunggu di antrian
+    terbatas (DB_POOL_MAX_WAITERS) paling lama `timeout` detik lalu PoolTimeout.
+    Koneksi yang menganggur lebih dari DB_POOL_PING_INTERVAL di-ping dulu; yang mati diganti.
+    """
+    timeout = DB_POOL_WAIT_TIMEOUT if timeout is None else timeout
+    start = time.monotonic()
+    conn = None
+    last_used = None
+
+    with db_pool_cond:
+        if (not db_pool_state['idle'] and db_pool_state['size'] >= DB_POOL_SIZE
+                and db_pool_state['waiters'] >= DB_POOL_MAX_WAITERS):
+            db_pool_stats['rejected'] += 1
+            raise PoolTimeout(f'Antrian tunggu pool penuh ({DB_POOL_MAX_WAITERS} waiter)')
+
+        db_pool_state['waiters'] += 1
+        db_pool_stats['max_waiters'] = max(db_pool_stats['max_waiters'], db_pool_state['waiters'])
+        try:
+            while True:
+                if db_pool_state['idle']:
+                    conn, last_used = db_pool_state['idle'].pop()
+                    break
+                if db_pool_state['size'] < DB_POOL_SIZE:
+                    db_pool_state['size'] += 1  # slot direservasi sebelum connect
+                    break
+                remaining = timeout - (time.monotonic() - start)
+                if remaining <= 0:
+                    db_pool_stats['timeouts'] += 1
+                    raise PoolTimeout(f'Tidak ada koneksi bebas dalam {timeout:.1f}s (pool {DB_POOL_SIZE})')
+                db_pool_cond.wait(remaining)
+        finally:
+            db_pool_state['waiters'] -= 1
+
+    try:
+        if conn is None:
+            conn = open_pool_connection()
+        elif time.monotonic() - last_used > DB_POOL_PING_INTERVAL:
+            with db_pool_cond:
+                db_pool_stats['pings'] += 1
+            try:
+                conn.ping(reconnect=False)
+            except Exception:
+                with db_pool_cond:
+                    db_pool_stats['discarded'] += 1
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+                conn = open_pool_connection()
+    except Exception:
+        with db_pool_cond:
+            db_pool_state['size'] -= 1
+            db_pool_cond.notify()
+        raise
+
+    waited = time.monotonic() - start
+    observe_metric('optipredict_db_pool_wait_seconds', waited)
+    with db_pool_cond:
+        db_pool_state['in_use'] += 1
+        db_pool_stats['checkouts'] += 1
+        db_pool_stats['wait_seconds_total'] += waited
+        db_pool_stats['wait_seconds_max'] = max(db_pool_stats['wait_seconds_max'], waited)
+    return conn
+
+def reset_pool_connection(conn):
+    """
+    Bersihkan sisa pemakaian sebelum koneksi dipakai lagi (hasil query yang belum dibaca,
+    transaksi yang tidak di-commit). Mengembalikan False jika koneksi sebaiknya dibuang.
+    """
+    try:
+        if conn.unread_result:
+            conn.consume_results()
+        if conn.in_transaction:
+            conn.rollback()
+        return True
+    except Exception:
+        return False
+
+def release_pool_connection(conn, discard=False):
+    if not discard:
+        discard = not reset_pool_connection(conn)
+    with db_pool_cond:
+        db_pool_state['in_use'] -= 1
+        if discard:
+            db_pool_state['size'] -= 1
+            db_pool_stats['discarded'] += 1
+        else:
+            db_pool_state['idle'].append((conn, time.monotonic()))
+        db_pool_cond.notify()
+    if discard:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+def release_request_slot_connection(slot, conn):
+    """
+    close() dari peminjam koneksi request: koneksi tetap dipegang request sampai teardown
+    """
+    if reset_pool_connection(conn):
+        slot['busy'] = False
+    else:
+        slot['conn'] = None
+        release_pool_connection(conn, discard=True)
+
+@app.teardown_appcontext
+def release_request_connection(exception=None):
+    slot = g.pop('db_connection', None)
+    if slot and slot['conn'] is not None:
+        release_pool_connection(slot['conn'])
+
+def db_pool_info():
+    with db_pool_cond:
+        checkouts = db_pool_stats['checkouts']
+        return {
+            'max_size': DB_POOL_SIZE,
+            'size': db_pool_state['size'],
+            'in_use': db_pool_state['in_use'],
+            'idle': len(db_pool_state['idle']),
+            'waiters': db_pool_state['waiters'],
+            'max_waiters': db_pool_stats['max_waiters'],
+            'wait_timeout': DB_POOL_WAIT_TIMEOUT,
+            'checkouts': checkouts,
+            'request_reuses': db_pool_stats['request_reuses'],
+            'avg_wait_ms': round(db_pool_stats['wait_seconds_total'] / checkouts * 1000, 3) if checkouts else 0,
+            'max_wait_ms': round(db_pool_stats['wait_seconds_max'] * 1000, 3),
+            'timeouts': db_pool_stats['timeouts'],
+            'rejected': db_pool_stats['rejected'],
+            'created': db_pool_stats['created'],
+            'discarded': db_pool_stats['discarded'],
+            'pings': db_pool_stats['pings']
+        }
+
+def get_db_connection():
+    """
+    PERBAIKAN: Pinjam koneksi dari pool tanpa fallback koneksi langsung (mencegah connection storm).
+    Di dalam request Flask, pemanggilan berurutan (verify user, alokasi nomor, insert, ...)
+    memakai satu koneksi yang dikembalikan ke pool saat teardown; pemanggilan bersarang
+    selagi koneksi request masih dipakai mendapat koneksi pool terpisah.
+    Mengembalikan None jika pool habis (timeout) atau database tidak bisa dihubungi.
+    """
+    if not db_pool_state['initialized']:
+        logger.debug("🔄 Initializing connection pool...")
+        init_connection_pool()
+
+    try:
+        if has_request_context():
+            slot = g.get('db_connection')
+            if slot is None or slot['conn'] is None:
+                slot = {'conn': acquire_pool_connection(), 'busy': False}
+                g.db_connection = slot
+            elif not slot['busy']:
+                with db_pool_cond:
+                    db_pool_stats['request_reuses'] += 1
+
+            if not slot['busy']:
+                slot['busy'] = True
+                return PooledConnection(slot['conn'], lambda conn: release_request_slot_connection(slot, conn))
+
+        return PooledConnection(acquire_pool_connection(), release_pool_connection)
+
+    except PoolTimeout as e:
+        logger.error("❌ Database pool exhausted: %s", e)
+        return None
+    except Exception as e:
+        logger.error("❌ Error getting connection from pool: %s", e)
+        logger.warning("⚠️ Pastikan XAMPP MySQL sudah berjalan dan database 'optipredict_database' sudah dibuat")
+        return None
+
+def close_db_connection(conn, cursor=None):
+    """
+    Menutup cursor dan koneksi database dengan benar
+    """
+    try:
+        if cursor:
+            cursor.close()
+            logger.debug("✅ Cursor closed")
+        if conn:
+            conn.close()
+            logger.debug("✅ Connection closed and returned to pool")
+    except Exception as e:
+        logger.error("❌ Error closing connection: %s", e)
+
+def verify_user_exists(user_id):
+    conn = None
+    cursor = None
+    try:
+        conn = get_db_connection()
+        if not conn:
+            return False
+        
+        cursor = conn.cursor()
+        cursor.execute("SELECT id, name, email FROM users WHERE id = %s", (user_id,))
+        result = cursor.fetchone()
+        
+        return result if result else False
+        
+    except Exception as e:
+        logger.error("Error verifying user: %s", e)
+        return False
+    finally:
+        close_db_connection(conn, cursor)
+
+def normalize_headers(df):
+    """
+    Normalisasi header: lowercase, hilangkan semua spasi (depan, belakang, tengah).
+    """
+    df.columns = [normalize_header_name(col) for col in df.columns]
+    return df
+
+def normalize_header_name(col):
+    return re.sub(r'\s+', '', str(col)).lower()
+
+def get_user_id_from_request(request):
+    """
+    Extract user_id dari berbagai sumber request
+    """
+    try:
+        # Cek dari form data (untuk file upload)
+        if hasattr(request, 'form') and request.form.get('userId'):
+            return int(request.form.get('userId'))
+        
+        # Cek dari JSON body (untuk manual prediction)
+        if hasattr(request, 'json') and request.json and request.json.get('userId'):
+            return int(request.json.get('userId'))
+        
+        # Cek dari query parameters
+        if hasattr(request, 'args') and request.args.get('userId'):
+            return int(request.args.get('userId'))
+        
+        logger.warning("⚠️ No user_id found in request")
+        return None
+        
+    except Exception as e:
+        logger.error("❌ Error extracting user_id: %s", e)
+        return None
+
+def allocate_prediction_numbers(conn, user_id, count=1):
+    """
+    Reservasi blok `count` prediction number berurutan untuk user secara atomik
+    lewat tabel prediction_counters, dalam satu statement pada koneksi pemanggil.
+    LAST_INSERT_ID(expr) membuat nilai akhir counter ikut terkirim sebagai lastrowid,
+    sehingga tidak perlu SELECT tambahan. Mengembalikan nomor pertama dari blok.
+    """
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT INTO prediction_counters (user_id, last_number)
+            VALUES (%s, LAST_INSERT_ID(%s))
+            ON DUPLICATE KEY UPDATE last_number = LAST_INSERT_ID(last_number + %s)
+        """, (user_id, count, count))
+        last_number = cursor.lastrowid
+        conn.commit()
+        return last_number - count + 1
+
+    except mysql.connector.Error as e:
+        # Fallback sementara hanya jika migrasi prediction_counters belum dijalankan; error lain
+        # diteruskan karena MAX(prediction_number) + 1 tidak aman untuk pemanggilan bersamaan
+        if e.errno != ER_NO_SUCH_TABLE:
+            raise
+        logger.warning("⚠️ prediction_counters belum ada (%s), falling back to MAX(prediction_number)", e)
+        cursor = cursor or conn.cursor()
+        cursor.execute("""
+            SELECT COALESCE(MAX(prediction_number), 0) + 1 as next_number
+            FROM predictions 
+            WHERE user_id = %s
+        """, (user_id,))
+        result = cursor.fetchone()
+        return result[0] if result else 1
+    finally:
+        if cursor:
+            cursor.close()
+
+def quality_assessment_array(confidences):
+    """
+    Kategori kualitas (High/Medium/Low) untuk array confidence secara vectorized
+    """
+    confidences = np.asarray(confidences)
+    return np.select(
+        [confidences > 80, confidences > 60],
+        ['High', 'Medium'],
+        default='Low'
+    )
+
+def format_prediction_results(row_offset, predictions, confidences, snr_values, snr_normalized, result_format='rows'):
+    """
+    Format hasil prediksi satu chunk dengan operasi NumPy (tanpa round/float per baris).
+    'rows'     -> list dict per baris (format lama)
+    'columnar' -> dict berisi array paralel: row, prediction, confidence, snr_raw, snr_normalized
+    """
+    columns = {
+        'row': list(range(row_offset + 1, row_offset + len(predictions) + 1)),
+        'prediction': list(predictions),
+        'confidence': np.round(np.asarray(confidences, dtype=np.float64), 2).tolist(),
+        'snr_raw': np.asarray(snr_values, dtype=np.float64).tolist(),
+        'snr_normalized': np.round(np.asarray(snr_normalized, dtype=np.float64), 4).tolist()
+    }
+    if result_format == 'columnar':
+        return columns
+
+    return [
+        dict(zip(RESULT_COLUMNS, values))
+        for values in zip(*(columns[key] for key in RESULT_COLUMNS))
+    ]
+
+def build_prediction_rows(user_id, first_prediction_number, snr_values, snr_normalized,
+                          inputs_matrix, predictions, confidences, input_type, model_version=MODEL_VERSION,
+                          excel_input_id=None):
+    """
+    Bangun tuple INSERT untuk tabel predictions secara kolom per kolom.
+    Cast float, kategori kualitas dan packing inputs dihitung vectorized; timestamp diambil sekali per batch.
+    `excel_input_id` (opsional) ditambahkan sebagai kolom terakhir.
+    """
+    count = len(predictions)
+    created_at = datetime.now()
+    columns = [
+        itertools.repeat(user_id, count),
+        range(first_prediction_number, first_prediction_number + count),
+        np.asarray(snr_values, dtype=np.float64).tolist(),
+        np.asarray(snr_normalized, dtype=np.float64).tolist(),
+        pack_inputs_matrix(inputs_matrix),
+        map(str, predictions),
+        np.asarray(confidences, dtype=np.float64).tolist(),
+        quality_assessment_array(confidences).tolist(),
+        itertools.repeat(input_type, count),
+        itertools.repeat(model_version, count),
+        itertools.repeat(created_at, count)
+    ]
+    if excel_input_id:
+        columns.append(itertools.repeat(excel_input_id, count))
+    return list(zip(*columns))
+
+def ensure_write_behind_writers():
+    """
+    Jalankan writer thread write-behind jika belum ada (per proses, aman setelah fork gunicorn).
+    Setiap writer punya antrian sendiri; item dirutekan per user sehingga baris seorang user
+    selalu ditulis berurutan oleh writer yang sama.
+    """
+    if len(write_behind_threads) == WRITE_BEHIND_WRITERS and all(t.is_alive() for t in write_behind_threads):
+        return
+    with write_behind_lock:
+        if not write_behind_queues:
+            write_behind_queues.extend(queue.Queue() for _ in range(WRITE_BEHIND_WRITERS))
+        for index in range(WRITE_BEHIND_WRITERS):
+            if index < len(write_behind_threads) and write_behind_threads[index].is_alive():
+                continue
+            thread = threading.Thread(
+                target=write_behind_writer_loop, args=(index,), name=f'write-behind-{index}', daemon=True
+            )
+            if index < len(write_behind_threads):
+                write_behind_threads[index] = thread
+            else:
+                write_behind_threads.append(thread)
+            thread.start()
+        if not write_behind_state['shutdown_registered']:
+            atexit.register(shutdown_write_behind)
+            write_behind_state['shutdown_registered'] = True
+            logger.info(
+                "✅ Write-behind writers started (%s threads, batch %s rows)", WRITE_BEHIND_WRITERS, WRITE_BEHIND_BATCH_ROWS
+            )
+
+def enqueue_prediction_rows(user_id, rows, excel_input_id=None, wait_timeout=None):
+    """
+    Serahkan baris prediksi ke writer write-behind tanpa menunggu database.
+    `rows` berformat PREDICTION_INSERT_COLUMNS tanpa excel_input_id; kolom prediction_number
+    diabaikan karena nomor dialokasikan writer saat baris benar-benar ditulis.
+    Jika antrian penuh (WRITE_BEHIND_MAX_PENDING_ROWS) atau sedang shutdown, baris langsung
+    masuk journal di disk. Dengan `wait_timeout` pemanggil menunggu sampai baris tersimpan.
+    Mengembalikan item; item['status'] salah satu dari queued | saved | journaled | lost.
+    """
+    ensure_write_behind_writers()
+    item = {
+        'user_id': user_id,
+        'rows': rows,
+        'excel_input_id': excel_input_id,
+        'first_number': None,
+        'id': None,
+        'status': 'queued',
+        'counted': False,
+        'done': threading.Event() if wait_timeout else None
+    }
+    if excel_input_id:
+        with write_behind_lock:
+            upload = write_behind_uploads.setdefault(
+                excel_input_id, {'pending': 0, 'finish': None, 'lost': False}
+            )
+            upload['pending'] += len(rows)
+
+    put_write_behind_item(item)
+
+    if item['done'] is not None:
+        item['done'].wait(wait_timeout)
+    return item
+
+def put_write_behind_item(item):
+    """
+    Masukkan item ke antrian writer miliknya, atau ke journal jika batas baris tertunda terlampaui
+    """
+    row_count = len(item['rows'])
+    with write_behind_lock:
+        accepted = (
+            not write_behind_state['stopping']
+            and write_behind_state['pending_rows'] + row_count <= WRITE_BEHIND_MAX_PENDING_ROWS
+        )
+        if accepted:
+            write_behind_state['pending_rows'] += row_count
+            write_behind_stats['enqueued_rows'] += row_count
+            item['counted'] = True
+
+    if not accepted:
+        journal_write_behind_items([item], 'antrian penuh' if not write_behind_state['stopping'] else 'shutdown')
+        return
+    write_behind_queues[hash(item['user_id']) % len(write_behind_queues)].put(item)
+
+def write_behind_writer_loop(index):
+    """
+    Kumpulkan item dari antrian writer sampai WRITE_BEHIND_BATCH_ROWS baris atau
+    WRITE_BEHIND_MAX_WAIT_MS sejak item pertama, lalu tulis semuanya sekaligus.
+    Writer pertama juga memutar ulang journal secara berkala. Item None = berhenti.
+    """
+    work_queue = write_behind_queues[index]
+    if index == 0:
+        replay_write_behind_journal()
+
+    while True:
+        try:
+            first_item = work_queue.get(timeout=WRITE_BEHIND_REPLAY_INTERVAL)
+        except queue.Empty:
+            if index == 0:
+                replay_write_behind_journal()
+            continue
+        if first_item is None:
+            return
+
+        batch = [first_item]
+        batch_rows = len(first_item['rows'])
+        deadline = time.monotonic() + WRITE_BEHIND_MAX_WAIT_MS / 1000.0
+        stop = False
+
+        while batch_rows < WRITE_BEHIND_BATCH_ROWS:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = work_queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                stop = True
+                break
+            batch.append(item)
+            batch_rows += len(item['rows'])
+
+        write_prediction_batch(batch)
+
+        if stop:
+            return
+        if index == 0 and time.time() - write_behind_state['last_replay'] >= WRITE_BEHIND_REPLAY_INTERVAL:
+            replay_write_behind_journal()
+
+def write_prediction_batch(batch):
+    """
+    Tulis satu batch writer dengan retry (backoff eksponensial); item yang tetap gagal
+    setelah WRITE_BEHIND_MAX_RETRIES percobaan dipindahkan ke journal
+    """
+    pending = batch
+    attempt = 0
+    while True:
+        try:
+            pending = write_prediction_items(pending)
+        except Exception as e:
+            logger.error("❌ Write-behind batch error: %s", e)
+        if not pending:
+            return
+
+        attempt += 1
+        if attempt > WRITE_BEHIND_MAX_RETRIES or write_behind_state['stopping']:
+            journal_write_behind_items(pending, f'gagal setelah {attempt} percobaan')
+            return
+
+        with write_behind_lock:
+            write_behind_stats['retries'] += 1
+        time.sleep(WRITE_BEHIND_RETRY_BACKOFF * (2 ** (attempt - 1)))
+
+def write_prediction_items(items):
+    """
+    Satu koneksi untuk seluruh batch: alokasikan prediction number per user (sekali untuk
+    semua item user tersebut, urut kedatangan), lalu insert per excel_input_id lewat
+    batch_insert_predictions. Nomor yang sudah dialokasikan dipertahankan saat retry.
+    Mengembalikan item yang belum berhasil ditulis.
+    """
+    conn = get_db_connection()
+    if not conn:
+        return items
+
+    failed = []
+    try:
+        unnumbered = {}
+        for item in items:
+            if item['first_number'] is None:
+                unnumbered.setdefault(item['user_id'], []).append(item)
+        for user_id, user_items in unnumbered.items():
+            next_number = allocate_prediction_numbers(conn, user_id, sum(len(item['rows']) for item in user_items))
+            for item in user_items:
+                item['first_number'] = next_number
+                next_number += len(item['rows'])
+
+        groups = {}
+        for item in items:
+            groups.setdefault(item['excel_input_id'], []).append(item)
+
+        for excel_input_id, group in groups.items():
+            tail = (excel_input_id,) if excel_input_id else ()
+            predictions_data = [
+                row[:1] + (item['first_number'] + idx,) + row[2:] + tail
+                for item in group
+                for idx, row in enumerate(item['rows'])
+            ]
+            if batch_insert_predictions(None, predictions_data, excel_input_id=excel_input_id, conn=conn):
+                resolve_written_items(conn, group)
+            else:
+                failed.extend(group)
+    finally:
+        close_db_connection(conn)
+
+    return failed
+
+def resolve_written_items(conn, items):
+    """
+    Tandai item sebagai tersimpan: isi id untuk pemanggil yang menunggu, kurangi hitungan
+    baris tertunda, dan selesaikan upload yang seluruh barisnya sudah tersimpan
+    """
+    for item in items:
+        if item['done'] is None:
+            continue
+        cursor = None
+        try:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT id FROM predictions WHERE user_id = %s AND prediction_number = %s",
+                (item['user_id'], item['first_number'])
+            )
+            result = cursor.fetchone()
+            item['id'] = result[0] if result else None
+        except Exception as e:
+            logger.warning("⚠️ Write-behind id lookup failed: %s", e)
+        finally:
+            if cursor:
+                cursor.close()
+
+    written_rows = sum(len(item['rows']) for item in items)
+    with write_behind_lock:
+        write_behind_state['pending_rows'] -= written_rows
+        write_behind_stats['written_rows'] += written_rows
+        write_behind_stats['batches'] += 1
+        finished = release_upload_rows(items)
+
+    for item in items:
+        item['status'] = 'saved'
+        if item['done'] is not None:
+            item['done'].set()
+
+    for excel_input_id, upload in finished:
+        finalize_write_behind_upload(excel_input_id, upload)
+
+def release_upload_rows(items, lost=False):
+    """
+    Kurangi baris tertunda upload milik `items` (dipanggil dengan write_behind_lock).
+    Baris yang masuk journal tidak dilepas: tetap tertunda sampai diputar ulang dan tersimpan.
+    Mengembalikan upload yang sudah bisa diselesaikan.
+    """
+    finished = []
+    for item in items:
+        upload = write_behind_uploads.get(item['excel_input_id'])
+        if upload is None:
+            continue
+        upload['pending'] -= len(item['rows'])
+        upload['lost'] = upload['lost'] or lost
+        if upload['pending'] <= 0 and upload['finish'] is not None:
+            finished.append((item['excel_input_id'], write_behind_uploads.pop(item['excel_input_id'])))
+    return finished
+
+def finish_upload_when_persisted(excel_input_id, status, total_rows, processed_rows, error_message=None):
+    """
+    finish_upload setelah semua baris upload yang masih di antrian write-behind tersimpan.
+    Tanpa baris tertunda status langsung ditulis.
+    """
+    with write_behind_lock:
+        upload = write_behind_uploads.get(excel_input_id)
+        if upload is not None:
+            upload['finish'] = (status, total_rows, processed_rows, error_message)
+            if upload['pending'] > 0:
+                return
+            write_behind_uploads.pop(excel_input_id)
+
+    if upload is None:
+        finish_upload(excel_input_id, status, total_rows, processed_rows, error_message)
+    else:
+        finalize_write_behind_upload(excel_input_id, upload)
+
+def finalize_write_behind_upload(excel_input_id, upload):
+    """
+    Tulis status akhir upload. Upload yang sebagian barisnya hilang (journal gagal ditulis)
+    ditandai gagal karena hasilnya tidak lengkap untuk deduplikasi.
+    """
+    status, total_rows, processed_rows, error_message = upload['finish']
+    if upload['lost'] and status == 'completed':
+        status, error_message = 'failed', 'Sebagian hasil prediksi hilang di write-behind'
+    finish_upload(excel_input_id, status, total_rows, processed_rows, error_message)
+
+def write_behind_journal_path(pid=None):
+    return os.path.join(WRITE_BEHIND_JOURNAL_DIR, f'write_behind_{pid or os.getpid()}.jsonl')
+
+def journal_value(value):
+    """
+    Serialisasi nilai non-JSON di journal: blob (inputs_packed) sebagai base64, datetime sebagai string
+    """
+    if isinstance(value, bytes):
+        return base64.b64encode(value).decode('ascii')
+    return str(value)
+
+def append_write_behind_journal(entries):
+    """
+    Tambahkan entry JSONL ke journal milik proses ini (fsync)
+    """
+    with write_behind_journal_lock:
+        os.makedirs(WRITE_BEHIND_JOURNAL_DIR, exist_ok=True)
+        with open(write_behind_journal_path(), 'a', encoding='utf-8') as journal_file:
+            for entry in entries:
+                journal_file.write(json.dumps(entry, default=journal_value) + '\n')
+            journal_file.flush()
+            os.fsync(journal_file.fileno())
+
+def journal_write_behind_items(items, reason):
+    """
+    Simpan item yang tidak bisa ditulis ke database ke journal JSONL per proses (fsync),
+    untuk diputar ulang writer saat database kembali normal. excel_input_id ikut disimpan
+    sehingga baris hasil replay tetap terhubung ke upload-nya.
+    """
+    journaled_rows = sum(len(item['rows']) for item in items)
+    try:
+        append_write_behind_journal({
+            'user_id': item['user_id'],
+            'excel_input_id': item['excel_input_id'],
+            'first_number': item['first_number'],
+            'rows': item['rows']
+        } for item in items)
+        status = 'journaled'
+        logger.warning("⚠️ Write-behind: %s rows written to journal (%s)", journaled_rows, reason)
+    except Exception as e:
+        status = 'lost'
+        logger.error("❌ Write-behind journal error, %s rows lost: %s", journaled_rows, e)
+
+    with write_behind_lock:
+        counted_rows = sum(len(item['rows']) for item in items if item['counted'])
+        write_behind_state['pending_rows'] -= counted_rows
+        write_behind_stats['journaled_rows' if status == 'journaled' else 'lost_rows'] += journaled_rows
+        finished = release_upload_rows(items, lost=True) if status == 'lost' else []
+
+    for item in items:
+        item['status'] = status
+        if item['done'] is not None:
+            item['done'].set()
+
+    for excel_input_id, upload in finished:
+        finalize_write_behind_upload(excel_input_id, upload)
+
+def replay_write_behind_journal():
+    """
+    Masukkan kembali isi journal ke antrian writer. Journal milik proses ini dan milik
+    proses yang sudah mati (mis. worker gunicorn sebelum restart) diambil alih dengan rename.
+    Entry 'finish' (status akhir upload yang barisnya masih di journal saat shutdown) didaftarkan
+    ulang sehingga upload selesai setelah seluruh barisnya tersimpan.
+    """
+    write_behind_state['last_replay'] = time.time()
+    if not os.path.isdir(WRITE_BEHIND_JOURNAL_DIR):
+        return
+
+    created_at_index = PREDICTION_INSERT_COLUMNS.index('created_at')
+    binary_indexes = [PREDICTION_INSERT_COLUMNS.index(column) for column in BINARY_INSERT_COLUMNS]
+    for name in sorted(os.listdir(WRITE_BEHIND_JOURNAL_DIR)):
+        match = re.fullmatch(r'write_behind_(\d+)\.jsonl(\.\d+\.replaying)?', name)
+        if not match:
+            continue
+        pid = int(match.group(1))
+        if pid != os.getpid() and process_alive(pid):
+            continue
+        if pid == os.getpid() and match.group(2):
+            continue  # sedang diputar ulang oleh proses ini
+
+        path = os.path.join(WRITE_BEHIND_JOURNAL_DIR, name)
+        replay_path = path if match.group(2) else f'{write_behind_journal_path(os.getpid())}.{time.time_ns()}.replaying'
+        try:
+            with write_behind_journal_lock:
+                os.rename(path, replay_path)
+        except OSError:
+            continue
+
+        items = []
+        finishes = {}
+        with open(replay_path, encoding='utf-8') as journal_file:
+            for line_number, line in enumerate(journal_file, 1):
+                try:
+                    entry = json.loads(line)
+                    if 'finish' in entry:
+                        finishes[entry['excel_input_id']] = tuple(entry['finish'])
+                        continue
+                    rows = [tuple(row) for row in entry['rows']]
+                    rows = [
+                        row[:created_at_index] + (datetime.fromisoformat(row[created_at_index]),) + row[created_at_index + 1:]
+                        for row in rows
+                    ]
+                    for idx in binary_indexes:
+                        rows = [row[:idx] + (base64.b64decode(row[idx]),) + row[idx + 1:] for row in rows]
+                except (ValueError, KeyError, TypeError) as e:
+                    logger.warning("⚠️ Write-behind journal %s:%s dilewati: %s", name, line_number, e)
+                    continue
+                items.append({
+                    'user_id': entry['user_id'],
+                    'rows': rows,
+                    'excel_input_id': entry.get('excel_input_id'),
+                    'first_number': entry['first_number'],
+                    'id': None,
+                    'status': 'queued',
+                    'counted': False,
+                    'done': None
+                })
+
+        # Baris upload milik proses ini sudah terhitung tertunda; upload dari journal proses lain didaftarkan ulang
+        with write_behind_lock:
+            for excel_input_id, finish in finishes.items():
+                if excel_input_id in write_behind_uploads:
+                    continue
+                write_behind_uploads[excel_input_id] = {
+                    'pending': sum(len(item['rows']) for item in items if item['excel_input_id'] == excel_input_id),
+                    'finish': finish,
+                    'lost': False
+                }
+        for item in items:
+            put_write_behind_item(item)
+        replayed_rows = sum(len(item['rows']) for item in items)
+        os.remove(replay_path)
+
+        with write_behind_lock:
+            write_behind_stats['replayed_rows'] += replayed_rows
+        logger.info("🔄 Write-behind: %s rows replayed from journal %s", replayed_rows, name)
+
+def process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+    return True
+
+def shutdown_write_behind(timeout=None):
+    """
+    Hook shutdown: hentikan penerimaan item baru, biarkan writer mengosongkan antriannya
+    (maksimal WRITE_BEHIND_SHUTDOWN_TIMEOUT detik), lalu amankan sisa item ke journal
+    """
+    timeout = WRITE_BEHIND_SHUTDOWN_TIMEOUT if timeout is None else timeout
+    with write_behind_lock:
+        if write_behind_state['stopping']:
+            return
+        write_behind_state['stopping'] = True
+        pending_rows = write_behind_state['pending_rows']
+
+    logger.info("🔄 Write-behind shutdown: flushing %s pending rows...", pending_rows)
+    for work_queue in write_behind_queues:
+        work_queue.put(None)
+
+    deadline = time.monotonic() + timeout
+    for thread in write_behind_threads:
+        thread.join(max(0.0, deadline - time.monotonic()))
+
+    leftovers = []
+    for work_queue in write_behind_queues:
+        while True:
+            try:
+                item = work_queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                leftovers.append(item)
+    if leftovers:
+        journal_write_behind_items(leftovers, 'shutdown')
+
+    # Upload yang barisnya masih di journal: simpan status akhirnya untuk proses yang memutar ulang journal
+    with write_behind_lock:
+        finishes = [
+            {'excel_input_id': excel_input_id, 'finish': upload['finish']}
+            for excel_input_id, upload in write_behind_uploads.items()
+            if upload['finish'] is not None and upload['pending'] > 0
+        ]
+    if finishes:
+        try:
+            append_write_behind_journal(finishes)
+        except OSError as e:
+            logger.error("❌ Write-behind journal error, %s upload statuses lost: %s", len(finishes), e)
+
+    logger.info("✅ Write-behind shutdown complete (%s rows still in flight)", write_behind_state['pending_rows'])
+
+def write_behind_info():
+    with write_behind_lock:
+        return {
+            'enabled': WRITE_BEHIND_ENABLED,
+            'writers': WRITE_BEHIND_WRITERS,
+            'pending_rows': write_behind_state['pending_rows'],
+            'max_pending_rows': WRITE_BEHIND_MAX_PENDING_ROWS,
+            'batch_rows': WRITE_BEHIND_BATCH_ROWS,
+            'pending_uploads': len(write_behind_uploads),
+            **write_behind_stats
+        }
+
+def pack_inputs_matrix(inputs_matrix):
+    """
+    Pack matriks P1-P30 (N x 30) menjadi list blob float32 little-endian 120 byte per baris,
+    dari satu buffer contiguous (tanpa json.dumps per baris)
+    """
+    packed = np.ascontiguousarray(inputs_matrix, dtype=PACKED_INPUTS_DTYPE).reshape(-1, INPUT_FEATURE_COUNT)
+    buffer = packed.tobytes()
+    row_bytes = packed.shape[1] * PACKED_INPUTS_DTYPE.itemsize
+    return [buffer[offset:offset + row_bytes] for offset in range(0, len(buffer), row_bytes)]
+
+def round_significant(values, digits):
+    """
+    Bulatkan array ke `digits` digit signifikan sebagai float64 tanpa format/parse string:
+    round(x * 10^k) / 10^k dengan k per elemen dari eksponen desimalnya. 0, NaN dan inf tidak diubah.
+    """
+    result = values.astype(np.float64)
+    magnitude = np.abs(result)
+    scaled = np.isfinite(result) & (magnitude > 0)
+    exponent = np.floor(np.log10(magnitude, out=np.zeros_like(result), where=scaled))
+    scale = 10.0 ** (digits - 1 - exponent[scaled])
+    result[scaled] = np.round(result[scaled] * scale) / scale
+    return result
+
+def unpack_inputs_column(packed_values, json_values):
+    """
+    Decode kolom inputs satu halaman hasil query menjadi matriks float64 (N x 30).
+    Baris dengan inputs_packed di-decode sekaligus dengan np.frombuffer; baris lama yang masih
+    berupa JSON (sebelum migrasi 004) di-parse per baris. Nilai float32 dibulatkan ke
+    7 digit signifikan (1.1 tetap 1.1, bukan 1.100000023841858).
+    """
+    matrix = np.zeros((len(packed_values), INPUT_FEATURE_COUNT), dtype=np.float64)
+    packed_rows = [idx for idx, value in enumerate(packed_values) if value and len(value) == INPUT_FEATURE_COUNT * PACKED_INPUTS_DTYPE.itemsize]
+    if packed_rows:
+        decoded = np.frombuffer(
+            b''.join(bytes(packed_values[idx]) for idx in packed_rows), dtype=PACKED_INPUTS_DTYPE
+        ).reshape(-1, INPUT_FEATURE_COUNT)
+        matrix[packed_rows] = round_significant(decoded, FLOAT32_SIGNIFICANT_DIGITS)
+
+    packed_set = set(packed_rows)
+    for idx, value in enumerate(json_values):
+        if idx in packed_set or not value:
+            continue
+        try:
+            inputs_data = json.loads(value)
+        except (ValueError, TypeError):
+            continue
+        if not isinstance(inputs_data, list):
+            continue
+        for col, item in enumerate(inputs_data[:INPUT_FEATURE_COUNT]):
+            try:
+                matrix[idx, col] = float(item)
+            except (ValueError, TypeError):
+                pass
+    return matrix
+
+def file_error_response(message, status_code, **extra):
+    """
+    Payload error standar untuk pipeline file (dipakai mode sync maupun job)
+    """
+    payload = {
+        'success': False,
+        'message': message,
+        'total_rows': 0,
+        'processed_rows': 0,
+        'results': []
+    }
+    payload.update(extra)
+    return payload, status_code
+
+def peek_csv_header(file):
+    """
+    Baca header CSV sekali dari awal file (posisi dikembalikan ke awal).
+    Mengembalikan (nama kolom asli, perkiraan byte per baris data dari sampel CSV_HEADER_PEEK_BYTES).
+    """
+    file.seek(0)
+    sample = file.read(CSV_HEADER_PEEK_BYTES)
+    file.seek(0)
+    if isinstance(sample, str):
+        sample = sample.encode('utf-8')
+
+    header_line, _, body = sample.partition(b'\n')
+    header = next(csv.reader([header_line.decode('utf-8-sig', errors='replace').rstrip('\r')]), [])
+    row_bytes = len(body) // body.count(b'\n') if body.count(b'\n') else len(header_line) + 1
+    return header, max(1, row_bytes)
+
+def map_csv_feature_columns(header):
+    """
+    Posisi kolom asli -> nama ternormalisasi untuk kolom FILE_FEATURE_COLUMNS; header duplikat
+    memakai kemunculan pertama. None jika ada kolom wajib yang tidak ada di header.
+    """
+    positions = {}
+    for idx, name in enumerate(header):
+        positions.setdefault(normalize_header_name(name), idx)
+    if any(column not in positions for column in FILE_FEATURE_COLUMNS):
+        return None
+    return {positions[column]: column for column in FILE_FEATURE_COLUMNS}
+
+def read_csv_chunks(file, chunk_size):
+    """
+    Reader CSV: header dibaca sekali, lalu hanya kolom snr dan p1-p30 yang di-parse dan langsung
+    diberi nama ternormalisasi (tanpa normalize_headers atas semua kolom di setiap chunk).
+    Dengan pyarrow file di-parse multithreaded lewat pyarrow.csv.open_csv per blok ~chunk_size
+    baris sebagai float64. Jika pyarrow tidak ada (atau CSV_READER_ENGINE=pandas), atau ada nilai
+    yang tidak bisa dikonversi (mis. teks di kolom angka), file dibaca ulang pandas C engine
+    dengan usecols; record yang sudah dikirim pyarrow dibuang dari hasil parse (dihitung per
+    record, bukan per baris fisik, sehingga newline di dalam quote dan baris kosong tidak menggeser).
+    Index setiap chunk adalah posisi record data (0 = baris pertama setelah header).
+    Header tanpa kolom wajib lengkap dibaca jalur lama agar pesan error memuat semua kolom.
+    """
+    header, row_bytes = peek_csv_header(file)
+    column_map = map_csv_feature_columns(header)
+    if column_map is None:
+        for chunk in pd.read_csv(file, chunksize=chunk_size):
+            yield normalize_headers(chunk)
+        return
+
+    rows_read = 0
+    if pacsv is not None and CSV_READER_ENGINE != 'pandas':
+        column_names = [f'c{idx}' for idx in range(len(header))]
+        selected = {column_names[position]: name for position, name in column_map.items()}
+        try:
+            reader = pacsv.open_csv(
+                file,
+                read_options=pacsv.ReadOptions(
+                    column_names=column_names, skip_rows=1, use_threads=True,
+                    block_size=min(max(chunk_size * row_bytes, CSV_MIN_BLOCK_BYTES), CSV_MAX_BLOCK_BYTES)
+                ),
+                convert_options=pacsv.ConvertOptions(
+                    include_columns=list(selected), column_types={column: pa.float64() for column in selected}
+                )
+            )
+            for batch in reader:
+                chunk = batch.to_pandas()
+                chunk.columns = [selected[column] for column in chunk.columns]
+                chunk.index = pd.RangeIndex(rows_read, rows_read + len(chunk))
+                rows_read += len(chunk)
+                yield chunk
+        except pa.ArrowInvalid as e:
+            logger.warning("⚠️ pyarrow gagal membaca CSV (%s), lanjut dengan pandas dari record %s", e, rows_read + 1)
+            file.seek(0)
+        else:
+            if not rows_read:
+                yield pd.DataFrame(columns=FILE_FEATURE_COLUMNS)
+            return
+
+    positions = sorted(column_map)
+    skip_records = rows_read
+    yielded = False
+    for chunk in pd.read_csv(file, usecols=positions, chunksize=chunk_size):
+        if skip_records:
+            dropped = min(skip_records, len(chunk))
+            skip_records -= dropped
+            chunk = chunk.iloc[dropped:]
+            if chunk.empty:
+                continue
+        chunk.columns = [column_map[position] for position in positions]
+        yielded = True
+        yield chunk
+    if not (yielded or rows_read):
+        yield pd.DataFrame(columns=FILE_FEATURE_COLUMNS)
+
+def xlsx_chunk_frame(rows, columns, first_row):
+    """
+    Chunk XLSX dengan index posisi baris data; baris yang lebih pendek dari header diisi NaN
+    """
+    return normalize_headers(pd.DataFrame(rows, columns=columns, index=pd.RangeIndex(first_row, first_row + len(rows))))
+
+def read_file_chunks(file, filename, chunk_size=None):
+    """
+    Generator chunk DataFrame (header sudah dinormalisasi) dari file upload.
+    CSV dibaca per blok lewat read_csv_chunks, XLSX dengan openpyxl read_only row iteration,
+    sehingga tidak pernah ada satu frame utuh di memori. XLS (xlrd) tidak mendukung
+    streaming, jadi dibaca utuh lalu dipotong per chunk.
+    Seperti pd.read_excel, baris kosong di tengah sheet tetap menjadi baris data (nomor baris hasil
+    sama dengan posisinya di spreadsheet); hanya baris kosong di akhir sheet yang dibuang.
+    Index chunk adalah posisi baris data (0 = baris pertama setelah header).
+    Selalu menghasilkan minimal satu chunk (bisa kosong) agar header tetap bisa divalidasi.
+    """
+    chunk_size = chunk_size or FILE_CHUNK_SIZE
+
+    if filename.endswith('.csv'):
+        yield from read_csv_chunks(file, chunk_size)
+
+    elif filename.endswith('.xlsx'):
+        workbook = openpyxl.load_workbook(file, read_only=True, data_only=True)
+        try:
+            rows = workbook.worksheets[0].iter_rows(values_only=True)
+            header = next(rows, None) or ()
+            columns = [col if col is not None else f'unnamed:{idx}' for idx, col in enumerate(header)]
+
+            buffer = []
+            first_row = 0
+            blank_rows = 0  # baris kosong tertunda: ikut dikirim hanya jika diikuti baris berisi
+            yielded = False
+            for row in rows:
+                if all(value is None for value in row):
+                    blank_rows += 1
+                    continue
+                buffer.extend([()] * blank_rows)
+                blank_rows = 0
+                buffer.append(row[:len(columns)])
+                while len(buffer) >= chunk_size:
+                    yield xlsx_chunk_frame(buffer[:chunk_size], columns, first_row)
+                    first_row += chunk_size
+                    buffer = buffer[chunk_size:]
+                    yielded = True
+            if buffer or not yielded:
+                yield xlsx_chunk_frame(buffer, columns, first_row)
+        finally:
+            workbook.close()
+
+    elif filename.endswith('.xls'):
+        df = normalize_headers(pd.read_excel(file, engine='xlrd'))
+        for start in range(0, max(len(df), 1), chunk_size):
+            yield df.iloc[start:start + chunk_size]
+
+    else:
+        raise ValueError('Format file tidak didukung (hanya .csv, .xlsx, .xls)')
+
+def assemble_chunk_features(chunk, feature_columns):
+    """
+    Parse kolom `feature_columns` (snr, p1-p30) dari chunk langsung ke satu buffer float32
+    (N, 31) C-contiguous yang siap dipakai model, kolom per kolom tanpa frame perantara.
+    Nilai non-numerik/kosong menjadi 0 (sama dengan to_numeric(errors='coerce').fillna(0)).
+    Mengembalikan (features_matrix, snr_values) dengan snr_values SNR mentah float64
+    (untuk snr_raw di hasil dan database); SNR di kolom 0 masih belum dinormalisasi.
+    """
+    features_matrix = np.empty((len(chunk), len(feature_columns)), dtype=np.float32)
+    snr_values = None
+    for idx, column in enumerate(feature_columns):
+        values = chunk[column]
+        if isinstance(values, pd.DataFrame):
+            values = values.iloc[:, 0]  # header duplikat setelah normalisasi: pakai kolom pertama
+        if not pd.api.types.is_numeric_dtype(values.dtype):
+            values = pd.to_numeric(values, errors='coerce')
+        if isinstance(values.dtype, np.dtype):
+            values = values.to_numpy()  # view data chunk, di-cast sekali saat disalin ke buffer
+        else:
+            values = values.to_numpy(dtype=np.float64, na_value=np.nan)  # dtype nullable pandas
+        if idx == 0:
+            snr_values = np.asarray(values, dtype=np.float64)
+            snr_values = np.where(np.isnan(snr_values), 0.0, snr_values)
+        features_matrix[:, idx] = values
+
+    features_matrix[np.isnan(features_matrix)] = 0
+    return features_matrix, snr_values
+
+def iter_process_file_chunks(file, original_filename, user_id, progress=None, result_format='rows',
+                             excel_input_id=None):
+    """
+    Pipeline lengkap prediksi file: read -> preprocess -> predict -> format -> database.
+    File diproses per chunk (FILE_CHUNK_SIZE baris): setiap chunk diprediksi dan disimpan
+    ke database sebelum chunk berikutnya dibaca, sehingga memori puncak tidak tumbuh
+    mengikuti ukuran file.
+    Generator event: ('rows', list_hasil_chunk) untuk setiap chunk, lalu sekali
+    ('done', payload, status_code) di akhir (payload sukses tanpa key 'results').
+    `result_format` menentukan bentuk hasil per chunk (lihat format_prediction_results).
+    Tidak bergantung pada request context sehingga bisa dijalankan di worker thread.
+    `progress(stage, status, **info)` dipanggil di awal/akhir setiap tahap (opsional).
+    Baris yang disimpan ditautkan ke `excel_input_id` jika diberikan.
+    """
+    def report(stage, status, **info):
+        if progress:
+            try:
+                progress(stage, status, **info)
+            except Exception as progress_error:
+                logger.warning("⚠️ Progress callback error: %s", progress_error)
+
+    start_total_time = time.time()
+    filename = original_filename.lower()
+
+    logger.info("📊 Processing file: %s", original_filename)
+
+    if not filename.endswith(('.csv', '.xlsx', '.xls')):
+        yield ('done',) + file_error_response('Format file tidak didukung (hanya .csv, .xlsx, .xls)', 400)
+        return
+
+    required_columns = FILE_FEATURE_COLUMNS
+
+    read_time = preprocess_time = prediction_time = format_time = db_time = 0.0
+    total_rows = 0
+    processed_rows = 0
+    saved_rows = 0
+    queued_rows = 0
+    inference_stats = {}
+    chunk_index = 0
+
+    chunks = read_file_chunks(file, filename)
+    report('file_read', 'running')
+
+    while True:
+        # Baca chunk berikutnya
+        try:
+            read_start = time.time()
+            chunk = next(chunks, None)
+            read_time += time.time() - read_start
+        except Exception as read_error:
+            error_msg = f'Error membaca file: {str(read_error)}'
+            logger.error("❌ %s", error_msg)
+            yield ('done',) + file_error_response(
+                error_msg, 400,
+                total_rows=total_rows,
+                processed_rows=processed_rows
+            )
+            return
+
+        if chunk is None:
+            break
+
+        chunk_index += 1
+        report('file_read', 'running', done=total_rows + len(chunk))
+
+        # Validasi kolom yang diperlukan (cukup di chunk pertama)
+        if chunk_index == 1:
+            logger.debug("📊 Header setelah normalisasi: %s", list(chunk.columns))
+            missing_cols = [col for col in required_columns if col not in chunk.columns]
+
+            if missing_cols:
+                error_msg = f'Kolom berikut wajib ada: {missing_cols}'
+                logger.error("❌ %s", error_msg)
+
+                yield ('done',) + file_error_response(
+                    error_msg, 400,
+                    available_columns=list(chunk.columns),
+                    total_rows=len(chunk)
+                )
+                return
+
+        if chunk.empty:
+            continue
+
+        row_offset = total_rows
+        total_rows += len(chunk)
+
+        # PERBAIKAN: Data preprocessing untuk batch processing
+        preprocess_start = time.time()
+        report('preprocessing', 'running', done=total_rows)
+
+        # PERBAIKAN: Kolom yang diperlukan di-parse langsung ke satu buffer float32 (N, 31)
+        features_matrix, snr_values = assemble_chunk_features(chunk, required_columns)
+        inputs_matrix = features_matrix[:, 1:]
+        del chunk
+
+        preprocess_time += time.time() - preprocess_start
+
+        # PERBAIKAN: Optimized batch prediction
+        prediction_start = time.time()
+        report('prediction', 'running', done=total_rows)
+
+        predictions, confidences, snr_normalized = predict_batch_optimized(
+            model, snr_scaler, snr_values, inputs_matrix, stats=inference_stats, features_matrix=features_matrix
+        )
+
+        if predictions is None:
+            yield ('done',) + file_error_response(
+                'Error during batch prediction', 500,
+                total_rows=total_rows,
+                processed_rows=processed_rows
+            )
+            return
+
+        prediction_time += time.time() - prediction_start
+
+        # PERBAIKAN: Format results efficiently
+        format_start = time.time()
+        report('formatting', 'running', done=total_rows)
+
+        chunk_results = format_prediction_results(
+            row_offset, predictions, confidences, snr_values, snr_normalized, result_format
+        )
+        processed_rows += len(predictions)
+
+        format_time += time.time() - format_start
+
+        yield ('rows', chunk_results)
+        del chunk_results
+
+        # PERBAIKAN: Optimized database insertion per chunk
+        db_start = time.time()
+
+        if user_id and WRITE_BEHIND_ENABLED:
+            # Write-behind: baris diserahkan ke writer thread, prediction number dialokasikan saat ditulis
+            predictions_data = build_prediction_rows(
+                user_id, 0, snr_values, snr_normalized, inputs_matrix, predictions, confidences, 'Excel File'
+            )
+            if enqueue_prediction_rows(user_id, predictions_data, excel_input_id)['status'] != 'lost':
+                queued_rows += len(predictions_data)
+            report('database', 'running', done=total_rows)
+
+        elif user_id:
+            report('database', 'running', done=row_offset)
+            db_conn = None
+            try:
+                db_conn = get_db_connection()
+                if not db_conn:
+                    raise RuntimeError('Database connection failed')
+
+                # Reservasi blok prediction number untuk chunk ini pada koneksi yang sama dengan insert
+                first_prediction_number = allocate_prediction_numbers(db_conn, user_id, len(predictions))
+
+                predictions_data = build_prediction_rows(
+                    user_id, first_prediction_number,
+                    snr_values, snr_normalized, inputs_matrix, predictions, confidences,
+                    'Excel File', excel_input_id=excel_input_id
+                )
+
+                # PERBAIKAN: Batch insert to database
+                batch_insert_success = batch_insert_predictions(
+                    user_id, predictions_data,
+                    progress=lambda inserted, total: report('database', 'running', done=row_offset + inserted),
+                    excel_input_id=excel_input_id,
+                    conn=db_conn
+                )
+
+                if batch_insert_success:
+                    saved_rows += len(predictions_data)
+                else:
+                    logger.warning("⚠️ Database insertion failed for chunk %s, but predictions completed", chunk_index)
+
+            except Exception as db_error:
+                logger.error("❌ Database error (non-critical): %s", db_error)
+            finally:
+                close_db_connection(db_conn)
+
+        db_time += time.time() - db_start
+
+        logger.debug("📊 Chunk %s selesai: %s baris diproses", chunk_index, total_rows)
+
+    report('file_read', 'completed', seconds=read_time, rows=total_rows)
+    report('preprocessing', 'completed', seconds=preprocess_time, rows=total_rows)
+    report('prediction', 'completed', seconds=prediction_time, rows=total_rows)
+    report('formatting', 'completed', seconds=format_time, rows=total_rows)
+    report('database', 'completed', seconds=db_time, rows=total_rows if user_id else 0)
+
+    # Calculate total processing time
+    total_time = time.time() - start_total_time
+    record_stage_metrics('predict_file', {
+        'file_read': read_time,
+        'preprocessing': preprocess_time,
+        'prediction': prediction_time,
+        'formatting': format_time,
+        'database': db_time,
+        'total': total_time
+    }, rows=processed_rows)
+
+    # Response format
+    response_data = {
+        'success': True,
+        'message': f'Berhasil memproses {processed_rows} baris data dari file {original_filename} dalam {total_time:.2f} detik',
+        'total_rows': total_rows,
+        'processed_rows': processed_rows,
+        'valid_rows': processed_rows,
+        'error_rows': 0,
+        'user_id': user_id,
+        'processing_time': {
+            'total': round(total_time, 4),
+            'file_read': round(read_time, 4),
+            'preprocessing': round(preprocess_time, 4),
+            'prediction': round(prediction_time, 4),
+            'formatting': round(format_time, 4),
+            'database': round(db_time, 4)
+        },
+        'inference': summarize_inference_stats(inference_stats),
+        'database_status': (
+            'not_saved' if not user_id
+            else 'queued' if queued_rows and queued_rows == processed_rows
+            else 'saved' if saved_rows == processed_rows
+            else 'partial' if saved_rows
+            else 'error'
+        )
+    }
+
+    logger.info(
+        "✅ Successfully processed %s rows (%s chunks) for user %s in %.2f seconds",
+        processed_rows, chunk_index, user_id, total_time
+    )
+    logger.debug("📊 Performance breakdown:")
+    logger.debug("   - File reading: %.2fs", read_time)
+    logger.debug("   - Preprocessing: %.2fs", preprocess_time)
+    logger.debug("   - Batch prediction: %.2fs", prediction_time)
+    if inference_stats.get('shards') and logger.isEnabledFor(logging.DEBUG):
+        shard_seconds = [shard['seconds'] for shard in inference_stats['shards']]
+        logger.debug(
+            "   - Inference shards: %s x %s (%s workers, thread_count=%s), max %.2fs",
+            len(shard_seconds), inference_stats['backend'], inference_stats['workers'],
+            inference_stats['thread_count'], max(shard_seconds)
+        )
+    logger.debug("   - Results formatting: %.2fs", format_time)
+    logger.debug("   - Database operations: %.2fs", db_time)
+
+    yield ('done', response_data, 200)
+
+def iter_predict_file_pipeline(file, original_filename, user_id, progress=None, result_format='rows',
+                               file_hash=None, file_size=None):
+    """
+    Entry point pipeline file dengan deduplikasi upload. File di-hash (SHA-256);
+    jika user yang sama sudah pernah memproses file identik dengan MODEL_VERSION saat ini,
+    hasil diambil dari database tanpa parse, predict, dan insert ulang.
+    Selain itu upload dicatat di excel_inputs dan hasilnya ditautkan lewat excel_input_id.
+    Event yang dihasilkan sama dengan iter_process_file_chunks.
+    """
+    # predictions tidak punya foreign key sejak dipartisi (migrasi 006): user dicek sebelum baris disimpan
+    if user_id and not verify_user_exists(user_id):
+        yield ('done',) + file_error_response('User tidak ditemukan', 404)
+        return
+
+    if not (user_id and FILE_DEDUP_ENABLED and original_filename.lower().endswith(('.csv', '.xlsx', '.xls'))):
+        yield from iter_process_file_chunks(file, original_filename, user_id, progress, result_format)
+        return
+
+    hash_start = time.time()
+    if file_hash is None:
+        file_hash, file_size = hash_upload(file)
+    hash_time = time.time() - hash_start
+
+    existing = find_upload_by_hash(user_id, file_hash)
+    # Hasil hanya dipakai ulang jika semua prediksinya masih ada di tabel aktif; upload yang
+    # prediksinya sudah dihapus/diarsipkan diproses ulang dengan record excel_inputs yang sama
+    if existing and existing['status'] == 'completed' and existing['stored_rows'] == existing['processed_rows']:
+        logger.info("♻️ File %s identik dengan upload #%s, memakai hasil tersimpan", original_filename, existing['id'])
+        yield from iter_stored_upload_results(
+            file, existing, original_filename, user_id, progress, result_format, hash_time
+        )
+        return
+
+    excel_input_id = register_upload(user_id, file_hash, original_filename, file_size, existing)
+
+    payload, status_code = None, None
+    try:
+        for event in iter_process_file_chunks(
+            file, original_filename, user_id, progress, result_format, excel_input_id=excel_input_id
+        ):
+            if event[0] == 'done':
+                _, payload, status_code = event
+                payload['file_hash'] = file_hash
+                payload['deduplicated'] = False
+            yield event
+    finally:
+        if excel_input_id:
+            if payload is not None and status_code == 200 and payload.get('database_status') in ('saved', 'queued'):
+                finish_upload_when_persisted(excel_input_id, 'completed', payload['total_rows'], payload['processed_rows'])
+            else:
+                finish_upload_when_persisted(
+                    excel_input_id, 'failed',
+                    payload['total_rows'] if payload else 0,
+                    payload['processed_rows'] if payload else 0,
+                    payload['message'] if payload and status_code != 200 else 'Proses tidak selesai atau gagal disimpan'
+                )
+
+def hash_upload(file):
+    """
+    SHA-256 isi file upload dibaca per blok lalu posisi dikembalikan ke awal.
+    Mengembalikan (hex_digest, ukuran_byte).
+    """
+    digest = hashlib.sha256()
+    size = 0
+    file.seek(0)
+    for block in iter(lambda: file.read(UPLOAD_HASH_BLOCK_SIZE), b''):
+        digest.update(block)
+        size += len(block)
+    file.seek(0)
+    return digest.hexdigest(), size
+
+def save_upload_with_hash(file, file_path):
+    """
+    Simpan upload ke disk sambil menghitung SHA-256 dalam satu kali baca.
+    Mengembalikan (hex_digest, ukuran_byte).
+    """
+    digest = hashlib.sha256()
+    size = 0
+    with open(file_path, 'wb') as target:
+        for block in iter(lambda: file.stream.read(UPLOAD_HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+            target.write(block)
+            size += len(block)
+    return digest.hexdigest(), size
+
+def find_upload_by_hash(user_id, file_hash):
+    """
+    Cari upload sebelumnya milik user dengan hash file dan versi model yang sama.
+    `stored_rows` = jumlah prediksi yang masih tertaut ke upload yang sudah selesai; berkurang
+    jika prediksinya dihapus user atau partisinya diarsipkan retensi.
+    """
+    conn = None
+    cursor = None
+    try:
+        conn = get_db_connection()
+        if not conn:
+            return None
+
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("""
+            SELECT id, status, total_rows, processed_rows, original_filename,
+                   TIMESTAMPDIFF(SECOND, created_at, NOW()) AS age_seconds,
+                   CASE WHEN status = 'completed' THEN (
+                       SELECT COUNT(*) FROM predictions WHERE predictions.excel_input_id = excel_inputs.id
+                   ) END AS stored_rows
+            FROM excel_inputs
+            WHERE user_id = %s AND file_hash = %s AND model_version = %s
+        """, (user_id, file_hash, MODEL_VERSION))
+        return cursor.fetchone()
+
+    except Exception as e:
+        logger.error("❌ Error looking up file hash: %s", e)
+        return None
+    finally:
+        close_db_connection(conn, cursor)
+
+def register_upload(user_id, file_hash, original_filename, file_size, existing=None):
+    """
+    Catat upload di excel_inputs dengan status 'processing' dan kembalikan id-nya.
+    Upload lama yang gagal (atau macet lebih dari FILE_DEDUP_STALE_SECONDS) dipakai ulang;
+    prediksi parsial miliknya dilepas dulu agar tidak tercampur.
+    Mengembalikan None jika upload identik sedang diproses request lain atau DB gagal.
+    """
+    conn = None
+    cursor = None
+    try:
+        if existing and existing['status'] == 'processing' and (existing['age_seconds'] or 0) < FILE_DEDUP_STALE_SECONDS:
+            logger.warning("⚠️ Upload identik #%s sedang diproses, file diproses tanpa deduplikasi", existing['id'])
+            return None
+
+        conn = get_db_connection()
+        if not conn:
+            return None
+        cursor = conn.cursor()
+
+        if existing:
+            cursor.execute("UPDATE predictions SET excel_input_id = NULL WHERE excel_input_id = %s", (existing['id'],))
+            cursor.execute("""
+                UPDATE excel_inputs
+                SET status = 'processing', original_filename = %s, file_size_bytes = %s,
+                    error_message = NULL, created_at = NOW(), processed_at = NULL
+                WHERE id = %s
+            """, (original_filename, file_size, existing['id']))
+            conn.commit()
+            return existing['id']
+
+        cursor.execute("""
+            INSERT INTO excel_inputs (
+                user_id, original_filename, file_hash, model_version, file_size_bytes, status
+            ) VALUES (%s, %s, %s, %s, %s, 'processing')
+        """, (user_id, original_filename, file_hash, MODEL_VERSION, file_size))
+        conn.commit()
+        return cursor.lastrowid
+
+    except mysql.connector.IntegrityError:
+        logger.warning("⚠️ Upload identik baru saja didaftarkan request lain, file diproses tanpa deduplikasi")
+        return None
+    except Exception as e:
+        logger.error("❌ Error registering upload: %s", e)
+        return None
+    finally:
+        close_db_connection(conn, cursor)
+
+def finish_upload(excel_input_id, status, total_rows, processed_rows, error_message=None):
+    """
+    Update status akhir upload di excel_inputs
+    """
+    conn = None
+    cursor = None
+    try:
+        conn = get_db_connection()
+        if not conn:
+            return
+        cursor = conn.cursor()
+        cursor.execute("""
+            UPDATE excel_inputs
+            SET status = %s, total_rows = %s, valid_rows = %s, processed_rows = %s,
+                error_message = %s, processed_at = NOW()
+            WHERE id = %s
+        """, (status, total_rows, processed_rows, processed_rows, error_message, excel_input_id))
+        conn.commit()
+    except Exception as e:
+        logger.error("❌ Error updating upload status: %s", e)
+    finally:
+        close_db_connection(conn, cursor)
+
+def iter_stored_upload_results(file, upload, original_filename, user_id, progress, result_format, hash_time):
+    """
+    Hasilkan event pipeline dari prediksi yang sudah tersimpan untuk upload identik,
+    dibaca per FILE_CHUNK_SIZE baris berurutan menurut prediction_number
+    """
+    start_total_time = time.time() - hash_time
+    conn = None
+    cursor = None
+    processed_rows = 0
+    try:
+        conn = get_db_connection()
+        if not conn:
+            # Database tidak tersedia: jatuh kembali ke pemrosesan normal
+            yield from iter_process_file_chunks(file, original_filename, user_id, progress, result_format)
+            return
+
+        if progress:
+            progress('database', 'running', rows=upload['processed_rows'])
+
+        db_start = time.time()
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT snr, snr_normalized, prediction, confidence
+            FROM predictions
+            WHERE excel_input_id = %s
+            ORDER BY prediction_number
+        """, (upload['id'],))
+
+        while True:
+            rows = cursor.fetchmany(FILE_CHUNK_SIZE)
+            if not rows:
+                break
+            snr_values, snr_normalized, predictions, confidences = zip(*rows)
+            yield ('rows', format_prediction_results(
+                processed_rows,
+                list(predictions),
+                np.array(confidences, dtype=np.float64),
+                np.array(snr_values, dtype=np.float64),
+                np.array(snr_normalized, dtype=np.float64),
+                result_format
+            ))
+            processed_rows += len(rows)
+            if progress:
+                progress('database', 'running', done=processed_rows)
+        db_time = time.time() - db_start
+    finally:
+        close_db_connection(conn, cursor)
+
+    if progress:
+        progress('database', 'completed', seconds=db_time, rows=processed_rows)
+
+    total_time = time.time() - start_total_time
+    yield ('done', {
+        'success': True,
+        'message': f'File {original_filename} identik dengan upload sebelumnya, {processed_rows} hasil prediksi diambil dari database dalam {total_time:.2f} detik',
+        'total_rows': upload['total_rows'] or processed_rows,
+        'processed_rows': processed_rows,
+        'valid_rows': processed_rows,
+        'error_rows': 0,
+        'user_id': user_id,
+        'processing_time': {
+            'total': round(total_time, 4),
+            'file_read': round(hash_time, 4),
+            'preprocessing': 0.0,
+            'prediction': 0.0,
+            'formatting': 0.0,
+            'database': round(db_time, 4)
+        },
+        'inference': None,
+        'database_status': 'saved',
+        'deduplicated': True,
+        'excel_input_id': upload['id']
+    }, 200)
+
+def run_predict_file_pipeline(file, original_filename, user_id, progress=None, result_format='rows',
+                              file_hash=None, file_size=None):
+    """
+    Jalankan pipeline sampai selesai dan kumpulkan semua hasil per baris.
+    Mengembalikan tuple (payload, status_code).
+    """
+    if result_format == 'columnar':
+        results = {key: [] for key in RESULT_COLUMNS}
+    else:
+        results = []
+
+    for event in iter_predict_file_pipeline(
+        file, original_filename, user_id, progress=progress, result_format=result_format,
+        file_hash=file_hash, file_size=file_size
+    ):
+        if event[0] == 'rows':
+            if result_format == 'columnar':
+                for key in RESULT_COLUMNS:
+                    results[key].extend(event[1][key])
+            else:
+                results.extend(event[1])
+        else:
+            _, payload, status_code = event
+            if status_code == 200:
+                payload['results'] = results
+            return payload, status_code
+
+def stream_predict_file_ndjson(events):
+    """
+    Response NDJSON dari event pipeline: satu baris {"type": "rows", "results": [...]}
+    per blok NDJSON_BLOCK_ROWS baris, diakhiri satu baris {"type": "summary", ...}
+    (atau {"type": "error", ...}). Error sebelum baris pertama tetap dibalas sebagai
+    JSON biasa dengan status code yang sesuai.
+    """
+    first_event = next(events)
+    if first_event[0] == 'done' and first_event[2] != 200:
+        return jsonify(first_event[1]), first_event[2]
+
+    def generate():
+        event = first_event
+        try:
+            while event is not None:
+                if event[0] == 'rows':
+                    rows = event[1]
+                    if isinstance(rows, dict):
+                        total = len(rows['row'])
+                        for start in range(0, total, NDJSON_BLOCK_ROWS):
+                            yield json.dumps({
+                                'type': 'rows',
+                                'results': {
+                                    key: values[start:start + NDJSON_BLOCK_ROWS]
+                                    for key, values in rows.items()
+                                }
+                            }) + '\n'
+                    else:
+                        for start in range(0, len(rows), NDJSON_BLOCK_ROWS):
+                            yield json.dumps({
+                                'type': 'rows',
+                                'results': rows[start:start + NDJSON_BLOCK_ROWS]
+                            }) + '\n'
+                else:
+                    _, payload, status_code = event
+                    yield json.dumps(dict(
+                        payload,
+                        type='summary' if status_code == 200 else 'error',
+                        status_code=status_code
+                    )) + '\n'
+                    return
+                event = next(events, None)
+        except Exception as e:
+            logger.exception("❌ Error dalam streaming predict_file: %s", e)
+            payload, status_code = file_error_response(str(e), 500)
+            yield json.dumps(dict(payload, type='error', status_code=status_code)) + '\n'
+
+    response = Response(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE)
+    response.headers['X-Accel-Buffering'] = 'no'
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+# PERBAIKAN: Endpoint batch prediksi file dengan OPTIMASI EKSTREM
 @app.route('/predict-file', methods=['POST'])
 def predict_file():
     try:
-        start_total_time = time.time()
-        print("📤 Received file upload request")
-        
+        logger.debug("📤 Received file upload request")
+
         # Ambil user_id dari request
         user_id = get_user_id_from_request(request)
-        print(f"📊 Processing file for user_id: {user_id}")
-        
+        logger.debug("📊 Processing file for user_id: %s", user_id)
+
         if 'file' not in request.files:
-            print("❌ No file in request")
-            return jsonify({
-                'success': False, 
-                'message': 'File tidak ditemukan dalam request',
-                'total_rows': 0,
-                'processed_rows': 0,
-                'results': []
-            }), 400
+            logger.error("❌ No file in request")
+            payload, status_code = file_error_response('File tidak ditemukan dalam request', 400)
+            return jsonify(payload), status_code
 
         file = request.files['file']
-        filename = file.filename.lower()
-        original_filename = file.filename
 
-        print(f"📊 Processing file: {original_filename}")
+        result_format = request.args.get('format', 'rows')
+        if result_format not in RESULT_FORMATS:
+            payload, status_code = file_error_response(
+                f'Format hasil tidak dikenal: {result_format} (pilihan: {", ".join(RESULT_FORMATS)})', 400
+            )
+            return jsonify(payload), status_code
+
+        # Mode streaming: Accept: application/x-ndjson
+        if NDJSON_MIMETYPE in request.headers.get('Accept', ''):
+            return stream_predict_file_ndjson(
+                iter_predict_file_pipeline(file, file.filename, user_id, result_format=result_format)
+            )
+
+        payload, status_code = run_predict_file_pipeline(
+            file, file.filename, user_id, result_format=result_format
+        )
+        return jsonify(payload), status_code
+
+    except Exception as e:
+        error_msg = str(e)
+        logger.exception("❌ Error dalam predict_file: %s", error_msg)
+
+        payload, status_code = file_error_response(error_msg, 500)
+        return jsonify(payload), status_code
+
+# =========================================================================
+# JOB MODE: /predict-file asinkron dengan progress polling
+# =========================================================================
+
+def job_state_path(job_id, kind='job'):
+    return os.path.join(JOB_UPLOAD_DIR, f'{job_id}.{kind}.json')
+
+def job_results_path(job_id):
+    return os.path.join(JOB_UPLOAD_DIR, f'{job_id}.results.ndjson')
+
+def save_job_state(job, kind='job'):
+    """
+    Tulis status job (ringkasan, tanpa hasil per baris) ke disk secara atomik.
+    `kind`: 'job' untuk /predict-file, 'delete' untuk job penghapusan prediksi.
+    """
+    os.makedirs(JOB_UPLOAD_DIR, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(prefix=f"{job['id']}.", suffix='.tmp', dir=JOB_UPLOAD_DIR)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as state_file:
+            json.dump(job, state_file)
+        os.replace(temp_path, job_state_path(job['id'], kind))
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    job_state_written[job['id']] = time.time()
+
+def load_job_state(job_id, kind='job'):
+    """
+    Status job dari disk (ditulis proses mana pun), None jika tidak ada atau job_id tidak valid
+    """
+    if not re.fullmatch(r'[0-9a-f]{32}', job_id):
+        return None
+    try:
+        with open(job_state_path(job_id, kind), encoding='utf-8') as state_file:
+            return json.load(state_file)
+    except (OSError, ValueError):
+        return None
+
+def iter_job_states(kind='job'):
+    """
+    Semua status job jenis `kind` yang tersimpan di JOB_UPLOAD_DIR
+    """
+    try:
+        names = os.listdir(JOB_UPLOAD_DIR)
+    except FileNotFoundError:
+        return
+    suffix = f'.{kind}.json'
+    for name in names:
+        if name.endswith(suffix):
+            job = load_job_state(name[:-len(suffix)], kind)
+            if job is not None:
+                yield job
+
+def cleanup_expired_jobs(kind='job'):
+    """
+    Hapus status (dan hasil) job yang selesai, atau berhenti diperbarui (mis. worker mati),
+    lebih dari JOB_RESULT_TTL detik lalu
+    """
+    now = time.time()
+    removed = 0
+    for job in list(iter_job_states(kind)):
+        if now - (job['finished_at'] or job['updated_at']) <= JOB_RESULT_TTL:
+            continue
+        for path in (job_state_path(job['id'], kind), job_results_path(job['id'])):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        removed += 1
+    if removed:
+        logger.info("🧹 Removed %s expired jobs", removed)
 
-        # Baca file dengan engine yang sesuai
+@contextmanager
+def job_submit_lock(name):
+    """
+    Kunci antarproses (flock pada file di JOB_UPLOAD_DIR) untuk cek-lalu-buat job, sehingga
+    aturan seperti satu job hapus aktif per user berlaku di semua worker gunicorn
+    """
+    os.makedirs(JOB_UPLOAD_DIR, exist_ok=True)
+    with open(os.path.join(JOB_UPLOAD_DIR, f'{name}.lock'), 'a') as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
         try:
-            read_start = time.time()
-            if filename.endswith('.csv'):
-                df = pd.read_csv(file)
-            elif filename.endswith('.xlsx'):
-                df = pd.read_excel(file, engine='openpyxl')
-            elif filename.endswith('.xls'):
-                df = pd.read_excel(file, engine='xlrd')
-            else:
-                error_msg = 'Format file tidak didukung (hanya .csv, .xlsx, .xls)'
-                return jsonify({
-                    'success': False, 
-                    'message': error_msg,
-                    'total_rows': 0,
-                    'processed_rows': 0,
-                    'results': []
-                }), 400
-            
-            read_time = time.time() - read_start
-            print(f"📊 File read completed in {read_time:.2f} seconds")
-            
-        except Exception as read_error:
-            error_msg = f'Error membaca file: {str(read_error)}'
-            print(f"❌ {error_msg}")
-            return jsonify({
-                'success': False, 
-                'message': error_msg,
-                'total_rows': 0,
-                'processed_rows': 0,
-                'results': []
-            }), 400
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
 
-        print(f"📊 Header asli: {list(df.columns)}")
-        
-        # Normalkan header
-        df = normalize_headers(df)
-        
-        print(f"📊 Header setelah normalisasi: {list(df.columns)}")
+def update_job_stage(job_id, stage, status, **info):
+    """
+    Callback progress pipeline: simpan status dan info setiap tahap ke job store. Progress
+    ditulis ke disk paling sering setiap JOB_STATE_WRITE_INTERVAL detik; perubahan status tahap
+    selalu ditulis.
+    """
+    with jobs_lock:
+        job = jobs.get(job_id)
+        if not job:
+            return
+        changed = job['stage'] != stage or job['stages'][stage]['status'] != status
+        job['stage'] = stage
+        job['stages'][stage]['status'] = status
+        if 'seconds' in info:
+            job['stages'][stage]['seconds'] = round(info['seconds'], 2)
+        if 'rows' in info:
+            job['stages'][stage]['rows'] = info['rows']
+        if 'done' in info:
+            job['stages'][stage]['done'] = info['done']
+        job['updated_at'] = time.time()
+        if changed or job['updated_at'] - job_state_written.get(job_id, 0) >= JOB_STATE_WRITE_INTERVAL:
+            save_job_state(job)
+
+def run_predict_file_job(job_id, file_path, original_filename, user_id, result_format='rows',
+                         file_hash=None, file_size=None):
+    """
+    Worker untuk executor: jalankan pipeline dari file sementara. Setiap blok hasil langsung
+    ditulis ke file hasil job (satu baris JSON per blok), sehingga hasil tidak pernah ditahan
+    di memori; yang disimpan di status job hanya ringkasannya.
+    """
+    request_id_var.set(f'job-{job_id[:12]}')
+    with jobs_lock:
+        jobs[job_id]['status'] = 'running'
+        jobs[job_id]['started_at'] = time.time()
+        save_job_state(jobs[job_id])
+
+    payload, status_code = None, None
+    try:
+        with open(file_path, 'rb') as file, open(job_results_path(job_id), 'w', encoding='utf-8') as results_file:
+            for event in iter_predict_file_pipeline(
+                file, original_filename, user_id,
+                progress=lambda stage, status, **info: update_job_stage(job_id, stage, status, **info),
+                result_format=result_format,
+                file_hash=file_hash,
+                file_size=file_size
+            ):
+                if event[0] == 'rows':
+                    # Hasil diteruskan apa adanya ke browser: NaN/Infinity ditulis sebagai null
+                    results_file.write(JSON_NON_FINITE_PATTERN.sub('null', json.dumps(event[1])) + '\n')
+                else:
+                    _, payload, status_code = event
+    except Exception as e:
+        logger.exception("❌ Error dalam job %s: %s", job_id, e)
+        payload, status_code = file_error_response(str(e), 500)
+    finally:
+        try:
+            os.remove(file_path)
+        except OSError:
+            pass
+
+    with jobs_lock:
+        job = jobs.pop(job_id)
+        job['status'] = 'completed' if payload.get('success') else 'failed'
+        job['status_code'] = status_code
+        job['summary'] = {key: value for key, value in payload.items() if key != 'results'}
+        job['finished_at'] = time.time()
+        job['updated_at'] = job['finished_at']
+        save_job_state(job)
+        job_state_written.pop(job_id, None)
+
+    logger.info("📊 Job %s %s (%s)", job_id, job['status'], status_code)
+
+def iter_job_results_json(summary, results_path, result_format, limit=None):
+    """
+    Body JSON hasil job (ringkasan + 'results') yang dirangkai per blok dari file hasil, tanpa
+    memuat seluruh hasil ke memori. Format columnar membaca file sekali per kolom.
+    `limit` membatasi jumlah baris hasil yang dikirim (ringkasan diberi is_limited).
+    """
+    processed_rows = summary.get('processed_rows') or 0
+    if limit is not None and processed_rows > limit:
+        summary = dict(
+            summary, is_limited=True, displayed_rows=limit,
+            message=f"{summary.get('message', '')} (Menampilkan {limit:,} baris pertama dari {processed_rows} total baris)"
+        )
+    yield json.dumps(summary)[:-1] + (', ' if summary else '') + '"results": '
+
+    def iter_blocks(key=None):
+        remaining = limit
+        with open(results_path, encoding='utf-8') as results_file:
+            for line in results_file:
+                if remaining is not None and remaining <= 0:
+                    break
+                if key is None and remaining is None:
+                    block = line.rstrip('\n')
+                else:
+                    values = json.loads(line)
+                    values = values[key] if key else values
+                    if remaining is not None:
+                        values = values[:remaining]
+                        remaining -= len(values)
+                    block = json.dumps(values)
+                if block != '[]':
+                    yield block[1:-1]
+
+    if result_format == 'columnar':
+        yield '{'
+        for position, key in enumerate(RESULT_COLUMNS):
+            yield (', ' if position else '') + json.dumps(key) + ': [' + ', '.join(iter_blocks(key)) + ']'
+        yield '}}'
+    else:
+        yield '['
+        for position, block in enumerate(iter_blocks()):
+            yield (', ' if position else '') + block
+        yield ']}'
+
+def job_status_payload(job):
+    """
+    Ringkasan status job tanpa hasil per baris (dari status job di disk)
+    """
+    now = job['finished_at'] or time.time()
+    payload = {
+        'job_id': job['id'],
+        'status': job['status'],
+        'stage': job['stage'],
+        'stages': job['stages'],
+        'filename': job['filename'],
+        'user_id': job['user_id'],
+        'created_at': datetime.fromtimestamp(job['created_at']).isoformat(),
+        'elapsed': round(now - (job['started_at'] or job['created_at']), 2)
+    }
+    if job['summary'] is not None:
+        result = job['summary']
+        payload['message'] = result.get('message')
+        payload['total_rows'] = result.get('total_rows', 0)
+        payload['processed_rows'] = result.get('processed_rows', 0)
+        payload['processing_time'] = result.get('processing_time')
+    return payload
+
+@app.route('/predict-file/jobs', methods=['POST'])
+def submit_predict_file_job():
+    """
+    Submit file sebagai job: upload disimpan ke disk lalu langsung dibalas job_id (202)
+    """
+    try:
+        cleanup_expired_jobs()
 
-        # Validasi kolom yang diperlukan
-        required_columns = ['snr'] + [f'p{i}' for i in range(1, 31)]
-        missing_cols = [col for col in required_columns if col not in df.columns]
-        
-        if missing_cols:
-            error_msg = f'Kolom berikut wajib ada: {missing_cols}'
-            print(f"❌ {error_msg}")
-            
-            return jsonify({
-                'success': False, 
-                'message': error_msg,
-                'available_columns': list(df.columns),
-                'total_rows': len(df),
-                'processed_rows': 0,
-                'results': []
-            }), 400
+        user_id = get_user_id_from_request(request)
 
-        # Filter hanya kolom yang diperlukan
-        df_filtered = df[required_columns].copy()
+        if 'file' not in request.files:
+            payload, status_code = file_error_response('File tidak ditemukan dalam request', 400)
+            return jsonify(payload), status_code
 
-        print(f"📊 Jumlah baris data: {len(df_filtered)}")
+        file = request.files['file']
+        original_filename = file.filename
+        if not original_filename.lower().endswith(('.csv', '.xlsx', '.xls')):
+            payload, status_code = file_error_response('Format file tidak didukung (hanya .csv, .xlsx, .xls)', 400)
+            return jsonify(payload), status_code
 
-        # PERBAIKAN: Data preprocessing untuk batch processing
-        preprocess_start = time.time()
-        
-        # Convert to numeric and handle missing values
-        df_filtered = df_filtered.apply(pd.to_numeric, errors='coerce').fillna(0)
-        
-        # Extract SNR values and input matrix
-        snr_values = df_filtered['snr'].values
-        input_columns = [f'p{i}' for i in range(1, 31)]
-        inputs_matrix = df_filtered[input_columns].values
-        
-        preprocess_time = time.time() - preprocess_start
-        print(f"📊 Data preprocessing completed in {preprocess_time:.2f} seconds")
+        result_format = request.args.get('format', 'rows')
+        if result_format not in RESULT_FORMATS:
+            payload, status_code = file_error_response(
+                f'Format hasil tidak dikenal: {result_format} (pilihan: {", ".join(RESULT_FORMATS)})', 400
+            )
+            return jsonify(payload), status_code
 
-        # PERBAIKAN: Optimized batch prediction
-        prediction_start = time.time()
-        
-        predictions, confidences, snr_normalized = predict_batch_optimized(
-            model, snr_scaler, snr_values, inputs_matrix
-        )
-        
-        if predictions is None:
+        with jobs_lock:
+            pending = sum(1 for job in jobs.values() if job['status'] in ('queued', 'running'))
+        if pending >= MAX_PENDING_JOBS:
             return jsonify({
                 'success': False,
-                'message': 'Error during batch prediction',
-                'total_rows': len(df_filtered),
-                'processed_rows': 0,
-                'results': []
-            }), 500
-        
-        prediction_time = time.time() - prediction_start
-        print(f"📊 Batch prediction completed in {prediction_time:.2f} seconds")
+                'message': f'Antrian job penuh ({pending} job aktif), coba lagi nanti'
+            }), 503
 
-        # PERBAIKAN: Format results efficiently
-        format_start = time.time()
-        
-        results = []
-        for idx in range(len(predictions)):
-            results.append({
-                'row': idx + 1,
-                'prediction': predictions[idx],
-                'confidence': round(float(confidences[idx]), 2),
-                'snr_raw': float(snr_values[idx]),
-                'snr_normalized': round(float(snr_normalized[idx]), 4)
-            })
-        
-        format_time = time.time() - format_start
-        print(f"📊 Results formatting completed in {format_time:.2f} seconds")
+        job_id = uuid.uuid4().hex
+        os.makedirs(JOB_UPLOAD_DIR, exist_ok=True)
+        file_path = os.path.join(JOB_UPLOAD_DIR, f"{job_id}{os.path.splitext(original_filename)[1].lower()}")
+        file_hash, file_size = save_upload_with_hash(file, file_path)
 
-        # PERBAIKAN: Optimized database insertion (optional, can be disabled for speed)
-        db_start = time.time()
-        
-        if user_id:
-            try:
-                # Prepare batch data for database insertion
-                next_prediction_number = get_next_prediction_number(user_id)
-                
-                predictions_data = []
-                for idx in range(len(predictions)):
-                    quality_assessment = 'High' if confidences[idx] > 80 else 'Medium' if confidences[idx] > 60 else 'Low'
-                    
-                    predictions_data.append((
-                        user_id,
-                        next_prediction_number + idx,
-                        float(snr_values[idx]),
-                        float(snr_normalized[idx]),
-                        json.dumps(inputs_matrix[idx].tolist()),
-                        str(predictions[idx]),
-                        float(confidences[idx]),
-                        quality_assessment,
-                        'Excel File',
-                        '2.0',
-                        datetime.now()
-                    ))
-                
-                # PERBAIKAN: Batch insert to database
-                batch_insert_success = batch_insert_predictions(user_id, predictions_data)
-                
-                if batch_insert_success:
-                    print(f"✅ Successfully saved {len(predictions_data)} predictions to database")
-                else:
-                    print("⚠️ Database insertion failed, but predictions completed")
-                    
-            except Exception as db_error:
-                print(f"❌ Database error (non-critical): {db_error}")
-        
-        db_time = time.time() - db_start
-        print(f"📊 Database operations completed in {db_time:.2f} seconds")
+        now = time.time()
+        with jobs_lock:
+            jobs[job_id] = {
+                'id': job_id,
+                'status': 'queued',
+                'stage': None,
+                'stages': {stage: {'status': 'pending'} for stage in PIPELINE_STAGES},
+                'filename': original_filename,
+                'user_id': user_id,
+                'created_at': now,
+                'started_at': None,
+                'finished_at': None,
+                'updated_at': now,
+                'status_code': None,
+                'result_format': result_format,
+                'summary': None
+            }
+            save_job_state(jobs[job_id])
 
-        # Calculate total processing time
-        total_time = time.time() - start_total_time
-        
-        # Response format
-        response_data = {
+        executor.submit(
+            run_predict_file_job, job_id, file_path, original_filename, user_id, result_format,
+            file_hash, file_size
+        )
+        logger.info("📤 Job %s queued for file %s (user %s)", job_id, original_filename, user_id)
+
+        return jsonify({
             'success': True,
-            'message': f'Berhasil memproses {len(results)} baris data dari file {original_filename} dalam {total_time:.2f} detik',
-            'total_rows': len(df_filtered),
-            'processed_rows': len(results),
-            'valid_rows': len(results),
-            'error_rows': 0,
-            'user_id': user_id,
-            'processing_time': {
-                'total': round(total_time, 2),
-                'file_read': round(read_time, 2),
-                'preprocessing': round(preprocess_time, 2),
-                'prediction': round(prediction_time, 2),
-                'formatting': round(format_time, 2),
-                'database': round(db_time, 2)
-            },
-            'results': results
-        }
-        
-        print(f"✅ Successfully processed {len(results)} rows for user {user_id} in {total_time:.2f} seconds")
-        print(f"📊 Performance breakdown:")
-        print(f"   - File reading: {read_time:.2f}s")
-        print(f"   - Preprocessing: {preprocess_time:.2f}s") 
-        print(f"   - Batch prediction: {prediction_time:.2f}s")
-        print(f"   - Results formatting: {format_time:.2f}s")
-        print(f"   - Database operations: {db_time:.2f}s")
-        
-        return jsonify(response_data), 200
+            'job_id': job_id,
+            'status': 'queued',
+            'status_url': f'/predict-file/jobs/{job_id}',
+            'results_url': f'/predict-file/jobs/{job_id}/results',
+            'message': 'File diterima dan sedang diantrikan untuk diproses'
+        }), 202
 
     except Exception as e:
-        error_msg = str(e)
-        print(f"❌ Error dalam predict_file: {error_msg}")
-        traceback.print_exc()
-        
+        logger.exception("❌ Error submitting job: %s", e)
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+def load_requested_job(job_id):
+    """
+    Status job /predict-file untuk request ini; None jika tidak ada atau bukan milik `userId`
+    (query parameter yang dikirim proxy Node dari token user)
+    """
+    job = load_job_state(job_id)
+    user_id = request.args.get('userId', type=int)
+    if not job or (user_id is not None and job['user_id'] != user_id):
+        return None
+    return job
+
+@app.route('/predict-file/jobs/<job_id>', methods=['GET'])
+def get_predict_file_job(job_id):
+    job = load_requested_job(job_id)
+    if not job:
+        return jsonify({'success': False, 'message': 'Job tidak ditemukan'}), 404
+
+    payload = job_status_payload(job)
+
+    payload['success'] = True
+    return jsonify(payload), 200
+
+@app.route('/predict-file/jobs/<job_id>/results', methods=['GET'])
+def get_predict_file_job_results(job_id):
+    job = load_requested_job(job_id)
+    if not job:
+        return jsonify({'success': False, 'message': 'Job tidak ditemukan'}), 404
+    status = job['status']
+
+    if status in ('queued', 'running'):
         return jsonify({
-            'success': False, 
-            'message': error_msg,
-            'total_rows': 0,
-            'processed_rows': 0,
-            'results': []
-        }), 500
+            'success': False,
+            'job_id': job_id,
+            'status': status,
+            'message': 'Job belum selesai'
+        }), 409
+
+    summary = dict(job['summary'], job_id=job_id, status=status)
+    if job['status_code'] != 200:
+        return jsonify(summary), job['status_code']
+    return Response(
+        iter_job_results_json(
+            summary, job_results_path(job_id), job['result_format'], request.args.get('limit', type=int)
+        ),
+        status=job['status_code'], mimetype='application/json'
+    )
 
 # PERBAIKAN: Single prediction tetap sama tapi dengan optimasi
 @app.route('/predict', methods=['POST'])
 def predict():
     conn = None
     cursor = None
+    start_time = time.perf_counter()
+    timings = {}
     try:
         data = request.get_json()
         
@@ -577,7 +4065,7 @@ def predict():
         inputs = data.get('inputs', [])
         input_type = data.get('inputType', 'Manual')
 
-        print(f"📊 Received prediction request for user: {user_id}")
+        logger.info("📊 Received prediction request for user: %s", user_id, extra=LOG_SAMPLED)
 
         # Validasi inputs
         if len(inputs) != 30:
@@ -585,67 +4073,91 @@ def predict():
 
         # Verifikasi user (opsional)
         if user_id:
+            stage_start = time.perf_counter()
             user_info = verify_user_exists(user_id)
+            timings['verify_user'] = time.perf_counter() - stage_start
             if not user_info:
                 return jsonify({'success': False, 'message': 'User tidak ditemukan'}), 404
 
-        # PERBAIKAN: Optimized single prediction
-        snr_array = np.array([[snr_raw]], dtype=np.float32)
-        snr_normalized = snr_scaler.transform(snr_array)[0][0]
-
-        features = np.array([[snr_normalized] + inputs], dtype=np.float32)
-        
-        # Single prediction
-        probabilities = model.predict_proba(features)
-        predicted_class = np.argmax(probabilities[0])
-        confidence = probabilities[0][predicted_class] * 100
-        prediction_label = PREDICTION_LABELS.get(predicted_class, "Unknown")
+        # PERBAIKAN: Single prediction lewat micro-batcher (digabung dengan request lain)
+        stage_start = time.perf_counter()
+        prediction_label, confidence, snr_normalized = predict_single(snr_raw, inputs)
+        timings['prediction'] = time.perf_counter() - stage_start
 
         # Simpan ke database jika diperlukan
         prediction_id = None
         prediction_number = None
         database_status = "not_saved"
+        stage_start = time.perf_counter()
         
-        if user_id:
+        if user_id and WRITE_BEHIND_ENABLED:
+            # Write-behind: tunggu writer paling lama WRITE_BEHIND_ACK_TIMEOUT_MS, setelah itu cukup 'queued'
+            item = enqueue_prediction_rows(user_id, [(
+                user_id,
+                None,
+                float(snr_raw),
+                float(snr_normalized),
+                pack_inputs_matrix([inputs])[0],
+                str(prediction_label),
+                float(confidence),
+                'High' if confidence > 80 else 'Medium' if confidence > 60 else 'Low',
+                input_type,
+                MODEL_VERSION,
+                datetime.now()
+            )], wait_timeout=WRITE_BEHIND_ACK_TIMEOUT_MS / 1000.0)
+            if item['done'].is_set():
+                prediction_id = item['id']
+                prediction_number = item['first_number']
+            database_status = item['status']
+
+        elif user_id:
             try:
-                prediction_number = get_next_prediction_number(user_id)
-                
                 conn = get_db_connection()
                 if conn:
+                    # Alokasi nomor dan insert memakai koneksi yang sama
+                    prediction_number = allocate_prediction_numbers(conn, user_id)
                     cursor = conn.cursor()
                     
                     quality_assessment = 'High' if confidence > 80 else 'Medium' if confidence > 60 else 'Low'
-                    
-                    cursor.execute("""
-                        INSERT INTO predictions (
-                            user_id, prediction_number, snr, snr_normalized, inputs, 
-                            prediction, confidence, quality_assessment, input_type, 
-                            model_version, created_at
-                        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    """, (
+                    prediction_row = (
                         user_id, 
                         prediction_number,
                         float(snr_raw), 
                         float(snr_normalized),
-                        json.dumps(inputs),
+                        pack_inputs_matrix([inputs])[0],
                         str(prediction_label), 
                         float(confidence),
                         quality_assessment,
                         input_type,
-                        '2.0',
+                        MODEL_VERSION,
                         datetime.now()
-                    ))
+                    )
+                    
+                    conn.start_transaction()
+                    cursor.execute("""
+                        INSERT INTO predictions (
+                            user_id, prediction_number, snr, snr_normalized, inputs_packed, 
+                            prediction, confidence, quality_assessment, input_type, 
+                            model_version, created_at
+                        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                    """, prediction_row)
                     
                     prediction_id = cursor.lastrowid
+                    update_prediction_summaries(cursor, [prediction_row])
                     conn.commit()
                     database_status = "saved"
                     
             except Exception as db_error:
-                print(f"❌ Database error: {db_error}")
+                logger.error("❌ Database error: %s", db_error)
                 database_status = f"error: {str(db_error)}"
             finally:
                 close_db_connection(conn, cursor)
 
+        if user_id:
+            timings['database'] = time.perf_counter() - stage_start
+        timings['total'] = time.perf_counter() - start_time
+        record_stage_metrics('predict', timings, rows=1)
+
         # Format parameters
         formatted_parameters = {}
         for i in range(30):
@@ -670,28 +4182,114 @@ def predict():
                 'input_type': input_type,
                 'model_info': {
                     'model_type': 'CatBoost',
-                    'version': '2.0'
+                    'version': MODEL_VERSION
                 },
-                'processing_time': '< 1s',
+                'processing_time': {stage: round(seconds, 4) for stage, seconds in timings.items()},
                 'database_status': database_status
             },
             'message': 'Prediksi berhasil'
         })
 
     except Exception as e:
-        print(f"❌ Error dalam predict: {str(e)}")
-        traceback.print_exc()
+        logger.exception("❌ Error dalam predict: %s", e)
         return jsonify({'success': False, 'message': str(e)}), 500
     finally:
         close_db_connection(conn, cursor)
 
+def encode_history_cursor(row):
+    """
+    Cursor opaque (base64url) berisi posisi keyset (created_at, id) baris terakhir halaman
+    """
+    payload = json.dumps([row['created_at'].isoformat(), row['id']], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+def decode_history_cursor(value):
+    try:
+        padded = value + '=' * (-len(value) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, TypeError):
+        raise ValueError('Cursor tidak valid')
+
+def parse_history_date(value, end_of_range=False):
+    """
+    Tanggal filter ISO (YYYY-MM-DD atau datetime). Tanggal tanpa jam sebagai batas akhir
+    mencakup seluruh hari tersebut.
+    """
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f'Format tanggal tidak valid: {value} (gunakan YYYY-MM-DD)')
+    if end_of_range and len(value) == 10:
+        parsed += timedelta(days=1)
+    return parsed
+
+def parse_history_query(args):
+    """
+    Validasi query history: limit, cursor, dan filter opsional prediction, quality, from, to.
+    Mengembalikan (limit, cursor, filters); ValueError untuk parameter yang tidak valid.
+    """
+    try:
+        limit = int(args.get('limit', HISTORY_DEFAULT_LIMIT))
+    except ValueError:
+        raise ValueError('limit harus berupa angka')
+    if limit <= 0:
+        raise ValueError('limit harus lebih dari 0')
+    limit = min(limit, HISTORY_MAX_LIMIT)
+
+    page_cursor = decode_history_cursor(args['cursor']) if args.get('cursor') else None
+    return limit, page_cursor, parse_history_filters(args)
+
+def parse_history_filters(args):
+    """
+    Filter opsional history/analytics: prediction, quality, from, to (ValueError jika tidak valid)
+    """
+    filters = {}
+    if args.get('prediction'):
+        filters['prediction'] = args['prediction']
+    if args.get('quality'):
+        quality = args['quality'].capitalize()
+        if quality not in QUALITY_LEVELS:
+            raise ValueError(f'quality harus salah satu dari {list(QUALITY_LEVELS)}')
+        filters['quality'] = quality
+    if args.get('from'):
+        filters['from'] = parse_history_date(args['from']).isoformat()
+    if args.get('to'):
+        filters['to'] = parse_history_date(args['to'], end_of_range=True).isoformat()
+    return filters
+
+def history_where_clause(user_id, filters, page_cursor=None):
+    """
+    WHERE untuk history; setiap kombinasi filter didukung index komposit
+    (user_id, [prediction|quality_assessment,] created_at, id) dari migrasi 003
+    """
+    clauses = ['user_id = %s']
+    params = [user_id]
+    if 'prediction' in filters:
+        clauses.append('prediction = %s')
+        params.append(filters['prediction'])
+    if 'quality' in filters:
+        clauses.append('quality_assessment = %s')
+        params.append(filters['quality'])
+    if 'from' in filters:
+        clauses.append('created_at >= %s')
+        params.append(datetime.fromisoformat(filters['from']))
+    if 'to' in filters:
+        clauses.append('created_at < %s')
+        params.append(datetime.fromisoformat(filters['to']))
+    if page_cursor:
+        created_at, row_id = page_cursor
+        clauses.append('(created_at < %s OR (created_at = %s AND id < %s))')
+        params.extend([created_at, created_at, row_id])
+    return ' AND '.join(clauses), params
+
 # PERBAIKAN: TAMBAHAN ENDPOINT HISTORY YANG HILANG
 @app.route('/predictions/<int:user_id>', methods=['GET'])
 def get_history(user_id):
     conn = None
     cursor = None
     try:
-        print(f"📊 Getting history for user ID: {user_id}")
+        logger.info("📊 Getting history for user ID: %s", user_id, extra=LOG_SAMPLED)
         
         # Validasi user_id
         if not user_id or user_id <= 0:
@@ -700,6 +4298,15 @@ def get_history(user_id):
                 'message': 'Invalid user ID'
             }), 400
         
+        try:
+            limit, page_cursor, filters = parse_history_query(request.args)
+        except ValueError as param_error:
+            return jsonify({
+                'success': False,
+                'message': str(param_error)
+            }), 400
+        include_archived = request.args.get('archived', '').lower() in ('1', 'true')
+
         conn = get_db_connection()
         if not conn:
             return jsonify({
@@ -709,46 +4316,41 @@ def get_history(user_id):
 
         cursor = conn.cursor(dictionary=True)
         
-        # PERBAIKAN: Query dengan error handling yang lebih baik
-        cursor.execute("""
+        # PERBAIKAN: Keyset pagination pada (created_at, id); halaman ke-N sama murahnya dengan halaman pertama
+        where_sql, params = history_where_clause(user_id, filters, page_cursor)
+        cursor.execute(f"""
             SELECT 
-                id, prediction_number, snr, snr_normalized, inputs,
+                id, prediction_number, snr, snr_normalized, inputs, inputs_packed,
                 prediction, confidence, quality_assessment, input_type,
                 model_version, created_at
             FROM predictions 
-            WHERE user_id = %s 
-            ORDER BY created_at DESC 
-            LIMIT 100
-        """, (user_id,))
+            WHERE {where_sql}
+            ORDER BY created_at DESC, id DESC
+            LIMIT %s
+        """, params + [limit + 1])
         
         results = cursor.fetchall()
-        print(f"📊 Found {len(results)} predictions for user {user_id}")
+
+        # Halaman dilanjutkan dari arsip Parquet jika tabel aktif sudah habis (archived=1)
+        if include_archived and len(results) <= limit:
+            results += read_archived_history(user_id, filters, page_cursor, limit + 1 - len(results))
+
+        has_more = len(results) > limit
+        results = results[:limit]
+        next_cursor = encode_history_cursor(results[-1]) if has_more else None
+        logger.debug("📊 Found %s predictions for user %s", len(results), user_id)
         
+        # Decode P1-P30 seluruh halaman sekaligus (blob float32 atau JSON lama)
+        parameters_matrix = unpack_inputs_column(
+            [result['inputs_packed'] for result in results],
+            [result['inputs'] for result in results]
+        ).tolist()
+
         # Format data untuk frontend
         formatted_results = []
-        for result in results:
+        for result, parameter_values in zip(results, parameters_matrix):
             try:
-                # Parse inputs JSON
-                inputs_data = []
-                if result['inputs']:
-                    try:
-                        inputs_data = json.loads(result['inputs'])
-                        if not isinstance(inputs_data, list):
-                            inputs_data = []
-                    except json.JSONDecodeError:
-                        inputs_data = []
-                
-                # Format parameters P1-P30
-                parameters = {}
-                for i in range(30):
-                    param_key = f'P{i+1}'
-                    if i < len(inputs_data):
-                        try:
-                            parameters[param_key] = float(inputs_data[i])
-                        except (ValueError, TypeError):
-                            parameters[param_key] = 0.0
-                    else:
-                        parameters[param_key] = 0.0
+                parameters = dict(zip(PARAMETER_KEYS, parameter_values))
                 
                 formatted_result = {
                     'id': result['id'],
@@ -760,26 +4362,33 @@ def get_history(user_id):
                     'parameters': parameters,
                     'quality_assessment': result['quality_assessment'] or 'N/A',
                     'input_type': result['input_type'] or 'Manual',
-                    'model_version': result['model_version'] or '2.0',
-                    'created_at': result['created_at'].isoformat() if result['created_at'] else None
+                    'model_version': result['model_version'] or MODEL_VERSION,
+                    'created_at': result['created_at'].isoformat() if result['created_at'] else None,
+                    'archived': result.get('archived', False)
                 }
                 formatted_results.append(formatted_result)
                 
             except Exception as format_error:
-                print(f"❌ Error formatting result {result.get('id', 'unknown')}: {format_error}")
+                logger.error("❌ Error formatting result %s: %s", result.get('id', 'unknown'), format_error)
                 continue
         
         return jsonify({
             'success': True,
             'data': formatted_results,
             'total_count': len(formatted_results),
+            'pagination': {
+                'limit': limit,
+                'has_more': has_more,
+                'next_cursor': next_cursor
+            },
+            'filters': filters,
+            'include_archived': include_archived,
             'user_id': user_id,
             'message': f'Found {len(formatted_results)} predictions'
         }), 200
 
     except Exception as e:
-        print(f"❌ Error getting history for user {user_id}: {str(e)}")
-        traceback.print_exc()
+        logger.exception("❌ Error getting history for user %s: %s", user_id, e)
         return jsonify({
             'success': False, 
             'message': f'Error retrieving history: {str(e)}'
@@ -796,66 +4405,583 @@ def get_user_history(user_id):
 # PERBAIKAN: Endpoint untuk cek apakah ada data history
 @app.route('/predictions/count/<int:user_id>', methods=['GET'])
 def get_predictions_count(user_id):
+    try:
+        # PERBAIKAN: Dibaca dari prediction_summaries (O(1)), bukan COUNT(*) atas seluruh history user
+        summary = get_prediction_summary(user_id)
+        if summary is None:
+            return jsonify({'success': False, 'message': 'Database connection failed'}), 500
+        
+        return jsonify({
+            'success': True,
+            'count': summary['count'],
+            'labels': summary['labels'],
+            'last_prediction_at': summary['last_prediction_at'],
+            'user_id': user_id,
+            'has_data': summary['count'] > 0
+        }), 200
+
+    except Exception as e:
+        logger.error("❌ Error getting count for user %s: %s", user_id, e)
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+@app.route('/predictions/analytics/<int:user_id>', methods=['GET'])
+def get_predictions_analytics(user_id):
+    """
+    Ringkasan history untuk dashboard: jumlah per label, histogram confidence (dan kualitas),
+    statistik + histogram SNR, serta time series harian. Dihitung dengan agregat GROUP BY di
+    MySQL pada index (user_id, created_at) sehingga yang dikirim hanya ringkasan, bukan baris.
+    Partisi yang sudah diarsipkan ikut dihitung dari Parquet agar total sama dengan /predictions/count;
+    'sources' memisahkan jumlah baris tabel aktif dan arsip.
+    Query: from, to, prediction, quality (sama dengan history), confidence_bin, snr_bin.
+    """
     conn = None
     cursor = None
     try:
+        start_time = time.time()
+        try:
+            filters = parse_history_filters(request.args)
+            confidence_bin = float(request.args.get('confidence_bin', ANALYTICS_CONFIDENCE_BIN))
+            snr_bin = float(request.args.get('snr_bin', ANALYTICS_SNR_BIN))
+        except ValueError as param_error:
+            return jsonify({'success': False, 'message': str(param_error)}), 400
+        if not (0 < confidence_bin <= 100) or snr_bin <= 0:
+            return jsonify({'success': False, 'message': 'confidence_bin harus 0-100 dan snr_bin harus lebih dari 0'}), 400
+
         conn = get_db_connection()
         if not conn:
             return jsonify({'success': False, 'message': 'Database connection failed'}), 500
 
         cursor = conn.cursor()
-        cursor.execute("SELECT COUNT(*) FROM predictions WHERE user_id = %s", (user_id,))
-        count_result = cursor.fetchone()
-        count = count_result[0] if count_result else 0
-        
-        return jsonify({
+        where_sql, params = history_where_clause(user_id, filters)
+
+        # Label per hari: sumber time series sekaligus total per label
+        cursor.execute(f"""
+            SELECT DATE(created_at) AS day, prediction, COUNT(*), SUM(confidence)
+            FROM predictions
+            WHERE {where_sql}
+            GROUP BY day, prediction
+            ORDER BY day
+        """, params)
+        daily_rows = cursor.fetchall()
+
+        cursor.execute(f"""
+            SELECT FLOOR(confidence / %s) AS bucket, quality_assessment, COUNT(*)
+            FROM predictions
+            WHERE {where_sql}
+            GROUP BY bucket, quality_assessment
+        """, [confidence_bin] + params)
+        confidence_rows = cursor.fetchall()
+
+        # Jumlah dan jumlah kuadrat per bucket cukup untuk mean/stddev keseluruhan
+        cursor.execute(f"""
+            SELECT FLOOR(snr / %s) AS bucket, COUNT(*), SUM(snr), SUM(snr * snr), MIN(snr), MAX(snr)
+            FROM predictions
+            WHERE {where_sql} AND snr IS NOT NULL
+            GROUP BY bucket
+            ORDER BY bucket
+        """, [snr_bin] + params)
+        snr_rows = cursor.fetchall()
+
+        hot_total = sum(row[2] for row in daily_rows)
+        archived_daily, archived_confidence, archived_snr = archived_analytics_rows(
+            user_id, filters, confidence_bin, snr_bin
+        )
+        analytics = summarize_prediction_analytics(
+            daily_rows + archived_daily, confidence_rows + archived_confidence, snr_rows + archived_snr,
+            confidence_bin, snr_bin
+        )
+        analytics.update({
             'success': True,
-            'count': count,
+            'sources': {'hot': hot_total, 'archived': sum(row[2] for row in archived_daily)},
             'user_id': user_id,
-            'has_data': count > 0
-        }), 200
+            'filters': filters,
+            'processing_time': round(time.time() - start_time, 4)
+        })
+        return jsonify(analytics), 200
 
     except Exception as e:
-        print(f"❌ Error getting count for user {user_id}: {str(e)}")
+        logger.exception("❌ Error getting analytics for user %s: %s", user_id, e)
         return jsonify({'success': False, 'message': str(e)}), 500
     finally:
         close_db_connection(conn, cursor)
 
-@app.route('/predictions/all/<int:user_id>', methods=['DELETE'])
-def delete_all_predictions(user_id):
+def summarize_prediction_analytics(daily_rows, confidence_rows, snr_rows, confidence_bin, snr_bin):
+    """
+    Susun hasil tiga query agregat analytics menjadi payload JSON. Baris dari beberapa sumber
+    (tabel aktif dan arsip) boleh berisi hari, label atau bucket SNR yang sama; nilainya dijumlahkan.
+    """
+    label_totals = {}
+    daily = OrderedDict()
+    for day, label, count, confidence_sum in daily_rows:
+        day_key = day.isoformat() if hasattr(day, 'isoformat') else str(day)
+        entry = daily.setdefault(day_key, {'date': day_key, 'total': 0, 'confidence_sum': 0.0, 'labels': {}})
+        entry['total'] += count
+        entry['confidence_sum'] += float(confidence_sum or 0)
+        entry['labels'][label] = entry['labels'].get(label, 0) + count
+        totals = label_totals.setdefault(label, [0, 0.0])
+        totals[0] += count
+        totals[1] += float(confidence_sum or 0)
+
+    total = sum(count for count, _ in label_totals.values())
+    labels = [
+        {
+            'label': label,
+            'count': count,
+            'percentage': round(count * 100.0 / total, 2) if total else 0.0,
+            'avg_confidence': round(confidence_sum / count, 2) if count else 0.0
+        }
+        for label, (count, confidence_sum) in sorted(label_totals.items(), key=lambda item: -item[1][0])
+    ]
+    for entry in daily.values():
+        entry['avg_confidence'] = round(entry.pop('confidence_sum') / entry['total'], 2) if entry['total'] else 0.0
+
+    # Confidence 0-100: bucket terakhir mencakup nilai 100
+    bucket_count = max(1, int(np.ceil(100 / confidence_bin)))
+    confidence_counts = [0] * bucket_count
+    quality = {level: 0 for level in QUALITY_LEVELS}
+    for bucket, quality_assessment, count in confidence_rows:
+        index = min(max(int(bucket or 0), 0), bucket_count - 1)
+        confidence_counts[index] += count
+        quality[quality_assessment or 'N/A'] = quality.get(quality_assessment or 'N/A', 0) + count
+
+    snr_buckets = {}
+    for bucket, count, bucket_sum, bucket_square_sum, bucket_min, bucket_max in snr_rows:
+        merged = snr_buckets.setdefault(int(bucket), [0, 0.0, 0.0, float(bucket_min), float(bucket_max)])
+        merged[0] += count
+        merged[1] += float(bucket_sum or 0)
+        merged[2] += float(bucket_square_sum or 0)
+        merged[3] = min(merged[3], float(bucket_min))
+        merged[4] = max(merged[4], float(bucket_max))
+    snr_buckets = sorted(snr_buckets.items())
+
+    snr_count = sum(merged[0] for _, merged in snr_buckets)
+    snr_sum = sum(merged[1] for _, merged in snr_buckets)
+    snr_square_sum = sum(merged[2] for _, merged in snr_buckets)
+    snr_mean = snr_sum / snr_count if snr_count else 0.0
+
+    return {
+        'total': total,
+        'labels': labels,
+        'quality': quality,
+        'confidence_histogram': {
+            'bin_width': confidence_bin,
+            'bins': [
+                {'min': round(idx * confidence_bin, 4), 'max': round(min((idx + 1) * confidence_bin, 100), 4), 'count': count}
+                for idx, count in enumerate(confidence_counts)
+            ]
+        },
+        'snr': {
+            'count': snr_count,
+            'min': min(merged[3] for _, merged in snr_buckets) if snr_buckets else None,
+            'max': max(merged[4] for _, merged in snr_buckets) if snr_buckets else None,
+            'mean': round(snr_mean, 4),
+            'stddev': round(float(np.sqrt(max(snr_square_sum / snr_count - snr_mean ** 2, 0.0))), 4) if snr_count else 0.0,
+            'histogram': {
+                'bin_width': snr_bin,
+                'bins': [
+                    {'min': round(bucket * snr_bin, 4), 'max': round((bucket + 1) * snr_bin, 4), 'count': merged[0]}
+                    for bucket, merged in snr_buckets
+                ]
+            }
+        },
+        'daily': sorted(daily.values(), key=lambda entry: entry['date'])
+    }
+
+# =========================================================================
+# DELETE JOB: hapus semua prediksi user per chunk di background
+# =========================================================================
+
+def run_delete_predictions_job(job_id, user_id):
+    """
+    Worker untuk delete_executor: hapus prediksi user per DELETE_CHUNK_ROWS baris, masing-masing dalam
+    transaksi pendek (lock dan undo log tetap kecil, insert user lain tidak tertahan), dengan
+    jeda DELETE_CHUNK_PAUSE_MS antar chunk. Summary dikurangi di transaksi chunk yang sama.
+    Hanya baris yang sudah ada saat job dimulai (id <= MAX(id)) yang dihapus. Chunk diambil urut
+    id lewat idx_user_id_id (migrasi 007) sehingga lock baris yang diambil deterministik.
+    """
+    request_id_var.set(f'job-{job_id[:12]}')
+    with delete_jobs_lock:
+        job = delete_jobs[job_id]
+        job['status'] = 'running'
+        job['started_at'] = job['updated_at'] = time.time()
+        save_job_state(job, 'delete')
+
     conn = None
     cursor = None
+    deleted_count = 0
+    error_message = None
     try:
-        print(f"🗑️ Deleting all predictions for user: {user_id}")
-        
         conn = get_db_connection()
         if not conn:
-            return jsonify({'success': False, 'message': 'Koneksi database gagal'}), 500
+            raise RuntimeError('Koneksi database gagal')
 
         cursor = conn.cursor()
-        
-        cursor.execute("SELECT COUNT(*) FROM predictions WHERE user_id = %s", (user_id,))
-        count_result = cursor.fetchone()
-        deleted_count = count_result[0] if count_result else 0
-        
-        cursor.execute("DELETE FROM predictions WHERE user_id = %s", (user_id,))
+
+        # Status excel_inputs tidak diubah: dedup memproses ulang upload yang prediksinya sudah
+        # tidak lengkap (lihat find_upload_by_hash)
+        cursor.execute("SELECT MAX(id) FROM predictions WHERE user_id = %s", (user_id,))
+        row = cursor.fetchone()
+        max_id = row[0] if row else None
+
+        while max_id is not None:
+            conn.start_transaction()
+            cursor.execute("""
+                SELECT id, prediction FROM predictions
+                WHERE user_id = %s AND id <= %s
+                ORDER BY id
+                LIMIT %s
+                FOR UPDATE
+            """, (user_id, max_id, DELETE_CHUNK_ROWS))
+            rows = cursor.fetchall()
+            if not rows:
+                conn.commit()
+                break
+
+            placeholders = ', '.join(['%s'] * len(rows))
+            cursor.execute(f"DELETE FROM predictions WHERE id IN ({placeholders})", [r[0] for r in rows])
+
+            labels = {}
+            for _, label in rows:
+                labels[(user_id, label)] = labels.get((user_id, label), 0) - 1
+            apply_prediction_summary_delta(cursor, {user_id: (-len(rows), None)}, labels)
+            conn.commit()
+
+            deleted_count += len(rows)
+            with delete_jobs_lock:
+                job = delete_jobs[job_id]
+                job['deleted_count'] = deleted_count
+                job['chunks'] += 1
+                job['updated_at'] = time.time()
+                if job['updated_at'] - job_state_written.get(job_id, 0) >= JOB_STATE_WRITE_INTERVAL:
+                    save_job_state(job, 'delete')
+
+            if len(rows) < DELETE_CHUNK_ROWS:
+                break
+            if DELETE_CHUNK_PAUSE_MS > 0:
+                time.sleep(DELETE_CHUNK_PAUSE_MS / 1000.0)
+
+        # Baris yang sudah diarsipkan ke Parquet ikut dihapus dari file arsip
+        archived_labels = purge_user_from_archive(user_id)
+        if archived_labels:
+            archived_count = sum(archived_labels.values())
+            conn.start_transaction()
+            apply_prediction_summary_delta(
+                cursor,
+                {user_id: (-archived_count, None)},
+                {(user_id, label): -count for label, count in archived_labels.items()}
+            )
+            conn.commit()
+            deleted_count += archived_count
+
+        # Summary dan counter nomor prediksi direset hanya jika tidak ada prediksi baru
+        # yang masuk selama penghapusan berjalan
+        conn.start_transaction()
+        cursor.execute("SELECT id FROM predictions WHERE user_id = %s LIMIT 1", (user_id,))
+        if cursor.fetchone() is None:
+            cursor.execute("DELETE FROM prediction_label_counts WHERE user_id = %s", (user_id,))
+            cursor.execute("DELETE FROM prediction_summaries WHERE user_id = %s", (user_id,))
+            cursor.execute("DELETE FROM prediction_counters WHERE user_id = %s", (user_id,))
         conn.commit()
-        
-        print(f"✅ Deleted {deleted_count} predictions for user {user_id}")
 
-        return jsonify({
-            'success': True,
-            'message': f'Berhasil menghapus {deleted_count} prediksi.',
-            'deleted_count': deleted_count
-        }), 200
+        logger.info("✅ Deleted %s predictions for user %s (job %s)", deleted_count, user_id, job_id)
 
     except Exception as e:
-        print(f"❌ Error deleting all predictions for user {user_id}: {str(e)}")
-        traceback.print_exc()
-        return jsonify({'success': False, 'message': str(e)}), 500
+        error_message = str(e)
+        logger.exception("❌ Error deleting all predictions for user %s: %s", user_id, error_message)
+        if conn:
+            try:
+                conn.rollback()
+            except Exception:
+                pass
     finally:
         close_db_connection(conn, cursor)
 
+    with delete_jobs_lock:
+        job = delete_jobs.pop(job_id)
+        job['status'] = 'failed' if error_message else 'completed'
+        job['error'] = error_message
+        job['deleted_count'] = deleted_count
+        job['finished_at'] = time.time()
+        job['updated_at'] = job['finished_at']
+        save_job_state(job, 'delete')
+        job_state_written.pop(job_id, None)
+
+def delete_job_status_payload(job):
+    """
+    Ringkasan status dan progress job penghapusan
+    """
+    now = job['finished_at'] or time.time()
+    total = job['estimated_total']
+    if job['status'] == 'completed':
+        progress = 100.0
+    elif total:
+        progress = round(min(job['deleted_count'] / total, 1.0) * 100, 1)
+    else:
+        progress = 0.0
+
+    payload = {
+        'job_id': job['id'],
+        'status': job['status'],
+        'user_id': job['user_id'],
+        'deleted_count': job['deleted_count'],
+        'estimated_total': total,
+        'progress': progress,
+        'chunks': job['chunks'],
+        'chunk_rows': DELETE_CHUNK_ROWS,
+        'created_at': datetime.fromtimestamp(job['created_at']).isoformat(),
+        'elapsed': round(now - (job['started_at'] or job['created_at']), 2)
+    }
+    if job['status'] == 'completed':
+        payload['message'] = f"Berhasil menghapus {job['deleted_count']} prediksi."
+    elif job['status'] == 'failed':
+        payload['message'] = job['error']
+    return payload
+
+def new_delete_job(user_id):
+    """
+    Buat job penghapusan baru (status 'queued'), simpan di memori proses ini dan di disk
+    """
+    summary = get_prediction_summary(user_id)
+    now = time.time()
+    job = {
+        'id': uuid.uuid4().hex,
+        'status': 'queued',
+        'user_id': user_id,
+        'deleted_count': 0,
+        'estimated_total': summary['count'] if summary else None,
+        'chunks': 0,
+        'error': None,
+        'created_at': now,
+        'started_at': None,
+        'finished_at': None,
+        'updated_at': now
+    }
+    with delete_jobs_lock:
+        delete_jobs[job['id']] = job
+        save_job_state(job, 'delete')
+    return job
+
+@app.route('/predictions/all/<int:user_id>', methods=['DELETE'])
+def delete_all_predictions(user_id):
+    """
+    PERBAIKAN: Penghapusan berjalan sebagai job background per chunk; langsung dibalas
+    job handle (202). Job yang masih aktif untuk user yang sama (di worker mana pun) dikembalikan
+    apa adanya; status job disimpan di JOB_UPLOAD_DIR agar polling bisa dijawab worker mana pun.
+    """
+    try:
+        logger.info("🗑️ Deleting all predictions for user: %s", user_id)
+
+        cleanup_expired_jobs('delete')
+
+        with job_submit_lock('delete-jobs'):
+            now = time.time()
+            active = next((
+                job for job in iter_job_states('delete')
+                if job['user_id'] == user_id and job['status'] in ('queued', 'running')
+                and now - job['updated_at'] <= DELETE_JOB_STALE_SECONDS
+            ), None)
+
+            job = active or new_delete_job(user_id)
+
+        if not active:
+            delete_executor.submit(run_delete_predictions_job, job['id'], user_id)
+            logger.info("📥 Delete job %s queued for user %s (estimasi %s baris)", job['id'], user_id, job['estimated_total'])
+
+        payload = delete_job_status_payload(job)
+
+        payload.update({
+            'success': True,
+            'message': 'Penghapusan prediksi sedang diproses',
+            'status_url': f"/predictions/delete-jobs/{job['id']}"
+        })
+        return jsonify(payload), 202
+
+    except Exception as e:
+        logger.exception("❌ Error deleting all predictions for user %s: %s", user_id, e)
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+@app.route('/predictions/delete-jobs/<job_id>', methods=['GET'])
+def get_delete_predictions_job(job_id):
+    user_id = request.args.get('userId', type=int)
+
+    job = load_job_state(job_id, 'delete')
+    if not job or (user_id is not None and job['user_id'] != user_id):
+        return jsonify({'success': False, 'message': 'Job tidak ditemukan'}), 404
+
+    payload = delete_job_status_payload(job)
+
+    payload['success'] = payload['status'] != 'failed'
+    return jsonify(payload), 200
+
+# =========================================================================
+# METRICS: histogram/counter in-process, diekspor dalam format teks Prometheus di /metrics
+# =========================================================================
+
+def metric_key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+def observe_metric(name, value, **labels):
+    """
+    Catat satu observasi ke histogram `name` (bucket dari METRIC_DEFINITIONS)
+    """
+    buckets = METRIC_DEFINITIONS[name][2]
+    key = metric_key(name, labels)
+    with metrics_lock:
+        series = metrics_histograms.get(key)
+        if series is None:
+            series = metrics_histograms[key] = {'buckets': [0] * len(buckets), 'sum': 0.0, 'count': 0}
+        for idx, bound in enumerate(buckets):
+            if value <= bound:
+                series['buckets'][idx] += 1
+                break
+        series['sum'] += value
+        series['count'] += 1
+
+def increment_metric(name, amount=1, **labels):
+    key = metric_key(name, labels)
+    with metrics_lock:
+        metrics_counters[key] = metrics_counters.get(key, 0) + amount
+
+def format_metric_labels(labels):
+    if not labels:
+        return ''
+    escaped = (
+        (key, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for key, value in labels
+    )
+    return '{' + ','.join(f'{key}="{value}"' for key, value in escaped) + '}'
+
+def format_metric_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def collect_gauge_metrics():
+    """
+    Nilai sesaat yang dibaca dari state yang sudah ada (pool, cache, write-behind, micro-batch)
+    saat /metrics di-scrape: [(name, labels, value)]
+    """
+    pool = db_pool_info()
+    cache = prediction_cache_info()
+    write_behind = write_behind_info()
+    return [
+        ('optipredict_db_pool_connections', (('state', 'in_use'),), pool['in_use']),
+        ('optipredict_db_pool_connections', (('state', 'idle'),), pool['idle']),
+        ('optipredict_db_pool_max_connections', (), pool['max_size']),
+        ('optipredict_db_pool_waiters', (), pool['waiters']),
+        ('optipredict_db_pool_timeouts_total', (), pool['timeouts']),
+        ('optipredict_db_pool_rejected_total', (), pool['rejected']),
+        ('optipredict_prediction_cache_lookups_total', (('result', 'hit'),), cache['hits']),
+        ('optipredict_prediction_cache_lookups_total', (('result', 'miss'),), cache['misses']),
+        ('optipredict_prediction_cache_hit_ratio', (), cache['hit_rate']),
+        ('optipredict_prediction_cache_entries', (), cache['entries']),
+        ('optipredict_write_behind_pending_rows', (), write_behind['pending_rows']),
+        ('optipredict_write_behind_journaled_rows_total', (), write_behind['journaled_rows']),
+        ('optipredict_microbatch_items_total', (), microbatch_stats['items']),
+        ('optipredict_microbatch_batches_total', (), microbatch_stats['batches']),
+        ('optipredict_model_loaded', (), int(model is not None))
+    ]
+
+def render_metrics():
+    """
+    Seluruh metrik dalam format teks Prometheus 0.0.4
+    """
+    with metrics_lock:
+        histograms = {key: dict(series, buckets=list(series['buckets'])) for key, series in metrics_histograms.items()}
+        counters = dict(metrics_counters)
+
+    series_by_name = {}
+    for (name, labels), series in histograms.items():
+        series_by_name.setdefault(name, []).append((labels, series))
+    for (name, labels), value in counters.items():
+        series_by_name.setdefault(name, []).append((labels, value))
+    for name, labels, value in collect_gauge_metrics():
+        series_by_name.setdefault(name, []).append((labels, value))
+
+    lines = []
+    for name in sorted(series_by_name):
+        metric_type, help_text, buckets = METRIC_DEFINITIONS[name]
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {metric_type}')
+        for labels, value in sorted(series_by_name[name], key=lambda item: item[0]):
+            if metric_type != 'histogram':
+                lines.append(f'{name}{format_metric_labels(labels)} {format_metric_value(value)}')
+                continue
+            cumulative = 0
+            for bound, count in zip(buckets + (float('inf'),), value['buckets'] + [value['count'] - sum(value['buckets'])]):
+                cumulative += count
+                bucket_labels = labels + (('le', format_metric_value(float(bound))),)
+                lines.append(f'{name}_bucket{format_metric_labels(bucket_labels)} {cumulative}')
+            lines.append(f'{name}_sum{format_metric_labels(labels)} {format_metric_value(value["sum"])}')
+            lines.append(f'{name}_count{format_metric_labels(labels)} {value["count"]}')
+    return '\n'.join(lines) + '\n'
+
+def record_stage_metrics(endpoint, timings, rows=None):
+    """
+    Histogram durasi per tahap satu request (`timings` {stage: detik}, termasuk 'total'),
+    serta jumlah baris dan throughput baris/detik jika `rows` diberikan
+    """
+    for stage, seconds in timings.items():
+        observe_metric('optipredict_stage_duration_seconds', seconds, endpoint=endpoint, stage=stage)
+    if rows:
+        increment_metric('optipredict_rows_processed_total', rows, endpoint=endpoint)
+        if timings.get('total'):
+            observe_metric('optipredict_throughput_rows_per_second', rows / timings['total'], endpoint=endpoint)
+
+def init_background_services():
+    """
+    Jalankan layanan latar sekali per proses (aman setelah fork worker gunicorn): worker retensi
+    (partisi bulan mendatang + arsip), serta writer write-behind beserta replay journal jika
+    write-behind aktif atau masih ada journal tersisa.
+    Dipanggil hook post_worker_init gunicorn (gunicorn.conf.py), __main__, dan sebagai
+    cadangan di awal request pertama.
+    """
+    if background_services_state['pid'] == os.getpid():
+        return
+    background_services_state['pid'] = os.getpid()
+
+    ensure_retention_worker()
+    if WRITE_BEHIND_ENABLED or (os.path.isdir(WRITE_BEHIND_JOURNAL_DIR) and os.listdir(WRITE_BEHIND_JOURNAL_DIR)):
+        ensure_write_behind_writers()
+
+@app.before_request
+def ensure_background_services():
+    init_background_services()
+
+@app.before_request
+def start_request_timer():
+    g.request_started_at = time.perf_counter()
+    g.request_id_token = request_id_var.set(request.headers.get('X-Request-ID') or uuid.uuid4().hex[:16])
+
+@app.teardown_request
+def reset_request_id(exception=None):
+    token = g.pop('request_id_token', None)
+    if token is not None:
+        request_id_var.reset(token)
+
+@app.after_request
+def record_request_metrics(response):
+    """
+    Jumlah dan latensi setiap request per rute (untuk response streaming: sampai header dikirim)
+    """
+    started_at = g.get('request_started_at')
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    if started_at is not None:
+        observe_metric(
+            'optipredict_http_request_duration_seconds', time.perf_counter() - started_at,
+            endpoint=endpoint, method=request.method
+        )
+    increment_metric(
+        'optipredict_http_requests_total',
+        endpoint=endpoint, method=request.method, status=response.status_code
+    )
+    response.headers['X-Request-ID'] = request_id_var.get()
+    return response
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/health', methods=['GET'])
 def health_check():
     return jsonify({
@@ -863,15 +4989,48 @@ def health_check():
         'status': 'healthy',
         'model_loaded': model is not None,
         'scaler_loaded': snr_scaler is not None,
+        'snr_transform': dict(snr_transform_state),
         'database': 'XAMPP MySQL',
         'optimization': 'Batch Processing Enabled',
+        'inference': {
+            'backend': INFERENCE_BACKEND,
+            'workers': get_inference_workers(),
+            'thread_count': CATBOOST_THREADS_PER_SHARD,
+            'min_shard_rows': INFERENCE_MIN_SHARD_ROWS,
+            'compiled_model': compiled_model_info()
+        },
+        'prediction_cache': prediction_cache_info(),
+        'database_pool': db_pool_info(),
+        'logging': {
+            'level': logging.getLevelName(logger.level),
+            'format': LOG_FORMAT,
+            'sample_every': LOG_SAMPLE_EVERY,
+            'dropped': log_state['dropped']
+        },
+        'write_behind': write_behind_info(),
+        'retention': retention_info(),
+        'microbatch': {
+            'enabled': MICROBATCH_ENABLED,
+            'max_wait_ms': MICROBATCH_MAX_WAIT_MS,
+            'max_size': MICROBATCH_MAX_SIZE,
+            'batches': microbatch_stats['batches'],
+            'items': microbatch_stats['items'],
+            'avg_batch_size': round(microbatch_stats['items'] / microbatch_stats['batches'], 2) if microbatch_stats['batches'] else 0,
+            'max_batch_size': microbatch_stats['max_batch_size']
+        },
         'endpoints': [
             '/predict-file (POST)',
+            '/predict-file/jobs (POST)',
+            '/predict-file/jobs/<job_id> (GET)',
+            '/predict-file/jobs/<job_id>/results (GET)',
             '/predict (POST)', 
             '/predictions/<user_id> (GET)',
             '/history/<user_id> (GET)',
             '/predictions/count/<user_id> (GET)',
+            '/predictions/analytics/<user_id> (GET)',
             '/predictions/all/<user_id> (DELETE)',
+            '/predictions/delete-jobs/<job_id> (GET)',
+            '/metrics (GET)',
             '/health (GET)'
         ],
         'timestamp': datetime.now().isoformat()
@@ -927,7 +5086,11 @@ if __name__ == '__main__':
     pool_initialized = init_connection_pool()
     if not pool_initialized:
         print("❌ Warning: Connection pool initialization failed")
-    
+
+    # SIGTERM -> SystemExit agar hook atexit (flush write-behind) tetap berjalan
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    init_background_services()
+
     model_loaded = load_model_and_scaler()
     if model_loaded:
         print("✅ Model dan scaler siap digunakan")
@@ -937,17 +5100,37 @@ if __name__ == '__main__':
     print("📡 OPTIMIZED Server akan berjalan di: http://localhost:5001")
     print("🚀 OPTIMIZATIONS ENABLED:")
     print("   - Vectorized batch predictions")
+    print(f"   - Sharded inference: {INFERENCE_BACKEND} x {get_inference_workers()} workers "
+          f"(thread_count={CATBOOST_THREADS_PER_SHARD})")
+    print(f"   - Inference engine: {INFERENCE_ENGINE} (compiled model: {compiled_model_state['status']}, "
+          f"batch <= {COMPILED_MODEL_MAX_ROWS} baris)")
+    if PREDICTION_CACHE_ENABLED:
+        print(f"   - Prediction cache: {prediction_cache_max_entries()} entries, TTL {PREDICTION_CACHE_TTL}s, "
+              f"batch <= {PREDICTION_CACHE_MAX_BATCH_ROWS} baris")
+    if MICROBATCH_ENABLED:
+        print(f"   - /predict micro-batching: max {MICROBATCH_MAX_SIZE} items / {MICROBATCH_MAX_WAIT_MS} ms")
+    print(f"   - Connection pool: max {DB_POOL_SIZE} koneksi, antrian {DB_POOL_MAX_WAITERS} waiter / {DB_POOL_WAIT_TIMEOUT}s")
     print("   - Optimized database batch inserts")
-    print("   - Memory-efficient data processing")
+    if WRITE_BEHIND_ENABLED:
+        print(f"   - Write-behind persistence: {WRITE_BEHIND_WRITERS} writers, journal di {WRITE_BEHIND_JOURNAL_DIR}")
+    if PREDICTION_RETENTION_MONTHS > 0:
+        print(f"   - Retensi predictions: {PREDICTION_RETENTION_MONTHS} bulan, arsip Parquet di {PREDICTION_ARCHIVE_DIR}")
+    print("   - Memory-efficient data processing (chunked file ingestion)")
     print("   - Performance monitoring")
     print("📊 Expected performance: 125K rows in <5 minutes")
     print("📋 Available endpoints:")
     print("   - POST /predict-file (batch prediction)")
+    print("   - POST /predict-file/jobs (async batch prediction job)")
+    print("   - GET /predict-file/jobs/<job_id> (job status & progress)")
+    print("   - GET /predict-file/jobs/<job_id>/results (job results)")
     print("   - POST /predict (single prediction)")
-    print("   - GET /predictions/<user_id> (history)")
+    print("   - GET /predictions/<user_id> (history, ?archived=1 termasuk arsip)")
     print("   - GET /history/<user_id> (alternative history)")
     print("   - GET /predictions/count/<user_id> (count)")
-    print("   - DELETE /predictions/all/<user_id> (delete all)")
+    print("   - GET /predictions/analytics/<user_id> (aggregated analytics)")
+    print("   - DELETE /predictions/all/<user_id> (background delete job)")
+    print("   - GET /predictions/delete-jobs/<job_id> (delete job progress)")
+    print("   - GET /metrics (Prometheus metrics)")
     print("   - GET /health (health check)")
     print("   - GET /test-db (database test)")
     
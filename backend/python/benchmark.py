@@ -0,0 +1,601 @@
+"""
+Benchmark end-to-end ML service: /predict-file (CSV/XLSX sintetis) dan /predict lewat
+Flask test client, tanpa server HTTP maupun MySQL sungguhan.
+
+Tahap database dijalankan terhadap SQLite stand-in (default) yang menerjemahkan dialek
+MySQL yang dipakai app.py, atau terhadap MySQL lokal (--db mysql, memakai DB_CONFIG).
+Hasil per skenario (timing per tahap, rows/sec, peak RSS) ditulis ke laporan JSON;
+dengan --baseline laporan dibandingkan dengan laporan sebelumnya dan exit code 1
+jika ada metrik yang memburuk melebihi --tolerance.
+
+Contoh:
+    python benchmark.py --rows 50000 --output bench_baseline.json
+    python benchmark.py --rows 50000 --output bench_new.json --baseline bench_baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import resource
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+BENCH_USER_ID = 1
+FEATURE_COLUMNS = ['SNR'] + [f'P{i}' for i in range(1, 31)]
+REPORT_VERSION = 1
+
+# Selisih absolut minimum agar perubahan dianggap regresi (menghindari noise run pendek)
+COMPARE_NOISE_FLOOR = {'seconds': 0.01, 'rows_per_sec': 0, 'peak_rss_mb': 5.0}
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY, name TEXT, email TEXT
+);
+CREATE TABLE IF NOT EXISTS predictions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INT, prediction_number INT,
+    snr REAL, snr_normalized REAL, inputs TEXT, inputs_packed BLOB, prediction TEXT,
+    confidence REAL, quality_assessment TEXT, input_type TEXT, model_version TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, excel_input_id INT
+);
+CREATE INDEX IF NOT EXISTS idx_predictions_user_created ON predictions (user_id, created_at, id);
+CREATE TABLE IF NOT EXISTS excel_inputs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INT, original_filename TEXT, file_hash TEXT,
+    model_version TEXT, file_size_bytes INT, total_rows INT, valid_rows INT, processed_rows INT,
+    excel_data TEXT, status TEXT DEFAULT 'uploaded', error_message TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, processed_at TIMESTAMP,
+    UNIQUE (user_id, file_hash, model_version)
+);
+CREATE TABLE IF NOT EXISTS prediction_counters (
+    user_id INT PRIMARY KEY, last_number INT NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS prediction_summaries (
+    user_id INT PRIMARY KEY, total_count INT NOT NULL DEFAULT 0, last_prediction_at TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS prediction_label_counts (
+    user_id INT NOT NULL, prediction TEXT NOT NULL, prediction_count INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, prediction)
+);
+"""
+
+# =========================================================================
+# SQLITE STAND-IN: koneksi mirip mysql-connector di atas file SQLite
+# =========================================================================
+
+COUNTER_UPSERT_PATTERN = re.compile(r'LAST_INSERT_ID\(\s*last_number\s*\+\s*%s\s*\)')
+
+def translate_mysql_sql(sql):
+    """
+    Terjemahkan dialek MySQL yang dipakai app.py ke SQLite
+    """
+    sql = re.sub(
+        r'TIMESTAMPDIFF\(SECOND,\s*(\w+),\s*NOW\(\)\)',
+        r"CAST((julianday('now') - julianday(\1)) * 86400 AS INTEGER)", sql
+    )
+    sql = re.sub(r'VALUES\((\w+)\)', r'excluded.\1', sql)
+    sql = sql.replace('ON DUPLICATE KEY UPDATE', 'ON CONFLICT DO UPDATE SET')
+    sql = sql.replace('GREATEST(', 'MAX(').replace('FOR UPDATE', '').replace('NOW()', 'CURRENT_TIMESTAMP')
+    return sql.replace('%s', '?')
+
+class SqliteCursor:
+    def __init__(self, connection, dictionary=False):
+        self._cursor = connection.db.cursor()
+        self._dictionary = dictionary
+        self._lastrowid = None
+
+    def execute(self, sql, params=()):
+        import mysql.connector
+
+        self._lastrowid = None
+        if 'LOAD DATA LOCAL INFILE' in sql:
+            # Tidak ada padanan di SQLite: app.py fallback ke multi-row INSERT
+            raise mysql.connector.errors.DatabaseError(msg='Loading local data is disabled', errno=3948)
+        try:
+            if 'INSERT INTO prediction_counters' in sql and COUNTER_UPSERT_PATTERN.search(sql):
+                # LAST_INSERT_ID(expr) -> RETURNING, nilai akhir counter dikembalikan sebagai lastrowid
+                self._cursor.execute("""
+                    INSERT INTO prediction_counters (user_id, last_number) VALUES (?, ?)
+                    ON CONFLICT (user_id) DO UPDATE SET last_number = last_number + excluded.last_number
+                    RETURNING last_number
+                """, params[:2])
+                self._lastrowid = self._cursor.fetchone()[0]
+                return
+            self._cursor.execute(translate_mysql_sql(sql), params)
+        except sqlite3.IntegrityError as e:
+            raise mysql.connector.IntegrityError(msg=str(e))
+        except sqlite3.OperationalError as e:
+            if 'no such table' in str(e):
+                raise mysql.connector.ProgrammingError(msg=str(e), errno=1146)
+            raise
+
+    def executemany(self, sql, seq_params):
+        import mysql.connector
+
+        try:
+            self._cursor.executemany(translate_mysql_sql(sql), seq_params)
+        except sqlite3.IntegrityError as e:
+            raise mysql.connector.IntegrityError(msg=str(e))
+
+    def _row(self, row):
+        if row is None or not self._dictionary:
+            return row
+        return {column[0]: value for column, value in zip(self._cursor.description, row)}
+
+    def fetchone(self):
+        return self._row(self._cursor.fetchone())
+
+    def fetchmany(self, size=1):
+        return [self._row(row) for row in self._cursor.fetchmany(size)]
+
+    def fetchall(self):
+        return [self._row(row) for row in self._cursor.fetchall()]
+
+    @property
+    def lastrowid(self):
+        return self._lastrowid if self._lastrowid is not None else self._cursor.lastrowid
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    def close(self):
+        self._cursor.close()
+
+class SqliteConnection:
+    """
+    Satu koneksi SQLite per koneksi pool; autocommit kecuali di dalam start_transaction()
+    """
+    unread_result = False
+
+    def __init__(self, path):
+        self.db = sqlite3.connect(
+            path, timeout=30, isolation_level=None, check_same_thread=False,
+            detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES
+        )
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+
+    def cursor(self, dictionary=False, **kwargs):
+        return SqliteCursor(self, dictionary)
+
+    @property
+    def in_transaction(self):
+        return self.db.in_transaction
+
+    def start_transaction(self):
+        if not self.db.in_transaction:
+            self.db.execute('BEGIN IMMEDIATE')
+
+    def commit(self):
+        if self.db.in_transaction:
+            self.db.commit()
+
+    def rollback(self):
+        if self.db.in_transaction:
+            self.db.rollback()
+
+    def consume_results(self):
+        pass
+
+    def ping(self, reconnect=False):
+        pass
+
+    def is_connected(self):
+        return True
+
+    def close(self):
+        self.db.close()
+
+def install_sqlite_database(svc, path):
+    """
+    Buat skema di `path` dan arahkan pool app.py ke SQLite stand-in
+    """
+    sqlite3.register_adapter(datetime, lambda value: value.isoformat(' '))
+    setup = sqlite3.connect(path)
+    setup.executescript(SQLITE_SCHEMA)
+    setup.execute("INSERT OR IGNORE INTO users (id, name, email) VALUES (?, 'Benchmark', 'bench@localhost')",
+                  (BENCH_USER_ID,))
+    setup.commit()
+    setup.close()
+
+    def open_sqlite_connection():
+        conn = SqliteConnection(path)
+        with svc.db_pool_cond:
+            svc.db_pool_stats['created'] += 1
+        return conn
+
+    svc.open_pool_connection = open_sqlite_connection
+
+# =========================================================================
+# DATA SINTETIS
+# =========================================================================
+
+def synthetic_matrix(rows, seed):
+    """
+    Matriks (rows, 31): kolom SNR dalam dB lalu P1-P30 (daya ternormalisasi)
+    """
+    rng = np.random.default_rng(seed)
+    snr = rng.uniform(0, 40, size=(rows, 1))
+    params = rng.random((rows, 30))
+    return np.round(np.hstack([snr, params]), 6)
+
+def write_synthetic_csv(path, rows, seed):
+    np.savetxt(path, synthetic_matrix(rows, seed), delimiter=',', header=','.join(FEATURE_COLUMNS),
+               comments='', fmt='%.6f')
+
+def write_synthetic_xlsx(path, rows, seed):
+    import openpyxl
+
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(FEATURE_COLUMNS)
+    for row in synthetic_matrix(rows, seed).tolist():
+        sheet.append(row)
+    workbook.save(path)
+
+# =========================================================================
+# PENGUKURAN
+# =========================================================================
+
+def reset_peak_rss():
+    """
+    Reset high-water mark RSS (Linux: /proc/self/clear_refs) agar peak RSS bisa diukur
+    per skenario. Mengembalikan False jika tidak didukung (peak berlaku sejak proses mulai).
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as clear_refs:
+            clear_refs.write('5')
+        return True
+    except OSError:
+        return False
+
+def peak_rss_mb():
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    # ru_maxrss: KB di Linux, byte di macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+def summarize_samples(samples):
+    ordered = sorted(samples)
+    return {
+        'p50': round(statistics.median(ordered), 6),
+        'p95': round(ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))], 6),
+        'mean': round(statistics.fmean(ordered), 6),
+        'min': round(ordered[0], 6),
+        'max': round(ordered[-1], 6)
+    }
+
+def summarize_stage_samples(stage_samples):
+    return {stage: summarize_samples(samples) for stage, samples in stage_samples.items() if samples}
+
+def bench_predict_file(svc, client, path, rows, repeats, user_id, result_format):
+    """
+    POST /predict-file (mode sinkron) `repeats` kali. Timing tahap diambil dari
+    processing_time respons; 'wall' diukur di sisi client (termasuk serialisasi JSON).
+    """
+    stage_samples = {}
+    wall_samples = []
+    reset_supported = reset_peak_rss()
+
+    for _ in range(repeats):
+        data = {'file': (open(path, 'rb'), os.path.basename(path))}
+        if user_id:
+            data['userId'] = str(user_id)
+        start = time.perf_counter()
+        response = client.post(f'/predict-file?format={result_format}', data=data,
+                               content_type='multipart/form-data')
+        wall = time.perf_counter() - start
+        payload = response.get_json()
+        if response.status_code != 200 or not payload.get('success'):
+            raise RuntimeError(f"/predict-file gagal ({response.status_code}): {payload.get('message')}")
+        if payload['processed_rows'] != rows:
+            raise RuntimeError(f"/predict-file memproses {payload['processed_rows']} dari {rows} baris")
+        if user_id and payload.get('database_status') not in ('saved', 'queued'):
+            raise RuntimeError(f"/predict-file database_status={payload.get('database_status')}")
+
+        wall_samples.append(wall)
+        stage_samples.setdefault('wall', []).append(wall)
+        for stage, seconds in payload['processing_time'].items():
+            stage_samples.setdefault(stage, []).append(seconds)
+
+    wall_p50 = statistics.median(wall_samples)
+    return {
+        'endpoint': '/predict-file',
+        'rows': rows,
+        'file_bytes': os.path.getsize(path),
+        'repeats': repeats,
+        'stages': summarize_stage_samples(stage_samples),
+        'rows_per_sec': round(rows / wall_p50, 1) if wall_p50 else None,
+        'peak_rss_mb': peak_rss_mb(),
+        'peak_rss_scope': 'scenario' if reset_supported else 'process'
+    }
+
+def bench_predict(svc, requests, concurrency, user_id, seed):
+    """
+    POST /predict `requests` kali dengan `concurrency` client paralel (satu test client per thread)
+    """
+    matrix = synthetic_matrix(requests, seed).tolist()
+    stage_samples = {}
+    samples_lock = threading.Lock()
+    client_local = threading.local()
+    reset_supported = reset_peak_rss()
+
+    def send(row):
+        client = getattr(client_local, 'client', None)
+        if client is None:
+            client = client_local.client = svc.app.test_client()
+        body = {'snr': row[0], 'inputs': row[1:], 'inputType': 'Benchmark'}
+        if user_id:
+            body['userId'] = user_id
+        start = time.perf_counter()
+        response = client.post('/predict', json=body)
+        wall = time.perf_counter() - start
+        payload = response.get_json()
+        if response.status_code != 200 or not payload.get('success'):
+            raise RuntimeError(f"/predict gagal ({response.status_code}): {payload.get('message')}")
+        with samples_lock:
+            stage_samples.setdefault('wall', []).append(wall)
+            for stage, seconds in payload['data']['processing_time'].items():
+                stage_samples.setdefault(stage, []).append(seconds)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(send, matrix))
+    elapsed = time.perf_counter() - start
+
+    return {
+        'endpoint': '/predict',
+        'rows': requests,
+        'concurrency': concurrency,
+        'stages': summarize_stage_samples(stage_samples),
+        'rows_per_sec': round(requests / elapsed, 1) if elapsed else None,
+        'peak_rss_mb': peak_rss_mb(),
+        'peak_rss_scope': 'scenario' if reset_supported else 'process'
+    }
+
+def service_config_snapshot(svc):
+    return {
+        'model_version': svc.MODEL_VERSION,
+        'inference_backend': svc.INFERENCE_BACKEND,
+        'inference_workers': svc.get_inference_workers(),
+        'bulk_insert_backend': svc.BULK_INSERT_BACKEND,
+        'bulk_insert_rows': svc.BULK_INSERT_ROWS,
+        'file_chunk_size': svc.FILE_CHUNK_SIZE,
+        'write_behind_enabled': svc.WRITE_BEHIND_ENABLED,
+        'microbatch_enabled': svc.MICROBATCH_ENABLED,
+        'prediction_cache_enabled': svc.PREDICTION_CACHE_ENABLED,
+        'file_dedup_enabled': svc.FILE_DEDUP_ENABLED,
+        'db_pool_size': svc.DB_POOL_SIZE
+    }
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+# =========================================================================
+# MODE PERBANDINGAN
+# =========================================================================
+
+def compare_reports(current, baseline, tolerance):
+    """
+    Bandingkan p50 setiap tahap, rows_per_sec dan peak_rss_mb per skenario.
+    Regresi = memburuk lebih dari `tolerance` (relatif) dan melewati COMPARE_NOISE_FLOOR.
+    Mengembalikan list dict perbandingan (field 'regression' True/False).
+    """
+    comparisons = []
+
+    def add(scenario, metric, kind, new, old, lower_is_better):
+        if new is None or old is None:
+            return
+        change = (new - old) / old if old else 0.0
+        worse = change > tolerance if lower_is_better else change < -tolerance
+        regression = worse and abs(new - old) > COMPARE_NOISE_FLOOR[kind]
+        comparisons.append({
+            'scenario': scenario,
+            'metric': metric,
+            'baseline': old,
+            'current': new,
+            'change': round(change, 4),
+            'regression': regression
+        })
+
+    for scenario, result in current['scenarios'].items():
+        previous = baseline.get('scenarios', {}).get(scenario)
+        if not previous:
+            continue
+        for stage, summary in result['stages'].items():
+            old_summary = previous.get('stages', {}).get(stage)
+            if old_summary:
+                add(scenario, f'{stage}.p50', 'seconds', summary['p50'], old_summary['p50'], True)
+        add(scenario, 'rows_per_sec', 'rows_per_sec', result.get('rows_per_sec'), previous.get('rows_per_sec'), False)
+        add(scenario, 'peak_rss_mb', 'peak_rss_mb', result.get('peak_rss_mb'), previous.get('peak_rss_mb'), True)
+
+    return comparisons
+
+def print_comparison(comparisons, current, baseline):
+    mismatched = [
+        key for key in ('rows', 'xlsx_rows', 'predict_requests', 'concurrency', 'result_format', 'db')
+        if current['config'].get(key) != baseline.get('config', {}).get(key)
+    ]
+    if mismatched:
+        print(f"⚠️ Konfigurasi berbeda dari baseline: {', '.join(mismatched)} (perbandingan kurang valid)")
+
+    for item in comparisons:
+        marker = '❌' if item['regression'] else '  '
+        print(f"{marker} {item['scenario']:<18} {item['metric']:<24} "
+              f"{item['baseline']:>12} -> {item['current']:<12} ({item['change']:+.1%})")
+
+# =========================================================================
+# CLI
+# =========================================================================
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark /predict-file dan /predict OptiPredict')
+    parser.add_argument('--rows', type=int, default=20000, help='baris file CSV sintetis')
+    parser.add_argument('--xlsx-rows', type=int, default=None, help='baris file XLSX (default = --rows)')
+    parser.add_argument('--formats', default='csv,xlsx', help='format file yang diuji, dipisah koma')
+    parser.add_argument('--repeats', type=int, default=3, help='pengulangan per skenario /predict-file')
+    parser.add_argument('--warmup', type=int, default=1, help='run pemanasan yang tidak dicatat')
+    parser.add_argument('--predict-requests', type=int, default=500, help='jumlah request /predict (0 = lewati)')
+    parser.add_argument('--concurrency', type=int, default=1, help='client paralel untuk /predict')
+    parser.add_argument('--result-format', default='rows', choices=('rows', 'columnar'))
+    parser.add_argument('--db', default='sqlite', choices=('sqlite', 'mysql', 'none'),
+                        help="sqlite = stand-in lokal, mysql = DB_CONFIG, none = tanpa userId (tanpa tahap DB)")
+    parser.add_argument('--model', help='path model CatBoost (default MODEL_PATH app.py)')
+    parser.add_argument('--scaler', help='path scaler SNR (default SNR_SCALER_PATH app.py)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--workdir', help='direktori file sintetis dan database SQLite (default: temp)')
+    parser.add_argument('--output', default='benchmark_report.json', help='path laporan JSON')
+    parser.add_argument('--baseline', help='laporan JSON pembanding; exit 1 jika ada regresi')
+    parser.add_argument('--tolerance', type=float, default=0.15, help='batas regresi relatif (0.15 = 15%%)')
+    return parser.parse_args(argv)
+
+def configure_environment(args):
+    """
+    Default environment benchmark (di-set sebelum app.py di-import, env eksplisit tetap menang):
+    cache prediksi dan deduplikasi file dimatikan agar pengulangan benar-benar diproses ulang,
+    write-behind dimatikan agar tahap database mengukur insert sinkron, log hanya warning.
+    """
+    os.environ.setdefault('PREDICTION_CACHE_ENABLED', '0')
+    os.environ.setdefault('FILE_DEDUP_ENABLED', '0')
+    os.environ.setdefault('WRITE_BEHIND_ENABLED', '0')
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    if args.db == 'sqlite':
+        os.environ.setdefault('BULK_INSERT_BACKEND', 'multirow')
+        os.environ.setdefault('PREDICTION_RETENTION_INTERVAL', '0')  # SQLite tidak punya partisi
+
+def run_benchmark(args):
+    configure_environment(args)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import app as svc
+
+    if args.model:
+        svc.MODEL_PATH = args.model
+    if args.scaler:
+        svc.SNR_SCALER_PATH = args.scaler
+    if not svc.load_model_and_scaler():
+        raise SystemExit('❌ Model atau scaler gagal dimuat')
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='optipredict_bench_')
+    os.makedirs(workdir, exist_ok=True)
+    user_id = None if args.db == 'none' else BENCH_USER_ID
+    xlsx_rows = args.xlsx_rows or args.rows
+    formats = [fmt.strip() for fmt in args.formats.split(',') if fmt.strip()]
+
+    try:
+        if args.db == 'sqlite':
+            install_sqlite_database(svc, os.path.join(workdir, 'benchmark.sqlite3'))
+        elif args.db == 'mysql' and not svc.verify_user_exists(BENCH_USER_ID):
+            raise SystemExit(f'❌ User {BENCH_USER_ID} tidak ada di database {svc.DB_CONFIG["database"]}')
+
+        client = svc.app.test_client()
+        scenarios = {}
+
+        for fmt in formats:
+            rows = xlsx_rows if fmt == 'xlsx' else args.rows
+            path = os.path.join(workdir, f'synthetic_{rows}.{fmt}')
+            print(f"📄 Membuat {path} ({rows} baris)")
+            if fmt == 'csv':
+                write_synthetic_csv(path, rows, args.seed)
+            elif fmt == 'xlsx':
+                write_synthetic_xlsx(path, rows, args.seed)
+            else:
+                raise SystemExit(f'❌ Format tidak dikenal: {fmt}')
+
+            if args.warmup:
+                bench_predict_file(svc, client, path, rows, args.warmup, user_id, args.result_format)
+            print(f"⏱️ /predict-file {fmt}: {args.repeats} run")
+            scenarios[f'predict_file_{fmt}'] = bench_predict_file(
+                svc, client, path, rows, args.repeats, user_id, args.result_format
+            )
+
+        if args.predict_requests:
+            if args.warmup:
+                bench_predict(svc, min(args.predict_requests, 20), args.concurrency, user_id, args.seed + 1)
+            print(f"⏱️ /predict: {args.predict_requests} request, concurrency {args.concurrency}")
+            scenarios['predict'] = bench_predict(
+                svc, args.predict_requests, args.concurrency, user_id, args.seed + 2
+            )
+
+        return {
+            'report_version': REPORT_VERSION,
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'git_revision': git_revision(),
+            'host': {
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'cpu_count': os.cpu_count()
+            },
+            'config': {
+                'rows': args.rows,
+                'xlsx_rows': xlsx_rows,
+                'formats': formats,
+                'repeats': args.repeats,
+                'predict_requests': args.predict_requests,
+                'concurrency': args.concurrency,
+                'result_format': args.result_format,
+                'db': args.db,
+                'seed': args.seed,
+                'service': service_config_snapshot(svc)
+            },
+            'database_pool': svc.db_pool_info(),
+            'scenarios': scenarios
+        }
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = run_benchmark(args)
+
+    for name, result in report['scenarios'].items():
+        print(f"📊 {name}: {result['rows_per_sec']} rows/s, wall p50 {result['stages']['wall']['p50']:.4f}s, "
+              f"peak RSS {result['peak_rss_mb']} MB")
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        comparisons = compare_reports(report, baseline, args.tolerance)
+        report['comparison'] = {
+            'baseline': args.baseline,
+            'tolerance': args.tolerance,
+            'results': comparisons
+        }
+        print_comparison(comparisons, report, baseline)
+        regressions = [item for item in comparisons if item['regression']]
+        if regressions:
+            print(f"❌ {len(regressions)} metrik regresi melebihi {args.tolerance:.0%}")
+            exit_code = 1
+        else:
+            print("✅ Tidak ada regresi dibanding baseline")
+
+    with open(args.output, 'w') as output_file:
+        json.dump(report, output_file, indent=2)
+    print(f"💾 Laporan ditulis ke {args.output}")
+    return exit_code
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,19 @@
+"""
+Konfigurasi gunicorn (dimuat otomatis dari working directory): layanan latar app.py
+dijalankan saat worker siap dan antrian write-behind di-flush saat worker berhenti.
+"""
+import os
+
+# Beri waktu flush write-behind (WRITE_BEHIND_SHUTDOWN_TIMEOUT) sebelum worker di-SIGKILL
+graceful_timeout = float(os.environ.get('WRITE_BEHIND_SHUTDOWN_TIMEOUT', 30)) + 10
+
+def post_worker_init(worker):
+    import app
+    # Micro-batching /predict hanya berguna jika satu worker melayani request bersamaan (gthread)
+    if worker.cfg.threads > 1 and 'MICROBATCH_ENABLED' not in os.environ:
+        app.MICROBATCH_ENABLED = True
+    app.init_background_services()
+
+def worker_exit(server, worker):
+    import app
+    app.shutdown_write_behind()
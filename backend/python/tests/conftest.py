@@ -0,0 +1,31 @@
+"""
+Fixture bersama test ML service: app.py di-import dari direktori induk dengan log hanya warning
+dan tanpa worker retensi, dan jalur database diarahkan ke SQLite stand-in dari benchmark.py.
+"""
+import os
+import sys
+
+import pytest
+
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+os.environ.setdefault('BULK_INSERT_BACKEND', 'multirow')
+os.environ.setdefault('PREDICTION_RETENTION_INTERVAL', '0')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as svc  # noqa: E402
+import benchmark  # noqa: E402
+
+@pytest.fixture
+def sqlite_db(tmp_path, monkeypatch):
+    """
+    Pool koneksi app.py kosong yang membuka koneksi SQLite ke database baru di tmp_path
+    """
+    monkeypatch.setattr(svc, 'open_pool_connection', svc.open_pool_connection)
+    for key, value in {'initialized': True, 'idle': [], 'size': 0, 'in_use': 0, 'waiters': 0}.items():
+        monkeypatch.setitem(svc.db_pool_state, key, value)
+    path = str(tmp_path / 'test.sqlite3')
+    benchmark.install_sqlite_database(svc, path)
+    yield path
+    for conn, _ in svc.db_pool_state['idle']:
+        conn.close()
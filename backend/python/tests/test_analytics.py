@@ -0,0 +1,86 @@
+"""
+/predictions/analytics menggabungkan tabel aktif dengan arsip Parquet: hasilnya harus sama
+dengan data yang seluruhnya masih di tabel aktif
+"""
+import sqlite3
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+import app as svc
+import benchmark
+
+ARCHIVE_BOUND = datetime(2024, 3, 1)
+
+def sample_rows(count=300):
+    rng = np.random.default_rng(4)
+    labels = ['Normal', 'Bending', 'Fiber Cut']
+    rows = []
+    for idx in range(count):
+        confidence = round(float(rng.uniform(40, 100)), 2)
+        created_at = datetime(2024, 2, 20) + timedelta(hours=int(rng.integers(0, 24 * 20)))
+        rows.append((
+            idx + 1, 1, idx + 1, round(float(rng.uniform(0, 40)), 4), 0.5, None, None,
+            labels[idx % 3], confidence, svc.quality_assessment_array([confidence])[0], 'Manual Input',
+            svc.MODEL_VERSION, created_at, None
+        ))
+    return rows
+
+def insert_hot(path, rows):
+    conn = sqlite3.connect(path)
+    conn.executemany(f"INSERT INTO predictions VALUES ({', '.join(['?'] * 14)})", rows)
+    conn.commit()
+    conn.close()
+
+def write_archive(directory, rows):
+    schema = svc.prediction_archive_schema()
+    svc.pq.write_table(
+        svc.archive_rows_to_table(rows, schema), str(directory / f'predictions_{ARCHIVE_BOUND:%Y%m%d}_p202402.parquet')
+    )
+
+@pytest.fixture
+def client(sqlite_db, tmp_path, monkeypatch):
+    monkeypatch.setattr(svc, 'PREDICTION_ARCHIVE_DIR', str(tmp_path / 'archive'))
+    (tmp_path / 'archive').mkdir()
+    return svc.app.test_client()
+
+def get_analytics(client, query=''):
+    response = client.get(f'/predictions/analytics/1?snr_bin=5{query}')
+    assert response.status_code == 200
+    payload = response.get_json()
+    return payload, {key: payload[key] for key in ('total', 'labels', 'quality', 'confidence_histogram', 'snr', 'daily')}
+
+@pytest.mark.parametrize('query', ['', '&from=2024-02-25&to=2024-03-05', '&prediction=Bending'])
+def test_archived_rows_are_included(client, sqlite_db, tmp_path, query):
+    rows = sample_rows()
+    hot = [row for row in rows if row[12] >= ARCHIVE_BOUND]
+    archived = [row for row in rows if row[12] < ARCHIVE_BOUND]
+    assert hot and archived
+
+    insert_hot(sqlite_db, hot)
+    write_archive(tmp_path / 'archive', archived)
+    split_payload, split = get_analytics(client, query)
+
+    # Data yang sama seluruhnya di tabel aktif, tanpa arsip
+    reference_db = str(tmp_path / 'reference.sqlite3')
+    for conn, _ in svc.db_pool_state['idle']:
+        conn.close()
+    svc.db_pool_state.update(idle=[], size=0)
+    benchmark.install_sqlite_database(svc, reference_db)
+    insert_hot(reference_db, rows)
+    for path in (tmp_path / 'archive').iterdir():
+        path.unlink()
+    reference_payload, reference = get_analytics(client, query)
+
+    assert split_payload['sources']['archived'] > 0
+    assert split_payload['sources']['hot'] + split_payload['sources']['archived'] == split['total']
+    assert reference_payload['sources'] == {'hot': reference['total'], 'archived': 0}
+    assert split['total'] == reference['total']
+    assert split['labels'] == reference['labels']
+    assert split['quality'] == reference['quality']
+    assert split['confidence_histogram'] == reference['confidence_histogram']
+    assert split['daily'] == reference['daily']
+    assert split['snr']['histogram'] == reference['snr']['histogram']
+    for key in ('count', 'min', 'max', 'mean', 'stddev'):
+        assert split['snr'][key] == pytest.approx(reference['snr'][key])
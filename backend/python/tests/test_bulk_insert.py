@@ -0,0 +1,136 @@
+"""
+Backend bulk insert predictions: pemilihan backend lewat BULK_INSERT_BACKEND, pemecahan
+statement per BULK_INSERT_ROWS, dan fallback ke multi-row saat LOAD DATA LOCAL ditolak
+"""
+import os
+import sqlite3
+
+import numpy as np
+import pytest
+
+import app as svc
+
+def prediction_rows(count, labels=('Good', 'Bad')):
+    rng = np.random.default_rng(count)
+    return svc.build_prediction_rows(
+        1, 1, rng.uniform(0, 40, count), rng.random(count), rng.random((count, svc.INPUT_FEATURE_COUNT)),
+        [labels[idx % len(labels)] for idx in range(count)], rng.uniform(50, 100, count), 'Manual'
+    )
+
+def stored_counts(path):
+    conn = sqlite3.connect(path)
+    rows = conn.execute("SELECT COUNT(*) FROM predictions").fetchone()[0]
+    summary = conn.execute("SELECT total_count FROM prediction_summaries WHERE user_id = 1").fetchone()
+    conn.close()
+    return rows, (summary[0] if summary else None)
+
+@pytest.fixture
+def calls(sqlite_db, tmp_path, monkeypatch):
+    """
+    Mencatat backend yang dipanggil beserta ukuran setiap chunk (lewat update summary per chunk)
+    """
+    monkeypatch.setattr(svc, 'LOAD_DATA_TEMP_DIR', str(tmp_path / 'load_data'))
+    monkeypatch.setattr(svc, 'load_data_available', True)
+    recorded = {'backends': [], 'chunks': [], 'fail_at_chunk': None}
+    for name in ('insert_with_load_data', 'insert_with_multirow', 'insert_with_executemany'):
+        def wrapper(*args, _name=name, _original=getattr(svc, name)):
+            recorded['backends'].append(_name.replace('insert_with_', ''))
+            return _original(*args)
+        monkeypatch.setattr(svc, name, wrapper)
+
+    update_summaries = svc.update_prediction_summaries
+
+    def record_chunk(cursor, predictions_data):
+        recorded['chunks'].append(len(predictions_data))
+        if len(recorded['chunks']) == recorded['fail_at_chunk']:
+            raise svc.mysql.connector.errors.DatabaseError(msg='Deadlock found', errno=1213)
+        update_summaries(cursor, predictions_data)
+    monkeypatch.setattr(svc, 'update_prediction_summaries', record_chunk)
+    return recorded
+
+@pytest.mark.parametrize('backend', ['multirow', 'executemany'])
+def test_rows_split_into_chunks(calls, sqlite_db, monkeypatch, backend):
+    monkeypatch.setattr(svc, 'BULK_INSERT_BACKEND', backend)
+    progress = []
+    assert svc.batch_insert_predictions(1, prediction_rows(7), batch_size=3,
+                                        progress=lambda done, total: progress.append((done, total)))
+
+    assert calls['backends'] == [backend]
+    assert calls['chunks'] == [3, 3, 1]
+    assert progress == [(3, 7), (6, 7), (7, 7)]
+    assert stored_counts(sqlite_db) == (7, 7)
+
+def test_multirow_defaults_to_bulk_insert_rows(calls, sqlite_db, monkeypatch):
+    monkeypatch.setattr(svc, 'BULK_INSERT_BACKEND', 'multirow')
+    monkeypatch.setattr(svc, 'BULK_INSERT_ROWS', 4)
+    assert svc.batch_insert_predictions(1, prediction_rows(10))
+    assert calls['chunks'] == [4, 4, 2]
+    assert stored_counts(sqlite_db) == (10, 10)
+
+@pytest.mark.parametrize('single_transaction', [True, False])
+def test_multirow_failure_rolls_back_to_last_commit(calls, sqlite_db, monkeypatch, single_transaction):
+    monkeypatch.setattr(svc, 'BULK_INSERT_BACKEND', 'multirow')
+    monkeypatch.setattr(svc, 'BULK_INSERT_SINGLE_TRANSACTION', single_transaction)
+    calls['fail_at_chunk'] = 3
+
+    assert not svc.batch_insert_predictions(1, prediction_rows(5), batch_size=2)
+    # Tanpa single-transaction chunk yang sudah di-commit tetap tersimpan bersama summary-nya
+    assert stored_counts(sqlite_db) == ((0, None) if single_transaction else (4, 4))
+
+def test_auto_falls_back_to_multirow_when_load_data_rejected(calls, sqlite_db, monkeypatch):
+    monkeypatch.setattr(svc, 'BULK_INSERT_BACKEND', 'auto')
+    assert svc.batch_insert_predictions(1, prediction_rows(5), batch_size=2)
+
+    assert calls['backends'] == ['load_data', 'multirow']
+    assert calls['chunks'] == [2, 2, 1]
+    assert stored_counts(sqlite_db) == (5, 5)
+    assert svc.load_data_available is False
+    assert os.listdir(svc.LOAD_DATA_TEMP_DIR) == []
+
+    # Setelah ditolak (errno 3948) LOAD DATA tidak dicoba lagi
+    assert svc.batch_insert_predictions(1, prediction_rows(3))
+    assert calls['backends'] == ['load_data', 'multirow', 'multirow']
+    assert stored_counts(sqlite_db) == (8, 8)
+
+def test_auto_keeps_load_data_after_other_errors(calls, sqlite_db, monkeypatch):
+    monkeypatch.setattr(svc, 'BULK_INSERT_BACKEND', 'auto')
+
+    def lock_wait_timeout(cursor, columns, predictions_data):
+        calls['backends'].append('load_data')
+        raise svc.mysql.connector.errors.DatabaseError(msg='Lock wait timeout exceeded', errno=1205)
+    monkeypatch.setattr(svc, 'insert_with_load_data', lock_wait_timeout)
+
+    assert svc.batch_insert_predictions(1, prediction_rows(3))
+    assert calls['backends'] == ['load_data', 'multirow']
+    assert svc.load_data_available is True
+    assert stored_counts(sqlite_db) == (3, 3)
+
+def test_forced_load_data_does_not_fall_back(calls, sqlite_db, monkeypatch):
+    monkeypatch.setattr(svc, 'BULK_INSERT_BACKEND', 'load_data')
+    assert not svc.batch_insert_predictions(1, prediction_rows(3))
+    assert calls['backends'] == ['load_data']
+    assert stored_counts(sqlite_db) == (0, None)
+
+class CapturingCursor:
+    """
+    Cursor palsu yang membaca file TSV LOAD DATA saat statement dieksekusi
+    """
+    def __init__(self):
+        self.sql = None
+        self.tsv = None
+
+    def execute(self, sql, params=()):
+        self.sql = ' '.join(sql.split())
+        with open(params[0], encoding='utf-8', newline='') as tsv_file:
+            self.tsv = tsv_file.read()
+
+def test_load_data_escapes_values_and_hexes_binary_columns(tmp_path, monkeypatch):
+    monkeypatch.setattr(svc, 'LOAD_DATA_TEMP_DIR', str(tmp_path))
+    cursor = CapturingCursor()
+    rows = [(1, b'\x00\xff', 'a\tb', 'line\nbreak\\')]
+    svc.insert_with_load_data(cursor, ('user_id', 'inputs_packed', 'prediction', 'quality_assessment'), rows)
+
+    assert cursor.tsv == '1\t00ff\ta\\\tb\tline\\\nbreak\\\\\n'
+    assert '(user_id, @inputs_packed, prediction, quality_assessment)' in cursor.sql
+    assert cursor.sql.endswith('SET inputs_packed = UNHEX(@inputs_packed)')
+    assert os.listdir(tmp_path) == []
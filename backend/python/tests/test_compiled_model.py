@@ -0,0 +1,93 @@
+"""
+Parity evaluator compiled model (compile_catboost_model + compiled_predict_proba) terhadap
+predict_proba CatBoost pada model kecil yang dilatih di test
+"""
+import numpy as np
+import pytest
+from catboost import CatBoostClassifier
+
+import app as svc
+
+FEATURES = 6
+
+def train_model(loss_function, nan_mode):
+    rng = np.random.default_rng(7)
+    features = rng.normal(size=(600, FEATURES)).astype(np.float32)
+    score = features[:, 0] + 0.5 * features[:, 1] - features[:, 2] * features[:, 3]
+    features[rng.random(features.shape) < 0.05] = np.nan
+    if loss_function == 'Logloss':
+        labels = (score > 0).astype(int)
+    else:
+        labels = np.digitize(score, [-1.0, 0.0, 1.0])
+    model = CatBoostClassifier(
+        iterations=30, depth=4, learning_rate=0.3, loss_function=loss_function, nan_mode=nan_mode,
+        random_seed=0, thread_count=1, verbose=False, allow_writing_files=False
+    )
+    model.fit(features, labels)
+    return model
+
+@pytest.fixture(scope='module', params=[('MultiClass', 'Min'), ('MultiClass', 'Max'), ('Logloss', 'Min')],
+                ids=lambda param: '-'.join(param))
+def trained(request):
+    model = train_model(*request.param)
+    return model, svc.compile_catboost_model(model)
+
+def assert_parity(model, compiled, features):
+    expected = model.predict_proba(features)
+    actual = svc.compiled_predict_proba(compiled, features)
+    assert actual.shape == expected.shape
+    assert np.abs(actual - expected).max() <= svc.COMPILED_MODEL_PARITY_TOLERANCE
+    assert (actual.argmax(axis=1) == expected.argmax(axis=1)).all()
+
+def test_random_sample_matches_catboost(trained):
+    model, compiled = trained
+    features = np.random.default_rng(1).normal(size=(2000, FEATURES)).astype(np.float32)
+    assert_parity(model, compiled, features)
+
+def test_border_values_match_catboost(trained):
+    model, compiled = trained
+    used = np.isfinite(compiled['split_borders']) & (compiled['split_borders'] < np.finfo(np.float32).max)
+    borders = compiled['split_borders'][used]
+    split_features = compiled['split_features'][used]
+
+    # Nilai tepat di border (bit 0) dan satu ulp di atasnya (bit 1), fitur lain 0
+    exact = np.zeros((len(borders), FEATURES), dtype=np.float32)
+    exact[np.arange(len(borders)), split_features] = borders
+    above = exact.copy()
+    above[np.arange(len(borders)), split_features] = np.nextafter(borders, np.float32(np.inf))
+    assert_parity(model, compiled, np.vstack([exact, above]))
+
+def test_nan_inputs_match_catboost(trained):
+    model, compiled = trained
+    rng = np.random.default_rng(2)
+    features = rng.normal(size=(300, FEATURES)).astype(np.float32)
+    features[rng.random(features.shape) < 0.3] = np.nan
+    features[0] = np.nan  # seluruh fitur NaN
+    assert_parity(model, compiled, features)
+
+def test_parity_sample_passes(trained):
+    model, compiled = trained
+    parity = svc.check_compiled_model_parity(model, compiled, rows=1000)
+    assert parity['passed']
+    assert parity['label_agreement'] == 1.0
+
+def test_cached_artifact_round_trip(trained, tmp_path, monkeypatch):
+    model, compiled = trained
+    monkeypatch.setattr(svc, 'COMPILED_MODEL_CACHE_DIR', str(tmp_path))
+
+    exported, source = svc.load_compiled_model(model, b'\x01' * 32)
+    assert source == 'export'
+    cached, source = svc.load_compiled_model(model, b'\x01' * 32)
+    assert source == 'cache'
+    assert set(cached) == set(compiled)
+
+    features = np.random.default_rng(3).normal(size=(200, FEATURES)).astype(np.float32)
+    np.testing.assert_array_equal(
+        svc.compiled_predict_proba(cached, features), svc.compiled_predict_proba(exported, features)
+    )
+
+    # Fingerprint baru (model diganti): artefak lama dibuang
+    svc.load_compiled_model(model, b'\x02' * 32)
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        svc.compiled_model_cache_path(b'\x02' * 32).rsplit('/', 1)[-1]
+    ]
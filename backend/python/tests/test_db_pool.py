@@ -0,0 +1,100 @@
+"""
+Pool koneksi MySQL: timeout saat pool habis, reset koneksi sebelum dipakai lagi, dan koneksi
+selalu kembali ke pool walau pemakainya melempar exception
+"""
+import threading
+import time
+
+import pytest
+
+import app as svc
+
+class FakeConnection:
+    def __init__(self):
+        self.unread_result = False
+        self.in_transaction = False
+        self.rolled_back = 0
+        self.closed = False
+        self.fail_reset = False
+
+    def start_transaction(self):
+        self.in_transaction = True
+
+    def consume_results(self):
+        self.unread_result = False
+
+    def rollback(self):
+        if self.fail_reset:
+            raise RuntimeError('connection lost')
+        self.rolled_back += 1
+        self.in_transaction = False
+
+    def close(self):
+        self.closed = True
+
+@pytest.fixture
+def pool(monkeypatch):
+    opened = []
+
+    def open_connection():
+        opened.append(FakeConnection())
+        return opened[-1]
+
+    monkeypatch.setattr(svc, 'open_pool_connection', open_connection)
+    monkeypatch.setattr(svc, 'DB_POOL_SIZE', 2)
+    for key, value in {'initialized': True, 'idle': [], 'size': 0, 'in_use': 0, 'waiters': 0}.items():
+        monkeypatch.setitem(svc.db_pool_state, key, value)
+    return opened
+
+def test_checkout_times_out_when_pool_exhausted(pool):
+    first = svc.acquire_pool_connection()
+    svc.acquire_pool_connection()
+
+    start = time.monotonic()
+    with pytest.raises(svc.PoolTimeout):
+        svc.acquire_pool_connection(timeout=0.1)
+    assert time.monotonic() - start >= 0.1
+    assert svc.db_pool_state['waiters'] == 0
+
+    svc.release_pool_connection(first)
+    assert svc.acquire_pool_connection(timeout=0.1) is first
+    assert len(pool) == 2
+
+def test_waiter_gets_released_connection(pool):
+    held = [svc.acquire_pool_connection(), svc.acquire_pool_connection()]
+    threading.Timer(0.05, svc.release_pool_connection, args=(held[0],)).start()
+    assert svc.acquire_pool_connection(timeout=2) is held[0]
+
+def test_released_connection_is_reset(pool):
+    conn = svc.acquire_pool_connection()
+    conn.unread_result = True
+    conn.in_transaction = True
+    svc.release_pool_connection(conn)
+
+    assert not conn.unread_result and conn.rolled_back == 1
+    assert svc.db_pool_state['idle'][0][0] is conn
+
+def test_failed_reset_discards_connection(pool):
+    conn = svc.acquire_pool_connection()
+    conn.in_transaction = True
+    conn.fail_reset = True
+    svc.release_pool_connection(conn)
+
+    assert conn.closed
+    assert svc.db_pool_state['idle'] == [] and svc.db_pool_state['size'] == 0
+
+def test_connection_returned_when_caller_raises(pool):
+    def failing_query():
+        conn = svc.get_db_connection()
+        try:
+            conn.start_transaction()
+            raise ValueError('query gagal')
+        finally:
+            svc.close_db_connection(conn)
+
+    for _ in range(svc.DB_POOL_SIZE + 1):
+        with pytest.raises(ValueError):
+            failing_query()
+
+    assert svc.db_pool_state['in_use'] == 0
+    assert len(pool) == 1 and pool[0].rolled_back == svc.DB_POOL_SIZE + 1
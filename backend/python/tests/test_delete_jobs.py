@@ -0,0 +1,119 @@
+"""
+Job hapus semua prediksi: penghapusan per chunk dengan delta summary di setiap chunk, status
+job di disk (polling dari worker mana pun) dan satu job aktif per user
+"""
+import sqlite3
+
+import numpy as np
+import pytest
+
+import app as svc
+
+class InlineExecutor:
+    def submit(self, fn, *args):
+        fn(*args)
+
+class DeferredExecutor:
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, fn, *args):
+        self.submitted.append(args)
+
+def insert_predictions(user_id, labels):
+    rng = np.random.default_rng(user_id)
+    count = len(labels)
+    rows = svc.build_prediction_rows(
+        user_id, 1, rng.uniform(0, 40, count), rng.random(count), rng.random((count, svc.INPUT_FEATURE_COUNT)),
+        labels, rng.uniform(50, 100, count), 'Manual'
+    )
+    assert svc.batch_insert_predictions(user_id, rows)
+
+@pytest.fixture
+def client(sqlite_db, tmp_path, monkeypatch):
+    monkeypatch.setattr(svc, 'JOB_UPLOAD_DIR', str(tmp_path / 'jobs'))
+    monkeypatch.setattr(svc, 'PREDICTION_ARCHIVE_DIR', str(tmp_path / 'archive'))
+    monkeypatch.setattr(svc, 'DELETE_CHUNK_ROWS', 4)
+    monkeypatch.setattr(svc, 'DELETE_CHUNK_PAUSE_MS', 0)
+    monkeypatch.setattr(svc, 'delete_jobs', {})
+    conn = sqlite3.connect(sqlite_db)
+    conn.execute("INSERT INTO users (id) VALUES (2)")
+    conn.execute("INSERT INTO prediction_counters (user_id, last_number) VALUES (1, 10), (2, 3)")
+    conn.commit()
+    conn.close()
+    insert_predictions(1, ['Good', 'Bad'] * 5)
+    insert_predictions(2, ['Good'] * 3)
+    return svc.app.test_client()
+
+def query(path, sql, params=()):
+    conn = sqlite3.connect(path)
+    rows = conn.execute(sql, params).fetchall()
+    conn.close()
+    return rows
+
+def test_chunked_delete_applies_summary_delta_per_chunk(client, sqlite_db, monkeypatch):
+    monkeypatch.setattr(svc, 'delete_executor', InlineExecutor())
+    deltas = []
+    apply_delta = svc.apply_prediction_summary_delta
+
+    def record_delta(cursor, totals, labels):
+        deltas.append((totals, labels))
+        apply_delta(cursor, totals, labels)
+    monkeypatch.setattr(svc, 'apply_prediction_summary_delta', record_delta)
+
+    response = client.delete('/predictions/all/1')
+    assert response.status_code == 202
+    payload = response.get_json()
+    assert payload['status'] == 'completed' and payload['deleted_count'] == 10
+    assert payload['chunks'] == 3 and payload['estimated_total'] == 10
+
+    assert [totals[1][0] for totals, _ in deltas] == [-4, -4, -2]
+    assert deltas[0][1] == {(1, 'Good'): -2, (1, 'Bad'): -2}
+    assert sum(labels[(1, 'Good')] for _, labels in deltas) == -5
+
+    assert query(sqlite_db, "SELECT user_id, COUNT(*) FROM predictions GROUP BY user_id") == [(2, 3)]
+    # Summary user 1 dibuang setelah semua prediksinya habis; user lain tidak tersentuh
+    assert query(sqlite_db, "SELECT user_id, total_count FROM prediction_summaries") == [(2, 3)]
+    assert query(sqlite_db, "SELECT user_id, prediction, prediction_count FROM prediction_label_counts") == [(2, 'Good', 3)]
+    assert query(sqlite_db, "SELECT user_id, last_number FROM prediction_counters") == [(2, 3)]
+
+def test_delete_keeps_upload_status(client, sqlite_db, monkeypatch):
+    monkeypatch.setattr(svc, 'delete_executor', InlineExecutor())
+    conn = sqlite3.connect(sqlite_db)
+    conn.execute("INSERT INTO excel_inputs (user_id, file_hash, model_version, status) VALUES (1, 'hash', 'v', 'completed')")
+    conn.commit()
+    conn.close()
+    client.delete('/predictions/all/1')
+    assert query(sqlite_db, "SELECT status, error_message FROM excel_inputs") == [('completed', None)]
+
+def test_job_status_polled_from_disk(client, monkeypatch):
+    monkeypatch.setattr(svc, 'delete_executor', InlineExecutor())
+    job_id = client.delete('/predictions/all/1').get_json()['job_id']
+    assert svc.delete_jobs == {}
+
+    response = client.get(f'/predictions/delete-jobs/{job_id}?userId=1')
+    assert response.status_code == 200
+    payload = response.get_json()
+    assert payload['success'] and payload['status'] == 'completed'
+    assert payload['progress'] == 100.0 and payload['deleted_count'] == 10
+
+    assert client.get(f'/predictions/delete-jobs/{job_id}?userId=2').status_code == 404
+    assert client.get('/predictions/delete-jobs/0123456789abcdef0123456789abcdef').status_code == 404
+
+def test_one_active_job_per_user(client, monkeypatch):
+    executor = DeferredExecutor()
+    monkeypatch.setattr(svc, 'delete_executor', executor)
+
+    first = client.delete('/predictions/all/1').get_json()
+    # Worker lain hanya melihat status di disk
+    monkeypatch.setattr(svc, 'delete_jobs', {})
+    second = client.delete('/predictions/all/1').get_json()
+    other_user = client.delete('/predictions/all/2').get_json()
+
+    assert second['job_id'] == first['job_id'] and second['status'] == 'queued'
+    assert other_user['job_id'] != first['job_id']
+    assert executor.submitted == [(first['job_id'], 1), (other_user['job_id'], 2)]
+
+    # Job aktif yang berhenti diperbarui (worker mati) tidak memblokir job baru
+    monkeypatch.setattr(svc, 'DELETE_JOB_STALE_SECONDS', -1)
+    assert client.delete('/predictions/all/1').get_json()['job_id'] != first['job_id']
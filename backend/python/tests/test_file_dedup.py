@@ -0,0 +1,101 @@
+"""
+Deduplikasi upload /predict-file: file identik dari user yang sama memakai hasil tersimpan,
+file berbeda (atau user lain) diproses ulang
+"""
+import io
+import sqlite3
+
+import numpy as np
+import pytest
+from catboost import CatBoostClassifier
+from sklearn.preprocessing import MinMaxScaler
+
+import app as svc
+import benchmark
+
+@pytest.fixture
+def client(sqlite_db, monkeypatch):
+    rng = np.random.default_rng(0)
+    features = rng.normal(size=(300, svc.INPUT_FEATURE_COUNT)).astype(np.float32)
+    model = CatBoostClassifier(iterations=10, depth=3, random_seed=0, thread_count=1, verbose=False,
+                               allow_writing_files=False)
+    model.fit(features, np.digitize(features[:, 0], [-0.5, 0.5]))
+    monkeypatch.setattr(svc, 'model', model)
+    monkeypatch.setattr(svc, 'model_fingerprint', b'test-model')
+    monkeypatch.setattr(svc, 'snr_scaler', MinMaxScaler().fit([[0.0], [40.0]]))
+    monkeypatch.setattr(svc, 'compiled_model', None)
+    monkeypatch.setattr(svc, 'INFERENCE_BACKEND', 'thread')
+    monkeypatch.setattr(svc, 'WRITE_BEHIND_ENABLED', False)
+    monkeypatch.setattr(svc, 'FILE_DEDUP_ENABLED', True)
+    conn = sqlite3.connect(sqlite_db)
+    conn.execute("INSERT INTO users (id) VALUES (2)")
+    conn.commit()
+    conn.close()
+    return svc.app.test_client()
+
+def csv_bytes(seed, rows=20):
+    buffer = io.StringIO()
+    np.savetxt(buffer, benchmark.synthetic_matrix(rows, seed), delimiter=',',
+               header=','.join(benchmark.FEATURE_COLUMNS), comments='', fmt='%.6f')
+    return buffer.getvalue().encode()
+
+def predict_file(client, content, user_id=1):
+    response = client.post(
+        '/predict-file',
+        data={'userId': str(user_id), 'file': (io.BytesIO(content), 'data.csv')},
+        content_type='multipart/form-data'
+    )
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+def stored_counts(path):
+    conn = sqlite3.connect(path)
+    uploads = conn.execute("SELECT COUNT(*) FROM excel_inputs").fetchone()[0]
+    predictions = conn.execute("SELECT COUNT(*) FROM predictions").fetchone()[0]
+    conn.close()
+    return uploads, predictions
+
+def upload_ids(path):
+    conn = sqlite3.connect(path)
+    ids = [row[0] for row in conn.execute("SELECT id FROM excel_inputs WHERE status = 'completed'")]
+    conn.close()
+    return ids
+
+def test_identical_file_reuses_stored_results(client, sqlite_db, monkeypatch):
+    first = predict_file(client, csv_bytes(1))
+    assert first['deduplicated'] is False
+    assert stored_counts(sqlite_db) == (1, 20)
+
+    def fail(*args, **kwargs):
+        raise AssertionError('file identik tidak boleh diproses ulang')
+    monkeypatch.setattr(svc, 'iter_process_file_chunks', fail)
+
+    second = predict_file(client, csv_bytes(1))
+    assert second['deduplicated'] is True
+    assert [second['excel_input_id']] == upload_ids(sqlite_db)
+    assert stored_counts(sqlite_db) == (1, 20)
+    assert [row['prediction'] for row in second['results']] == [row['prediction'] for row in first['results']]
+    assert [row['confidence'] for row in second['results']] == pytest.approx(
+        [row['confidence'] for row in first['results']], abs=0.01
+    )
+
+@pytest.mark.parametrize('seed, user_id', [(2, 1), (1, 2)])
+def test_different_file_or_user_is_processed(client, sqlite_db, seed, user_id):
+    predict_file(client, csv_bytes(1))
+    other = predict_file(client, csv_bytes(seed), user_id)
+    assert other['deduplicated'] is False
+    assert stored_counts(sqlite_db) == (2, 40)
+
+def test_upload_with_removed_predictions_is_reprocessed(client, sqlite_db):
+    predict_file(client, csv_bytes(1))
+    # Prediksi upload hilang dari tabel aktif (dihapus user atau diarsipkan); status upload tetap
+    conn = sqlite3.connect(sqlite_db)
+    conn.execute("DELETE FROM predictions WHERE prediction_number > 5")
+    conn.commit()
+    conn.close()
+    assert len(upload_ids(sqlite_db)) == 1
+
+    again = predict_file(client, csv_bytes(1))
+    assert again['deduplicated'] is False
+    assert stored_counts(sqlite_db) == (1, 25)
+    assert len(upload_ids(sqlite_db)) == 1
@@ -0,0 +1,80 @@
+"""
+History dengan keyset pagination: cursor (created_at, id) bolak-balik tanpa kehilangan atau
+menggandakan baris, dan batas filter from (inklusif) / to (sampai akhir hari)
+"""
+import json
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+import app as svc
+
+START = datetime(2024, 3, 1, 8, 0, 0)
+
+@pytest.fixture
+def client(sqlite_db):
+    conn = sqlite3.connect(sqlite_db)
+    for number in range(1, 26):
+        # Setiap tiga baris berbagi created_at yang sama untuk menguji tie-break pada id
+        created_at = START + timedelta(hours=8 * ((number - 1) // 3))
+        conn.execute(
+            """INSERT INTO predictions (user_id, prediction_number, snr, snr_normalized, inputs, prediction,
+                                        confidence, quality_assessment, input_type, model_version, created_at)
+               VALUES (1, ?, 20, 0.5, ?, ?, 90, ?, 'Manual', ?, ?)""",
+            (number, json.dumps([0.0] * svc.INPUT_FEATURE_COUNT), 'Good' if number % 2 else 'Bad',
+             svc.QUALITY_LEVELS[number % 3], svc.MODEL_VERSION, created_at.isoformat(' '))
+        )
+    conn.commit()
+    conn.close()
+    return svc.app.test_client()
+
+def history_pages(client, query=''):
+    pages = []
+    url = f'/predictions/1?limit=4{query}'
+    while url:
+        payload = client.get(url).get_json()
+        assert payload['success'], payload
+        pages.append(payload['data'])
+        cursor = payload['pagination']['next_cursor']
+        url = f'/predictions/1?limit=4{query}&cursor={cursor}' if cursor else None
+    return pages
+
+def test_cursor_round_trip():
+    row = {'created_at': datetime(2024, 3, 1, 8, 30, 15, 250000), 'id': 42}
+    assert svc.decode_history_cursor(svc.encode_history_cursor(row)) == (row['created_at'], 42)
+
+@pytest.mark.parametrize('value', ['bukan-cursor', 'W10', svc.base64.urlsafe_b64encode(b'{"a":1}').decode()])
+def test_invalid_cursor_rejected(value):
+    with pytest.raises(ValueError, match='Cursor tidak valid'):
+        svc.decode_history_cursor(value)
+
+def test_invalid_cursor_returns_400(client):
+    assert client.get('/predictions/1?cursor=bukan-cursor').status_code == 400
+
+def test_pages_cover_every_row_once_in_order(client):
+    pages = history_pages(client)
+    numbers = [row['prediction_number'] for page in pages for row in page]
+    assert numbers == list(range(25, 0, -1))
+    assert [len(page) for page in pages] == [4] * 6 + [1]
+
+def test_filter_bounds():
+    filters = svc.parse_history_filters({'from': '2024-03-02', 'to': '2024-03-03', 'quality': 'high'})
+    assert filters == {'from': '2024-03-02T00:00:00', 'to': '2024-03-04T00:00:00', 'quality': 'High'}
+    where_sql, params = svc.history_where_clause(1, filters)
+    assert where_sql == 'user_id = %s AND quality_assessment = %s AND created_at >= %s AND created_at < %s'
+    assert params == [1, 'High', datetime(2024, 3, 2), datetime(2024, 3, 4)]
+
+    # Batas akhir dengan jam dipakai apa adanya
+    assert svc.parse_history_filters({'to': '2024-03-03T12:00:00'}) == {'to': '2024-03-03T12:00:00'}
+    with pytest.raises(ValueError):
+        svc.parse_history_filters({'from': '03/02/2024'})
+    with pytest.raises(ValueError):
+        svc.parse_history_filters({'quality': 'excellent'})
+
+def test_date_filter_pages_stay_within_bounds(client):
+    # Hari 2024-03-02 berisi created_at 00:00, 08:00, 16:00 -> baris 7-15; 2024-03-03 00:00 tidak ikut
+    pages = history_pages(client, '&from=2024-03-02&to=2024-03-02&prediction=Good')
+    numbers = [row['prediction_number'] for page in pages for row in page]
+    assert numbers == [15, 13, 11, 9, 7]
+    assert [len(page) for page in pages] == [4, 1]
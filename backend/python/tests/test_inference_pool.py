@@ -0,0 +1,52 @@
+"""
+Process pool inference: worker dibuat dengan spawn dan memuat model dari file, lalu dibuat
+ulang saat fingerprint model berubah
+"""
+import numpy as np
+import pytest
+from catboost import CatBoostClassifier
+
+import app as svc
+
+def fit_model(seed):
+    rng = np.random.default_rng(seed)
+    features = rng.normal(size=(400, 31)).astype(np.float32)
+    labels = np.digitize(features[:, 0] + features[:, 1], [-0.5, 0.5])
+    model = CatBoostClassifier(iterations=15, depth=3, random_seed=seed, thread_count=1, verbose=False,
+                               allow_writing_files=False)
+    model.fit(features, labels)
+    return model
+
+def load_into_service(monkeypatch, model, path, fingerprint):
+    model.save_model(path)
+    monkeypatch.setattr(svc, 'MODEL_PATH', path)
+    monkeypatch.setattr(svc, 'model', model)
+    monkeypatch.setattr(svc, 'model_fingerprint', fingerprint)
+
+@pytest.fixture
+def process_backend(monkeypatch):
+    monkeypatch.setattr(svc, 'INFERENCE_BACKEND', 'process')
+    monkeypatch.setattr(svc, 'INFERENCE_WORKERS', 2)
+    monkeypatch.setattr(svc, 'INFERENCE_MIN_SHARD_ROWS', 50)
+    monkeypatch.setattr(svc, 'compiled_model', None)
+    monkeypatch.setattr(svc, 'inference_process_pool', None)
+    monkeypatch.setattr(svc, 'inference_pool_fingerprint', None)
+    yield
+    if svc.inference_process_pool is not None:
+        svc.inference_process_pool.terminate()
+        svc.inference_process_pool.join()
+
+def test_process_pool_reloads_model_when_fingerprint_changes(process_backend, tmp_path, monkeypatch):
+    features = np.random.default_rng(9).normal(size=(200, 31)).astype(np.float32)
+
+    first = fit_model(1)
+    load_into_service(monkeypatch, first, str(tmp_path / 'first.cbm'), b'first')
+    np.testing.assert_allclose(svc.run_sharded_inference(first, features), first.predict_proba(features))
+    first_pool = svc.inference_process_pool
+    assert svc.get_inference_pool() is first_pool
+
+    second = fit_model(2)
+    load_into_service(monkeypatch, second, str(tmp_path / 'second.cbm'), b'second')
+    np.testing.assert_allclose(svc.run_sharded_inference(second, features), second.predict_proba(features))
+    assert svc.inference_process_pool is not first_pool
+    assert svc.inference_pool_fingerprint == b'second'
@@ -0,0 +1,29 @@
+"""
+inputs_packed: pack float32 lalu decode kembali ke nilai desimal yang dikirim user
+"""
+import json
+
+import numpy as np
+
+import app as svc
+
+def test_packed_inputs_round_trip_to_original_decimals():
+    rng = np.random.default_rng(5)
+    inputs = np.round(rng.uniform(-50, 50, (200, svc.INPUT_FEATURE_COUNT)), 4)
+    inputs[0, :4] = [1.1, 0.0, 1e-7, -0.3]
+
+    decoded = svc.unpack_inputs_column(svc.pack_inputs_matrix(inputs), [None] * len(inputs))
+    np.testing.assert_array_equal(decoded, inputs)
+    assert json.dumps(decoded[0, :4].tolist()) == '[1.1, 0.0, 1e-07, -0.3]'
+
+def test_legacy_json_rows_are_parsed():
+    legacy = json.dumps([0.5] * svc.INPUT_FEATURE_COUNT)
+    decoded = svc.unpack_inputs_column([None, b''], [legacy, None])
+    np.testing.assert_array_equal(decoded[0], 0.5)
+    np.testing.assert_array_equal(decoded[1], 0.0)
+
+def test_round_significant_keeps_special_values():
+    values = np.array([np.nan, np.inf, -np.inf, 0.0, 123456.7], dtype=np.float32)
+    rounded = svc.round_significant(values, 7)
+    assert np.isnan(rounded[0])
+    assert rounded[1:].tolist() == [np.inf, -np.inf, 0.0, 123456.7]
@@ -0,0 +1,92 @@
+"""
+Eksposisi /metrics dalam format teks Prometheus: baris HELP/TYPE, escaping label dan bucket
+histogram kumulatif
+"""
+import re
+
+import pytest
+
+import app as svc
+
+SAMPLE_PATTERN = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{.*\})? (\S+)$')
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(svc, 'metrics_histograms', {})
+    monkeypatch.setattr(svc, 'metrics_counters', {})
+    return svc.app.test_client()
+
+def scrape(client):
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    assert 'version=0.0.4' in response.headers['Content-Type']
+    return response.get_data(as_text=True)
+
+def test_every_family_has_help_and_type_before_samples(client):
+    svc.increment_metric('optipredict_rows_processed_total', 5, endpoint='/predict')
+    svc.observe_metric('optipredict_inference_duration_seconds', 0.02)
+    body = scrape(client)
+    assert body.endswith('\n')
+
+    declared = {}
+    lines = body.rstrip('\n').split('\n')
+    for idx, line in enumerate(lines):
+        if line.startswith('# HELP '):
+            name, help_text = line[len('# HELP '):].split(' ', 1)
+            assert help_text == svc.METRIC_DEFINITIONS[name][1]
+            assert lines[idx + 1] == f'# TYPE {name} {svc.METRIC_DEFINITIONS[name][0]}'
+            assert name not in declared
+            declared[name] = svc.METRIC_DEFINITIONS[name][0]
+            continue
+        if line.startswith('# TYPE '):
+            continue
+        match = SAMPLE_PATTERN.match(line)
+        assert match, line
+        family = match.group(1)
+        if family not in declared:
+            family = re.sub(r'_(bucket|sum|count)$', '', family)
+            assert declared.get(family) == 'histogram', line
+        float(match.group(3).replace('+Inf', 'inf'))
+
+    assert declared['optipredict_rows_processed_total'] == 'counter'
+    assert declared['optipredict_inference_duration_seconds'] == 'histogram'
+    assert declared['optipredict_model_loaded'] == 'gauge'
+    assert 'optipredict_rows_processed_total{endpoint="/predict"} 5' in lines
+
+def test_label_values_are_escaped(client):
+    svc.increment_metric('optipredict_rows_processed_total', 2, endpoint='a"b\\c\nd')
+    body = scrape(client)
+    assert 'optipredict_rows_processed_total{endpoint="a\\"b\\\\c\\nd"} 2\n' in body
+    # Newline di nilai label tidak boleh memecah baris sampel
+    assert all(SAMPLE_PATTERN.match(line) or line.startswith('# ') for line in body.rstrip('\n').split('\n'))
+
+def test_histogram_buckets_are_cumulative(client):
+    for value in (0.003, 0.003, 0.2, 500):
+        svc.observe_metric('optipredict_stage_duration_seconds', value, endpoint='/predict', stage='total')
+    body = scrape(client)
+
+    prefix = 'optipredict_stage_duration_seconds'
+    labels = 'endpoint="/predict",stage="total"'
+    buckets = re.findall(rf'^{prefix}_bucket\{{{labels},le="([^"]+)"\}} (\d+)$', body, re.MULTILINE)
+    expected_bounds = [svc.format_metric_value(float(bound)) for bound in svc.METRICS_LATENCY_BUCKETS] + ['+Inf']
+    assert [bound for bound, _ in buckets] == expected_bounds
+
+    counts = dict((bound, int(count)) for bound, count in buckets)
+    assert counts['0.001'] == 0 and counts['0.0025'] == 0
+    assert counts['0.005'] == 2 and counts['0.1'] == 2
+    assert counts['0.25'] == 3 and counts['300.0'] == 3
+    assert counts['+Inf'] == 4
+    assert [int(count) for _, count in buckets] == sorted(int(count) for _, count in buckets)
+
+    assert f'{prefix}_count{{{labels}}} 4\n' in body
+    total = float(re.search(rf'^{prefix}_sum\{{{labels}\}} (\S+)$', body, re.MULTILINE).group(1))
+    assert total == pytest.approx(500.206)
+
+def test_request_metrics_recorded_per_route(client):
+    client.get('/health')
+    body = scrape(client)
+    assert 'optipredict_http_requests_total{endpoint="/health",method="GET",status="200"} 1\n' in body
+    assert re.search(
+        r'^optipredict_http_request_duration_seconds_count\{endpoint="/health",method="GET"\} 1$', body, re.MULTILINE
+    )
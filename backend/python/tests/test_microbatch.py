@@ -0,0 +1,86 @@
+"""
+Micro-batching /predict: request bersamaan digabung dalam satu prediksi, batch dibatasi
+MICROBATCH_MAX_SIZE, dan timeout/error diteruskan ke setiap pemanggil yang menunggu
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+import app as svc
+
+class FakeBatchPredictor:
+    def __init__(self):
+        self.batch_sizes = []
+        self.error = None
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self, model, scaler, snr_values, inputs_matrix):
+        self.release.wait()
+        self.batch_sizes.append(len(snr_values))
+        if self.error == 'none':
+            return None, None, None
+        if self.error:
+            raise self.error
+        # Label dan confidence diturunkan dari input agar hasil bisa dicocokkan per pemanggil
+        snr = np.asarray(snr_values, dtype=np.float64)
+        return [f'label-{int(value)}' for value in snr], snr / 100, snr / 40
+
+@pytest.fixture
+def predictor(monkeypatch):
+    fake = FakeBatchPredictor()
+    monkeypatch.setattr(svc, 'predict_batch_optimized', fake)
+    monkeypatch.setattr(svc, 'MICROBATCH_ENABLED', True)
+    monkeypatch.setattr(svc, 'MICROBATCH_MAX_WAIT_MS', 200)
+    monkeypatch.setattr(svc, 'MICROBATCH_MAX_SIZE', 64)
+    yield fake
+    fake.release.set()
+
+def predict_concurrently(count):
+    start = threading.Barrier(count)
+
+    def call(snr):
+        start.wait()
+        return svc.predict_single(float(snr), np.zeros(30))
+
+    with ThreadPoolExecutor(max_workers=count) as pool:
+        return list(pool.map(call, range(count)))
+
+def test_disabled_predicts_directly(predictor, monkeypatch):
+    monkeypatch.setattr(svc, 'MICROBATCH_ENABLED', False)
+    assert svc.predict_single(20.0, np.zeros(30)) == ('label-20', 0.2, 0.5)
+    assert predictor.batch_sizes == [1]
+
+def test_concurrent_requests_share_one_batch(predictor):
+    results = predict_concurrently(8)
+    assert results == [(f'label-{snr}', snr / 100, snr / 40) for snr in range(8)]
+    assert sum(predictor.batch_sizes) == 8
+    assert len(predictor.batch_sizes) < 8
+
+def test_batches_capped_at_max_size(predictor, monkeypatch):
+    monkeypatch.setattr(svc, 'MICROBATCH_MAX_SIZE', 3)
+    predict_concurrently(8)
+    assert sum(predictor.batch_sizes) == 8
+    assert max(predictor.batch_sizes) <= 3
+
+@pytest.mark.parametrize('error, expected', [
+    (ValueError('model rusak'), ValueError),
+    ('none', RuntimeError)
+])
+def test_errors_propagate_to_every_waiter(predictor, error, expected):
+    predictor.error = error
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        futures = [pool.submit(svc.predict_single, float(snr), np.zeros(30)) for snr in range(4)]
+        for future in futures:
+            with pytest.raises(expected):
+                future.result(timeout=5)
+
+def test_waiter_times_out(predictor, monkeypatch):
+    monkeypatch.setattr(svc, 'MICROBATCH_RESULT_TIMEOUT', 0.2)
+    monkeypatch.setattr(svc, 'MICROBATCH_MAX_WAIT_MS', 0)
+    predictor.release.clear()
+    with pytest.raises(TimeoutError):
+        svc.predict_single(1.0, np.zeros(30))
+    predictor.release.set()
@@ -0,0 +1,103 @@
+"""
+Job /predict-file: status dan hasil disimpan di JOB_UPLOAD_DIR sehingga polling tidak bergantung
+pada memori worker yang menjalankan job
+"""
+import io
+import json
+
+import pytest
+
+import app as svc
+
+ROWS = [{'row_number': number, 'prediction': 'Good', 'confidence': 0.9} for number in range(1, 6)]
+
+def fake_pipeline(file, original_filename, user_id, progress=None, result_format='rows',
+                  file_hash=None, file_size=None):
+    progress('prediction', 'running', rows=len(ROWS))
+    for start in (0, 2, 4):
+        block = ROWS[start:start + 2]
+        if result_format == 'columnar':
+            block = {key: [row.get(key) for row in block] for key in svc.RESULT_COLUMNS}
+        yield ('rows', block)
+    progress('prediction', 'completed', rows=len(ROWS))
+    yield ('done', {'success': True, 'message': 'ok', 'total_rows': len(ROWS), 'processed_rows': len(ROWS)}, 200)
+
+class InlineExecutor:
+    def submit(self, fn, *args):
+        fn(*args)
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(svc, 'JOB_UPLOAD_DIR', str(tmp_path / 'jobs'))
+    monkeypatch.setattr(svc, 'iter_predict_file_pipeline', fake_pipeline)
+    monkeypatch.setattr(svc, 'executor', InlineExecutor())
+    return svc.app.test_client()
+
+def submit(client, result_format='rows'):
+    response = client.post(
+        f'/predict-file/jobs?format={result_format}',
+        data={'userId': '1', 'file': (io.BytesIO(b'snr\n1\n'), 'data.csv')},
+        content_type='multipart/form-data'
+    )
+    assert response.status_code == 202
+    return response.get_json()['job_id']
+
+def test_job_state_served_from_disk(client):
+    job_id = submit(client)
+    assert svc.jobs == {}
+
+    status = client.get(f'/predict-file/jobs/{job_id}').get_json()
+    assert status['status'] == 'completed'
+    assert status['processed_rows'] == len(ROWS)
+
+    state = svc.load_job_state(job_id)
+    assert 'results' not in state['summary']
+
+    response = client.get(f'/predict-file/jobs/{job_id}/results')
+    assert response.status_code == 200
+    payload = json.loads(response.get_data())
+    assert payload['results'] == ROWS
+    assert payload['job_id'] == job_id and payload['message'] == 'ok'
+
+def test_columnar_results_streamed_from_spool(client):
+    job_id = submit(client, 'columnar')
+    payload = json.loads(client.get(f'/predict-file/jobs/{job_id}/results').get_data())
+    assert payload['results'] == {key: [row.get(key) for row in ROWS] for key in svc.RESULT_COLUMNS}
+
+@pytest.mark.parametrize('result_format', ['rows', 'columnar'])
+def test_results_limited_for_display(client, result_format):
+    job_id = submit(client, result_format)
+    payload = json.loads(client.get(f'/predict-file/jobs/{job_id}/results?limit=3').get_data())
+    expected = ROWS[:3]
+    if result_format == 'columnar':
+        expected = {key: [row.get(key) for row in expected] for key in svc.RESULT_COLUMNS}
+    assert payload['results'] == expected
+    assert payload['is_limited'] and payload['displayed_rows'] == 3
+    assert payload['message'] == 'ok (Menampilkan 3 baris pertama dari 5 total baris)'
+
+def test_jobs_of_other_users_not_found(client):
+    job_id = submit(client)
+    assert client.get(f'/predict-file/jobs/{job_id}?userId=1').status_code == 200
+    assert client.get(f'/predict-file/jobs/{job_id}?userId=2').status_code == 404
+    assert client.get(f'/predict-file/jobs/{job_id}/results?userId=2').status_code == 404
+
+def test_non_finite_values_spooled_as_null(client, monkeypatch):
+    def nan_pipeline(*args, **kwargs):
+        yield ('rows', [{'row_number': 1, 'confidence': float('nan'), 'snr': float('inf')}])
+        yield ('done', {'success': True, 'message': 'ok', 'processed_rows': 1}, 200)
+    monkeypatch.setattr(svc, 'iter_predict_file_pipeline', nan_pipeline)
+    job_id = submit(client)
+    payload = json.loads(client.get(f'/predict-file/jobs/{job_id}/results').get_data(as_text=True),
+                         parse_constant=lambda constant: pytest.fail(f'{constant} di JSON'))
+    assert payload['results'] == [{'row_number': 1, 'confidence': None, 'snr': None}]
+
+def test_unknown_and_invalid_job_ids(client):
+    assert client.get('/predict-file/jobs/0123456789abcdef0123456789abcdef').status_code == 404
+    assert client.get('/predict-file/jobs/..%2F..%2Fetc').status_code == 404
+
+def test_expired_jobs_removed(client, monkeypatch):
+    job_id = submit(client)
+    monkeypatch.setattr(svc, 'JOB_RESULT_TTL', -1)
+    svc.cleanup_expired_jobs()
+    assert svc.load_job_state(job_id) is None
+    assert not (svc.os.path.exists(svc.job_results_path(job_id)))
@@ -0,0 +1,47 @@
+"""
+Prediction cache hanya dipakai untuk batch kecil: batch besar (chunk /predict-file) tidak di-hash
+"""
+import numpy as np
+import pytest
+from sklearn.preprocessing import MinMaxScaler
+
+import app as svc
+
+class FakeModel:
+    def __init__(self):
+        self.rows = []
+
+    def predict_proba(self, features):
+        self.rows.append(len(features))
+        probabilities = np.zeros((len(features), len(svc.PREDICTION_LABELS)))
+        probabilities[:, 0] = 1.0
+        return probabilities
+
+@pytest.fixture
+def fake_model(monkeypatch):
+    fake = FakeModel()
+    monkeypatch.setattr(svc, 'run_sharded_inference', lambda model, features, stats=None: model.predict_proba(features))
+    monkeypatch.setattr(svc, 'PREDICTION_CACHE_ENABLED', True)
+    monkeypatch.setattr(svc, 'PREDICTION_CACHE_MAX_BATCH_ROWS', 16)
+    monkeypatch.setattr(svc, 'prediction_cache', svc.OrderedDict())
+    return fake
+
+def predict(fake, rows):
+    rng = np.random.default_rng(rows)
+    scaler = MinMaxScaler().fit([[0.0], [40.0]])
+    return svc.predict_batch_optimized(fake, scaler, rng.uniform(0, 40, rows), rng.random((rows, svc.INPUT_FEATURE_COUNT)))
+
+def test_small_batch_hits_cache(fake_model):
+    predict(fake_model, 8)
+    predict(fake_model, 8)
+    assert fake_model.rows == [8]
+    assert len(svc.prediction_cache) == 8
+
+def test_large_batch_bypasses_cache(fake_model, monkeypatch):
+    def fail(features_matrix):
+        raise AssertionError('batch besar tidak boleh di-hash')
+    monkeypatch.setattr(svc, 'prediction_cache_keys', fail)
+    predict(fake_model, 32)
+    predict(fake_model, 32)
+    assert fake_model.rows == [32, 32]
+    assert len(svc.prediction_cache) == 0
@@ -0,0 +1,67 @@
+"""
+Alokasi prediction number lewat prediction_counters: pemanggilan bersamaan mendapat blok
+berurutan yang tidak tumpang tindih
+"""
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import app as svc
+
+def allocate(user_id, count):
+    conn = svc.get_db_connection()
+    try:
+        return svc.allocate_prediction_numbers(conn, user_id, count)
+    finally:
+        svc.close_db_connection(conn)
+
+def test_concurrent_allocations_get_disjoint_contiguous_blocks(sqlite_db):
+    counts = [1, 5, 3, 50, 2, 7] * 8
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        firsts = list(pool.map(allocate, [1] * len(counts), counts))
+
+    numbers = sorted(number for first, count in zip(firsts, counts) for number in range(first, first + count))
+    assert numbers == list(range(1, sum(counts) + 1))
+
+    conn = sqlite3.connect(sqlite_db)
+    assert conn.execute("SELECT last_number FROM prediction_counters WHERE user_id = 1").fetchone() == (sum(counts),)
+    conn.close()
+
+def test_counters_are_per_user(sqlite_db):
+    assert allocate(1, 4) == 1
+    assert allocate(2, 2) == 1
+    assert allocate(1, 1) == 5
+
+def test_falls_back_to_max_prediction_number_without_counter_table(sqlite_db):
+    conn = sqlite3.connect(sqlite_db)
+    conn.execute("DROP TABLE prediction_counters")
+    conn.execute("INSERT INTO predictions (user_id, prediction_number) VALUES (1, 41)")
+    conn.commit()
+    conn.close()
+    assert allocate(1, 3) == 42
+
+class FailingCursor:
+    def __init__(self):
+        self.executed = []
+
+    def execute(self, sql, params=()):
+        self.executed.append(sql)
+        raise svc.mysql.connector.OperationalError(msg='Lost connection to MySQL server', errno=2013)
+
+    def close(self):
+        pass
+
+class FailingConnection:
+    def __init__(self):
+        self.cursor_obj = FailingCursor()
+
+    def cursor(self):
+        return self.cursor_obj
+
+def test_other_counter_errors_are_not_masked_by_fallback():
+    conn = FailingConnection()
+    with pytest.raises(svc.mysql.connector.OperationalError):
+        svc.allocate_prediction_numbers(conn, 1, 3)
+    assert len(conn.cursor_obj.executed) == 1
+    assert 'MAX(prediction_number)' not in conn.cursor_obj.executed[0]
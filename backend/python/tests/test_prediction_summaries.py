@@ -0,0 +1,104 @@
+"""
+Summary prediksi per user: delta insert/hapus diterapkan inkremental dan rekonsiliasi
+mendeteksi serta memperbaiki drift terhadap tabel predictions
+"""
+import sqlite3
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+import app as svc
+
+def insert_predictions(user_id, labels, created_at=None):
+    rng = np.random.default_rng(len(labels))
+    count = len(labels)
+    rows = svc.build_prediction_rows(
+        user_id, 1, rng.uniform(0, 40, count), rng.random(count), rng.random((count, svc.INPUT_FEATURE_COUNT)),
+        labels, rng.uniform(50, 100, count), 'Manual'
+    )
+    if created_at:
+        created_index = svc.PREDICTION_INSERT_COLUMNS.index('created_at')
+        rows = [row[:created_index] + (created_at,) + row[created_index + 1:] for row in rows]
+    assert svc.batch_insert_predictions(user_id, rows)
+
+def stored_summary(path, user_id):
+    conn = sqlite3.connect(path)
+    total = conn.execute("SELECT total_count FROM prediction_summaries WHERE user_id = ?", (user_id,)).fetchone()
+    labels = dict(conn.execute(
+        "SELECT prediction, prediction_count FROM prediction_label_counts WHERE user_id = ?", (user_id,)
+    ).fetchall())
+    conn.close()
+    return (total[0] if total else None), labels
+
+@pytest.fixture
+def db(sqlite_db, tmp_path, monkeypatch):
+    monkeypatch.setattr(svc, 'PREDICTION_ARCHIVE_DIR', str(tmp_path / 'archive'))
+    return sqlite_db
+
+def test_insert_applies_incremental_delta(db):
+    insert_predictions(1, ['Good', 'Bad', 'Good'], datetime(2024, 3, 1, 10))
+    insert_predictions(1, ['Good'], datetime(2024, 3, 2, 9))
+    insert_predictions(2, ['Bad'])
+
+    assert stored_summary(db, 1) == (4, {'Good': 3, 'Bad': 1})
+    assert stored_summary(db, 2) == (1, {'Bad': 1})
+
+    summary = svc.get_prediction_summary(1)
+    assert summary['count'] == 4 and summary['labels'] == {'Good': 3, 'Bad': 1}
+    assert summary['last_prediction_at'] == '2024-03-02T09:00:00'
+
+def test_older_insert_does_not_move_last_prediction_back(db):
+    insert_predictions(1, ['Good'], datetime(2024, 3, 2, 9))
+    insert_predictions(1, ['Good'], datetime(2024, 1, 1))
+    assert svc.get_prediction_summary(1)['last_prediction_at'] == '2024-03-02T09:00:00'
+
+def test_delete_delta_decrements_counts(db):
+    insert_predictions(1, ['Good', 'Bad', 'Good'])
+    conn = svc.get_db_connection()
+    cursor = conn.cursor()
+    try:
+        svc.apply_prediction_summary_delta(cursor, {1: (-2, None)}, {(1, 'Good'): -1, (1, 'Bad'): -1})
+        conn.commit()
+    finally:
+        svc.close_db_connection(conn, cursor)
+
+    assert stored_summary(db, 1) == (1, {'Good': 1, 'Bad': 0})
+    # Label dengan count 0 tidak ditampilkan
+    assert svc.get_prediction_summary(1)['labels'] == {'Good': 1}
+
+def test_reconcile_detects_and_rebuilds_drift(db):
+    insert_predictions(1, ['Good', 'Bad'])
+    insert_predictions(2, ['Good'])
+    assert svc.reconcile_prediction_summaries() == []
+
+    # Baris yang masuk tanpa summary (mis. insert manual) dan summary user 2 yang rusak
+    conn = sqlite3.connect(db)
+    conn.execute("INSERT INTO predictions (user_id, prediction, created_at) VALUES (1, 'Bad', '2024-05-01 00:00:00')")
+    conn.execute("UPDATE prediction_summaries SET total_count = 7 WHERE user_id = 2")
+    conn.commit()
+    conn.close()
+
+    drifts = svc.reconcile_prediction_summaries()
+    assert drifts == [
+        {'user_id': 1, 'stored': {'count': 2, 'labels': {'Good': 1, 'Bad': 1}},
+         'actual': {'count': 3, 'labels': {'Good': 1, 'Bad': 2}}},
+        {'user_id': 2, 'stored': {'count': 7, 'labels': {'Good': 1}},
+         'actual': {'count': 1, 'labels': {'Good': 1}}}
+    ]
+    assert stored_summary(db, 1) == (2, {'Good': 1, 'Bad': 1})
+
+    assert len(svc.reconcile_prediction_summaries(rebuild=True)) == 2
+    assert stored_summary(db, 1) == (3, {'Good': 1, 'Bad': 2})
+    assert stored_summary(db, 2) == (1, {'Good': 1})
+    assert svc.reconcile_prediction_summaries() == []
+
+def test_reconcile_removes_summary_of_user_without_predictions(db):
+    insert_predictions(1, ['Good'])
+    conn = sqlite3.connect(db)
+    conn.execute("DELETE FROM predictions")
+    conn.commit()
+    conn.close()
+
+    assert [drift['user_id'] for drift in svc.reconcile_prediction_summaries(user_id=1, rebuild=True)] == [1]
+    assert stored_summary(db, 1) == (None, {})
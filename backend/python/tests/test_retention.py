@@ -0,0 +1,201 @@
+"""
+Partisi bulanan dan retensi predictions: batas partisi dari information_schema, pembuatan
+partisi ke depan, verifikasi jumlah baris arsip sebelum DROP, dan history dari arsip Parquet
+"""
+import os
+from datetime import date, datetime, timedelta
+
+import pytest
+
+import app as svc
+
+pytest.importorskip('pyarrow')
+
+class ScriptedCursor:
+    """
+    Cursor palsu: hasil query dipilih dari pasangan (potongan SQL, baris) pertama yang cocok
+    """
+    def __init__(self, responses):
+        self.responses = responses
+        self.executed = []
+        self.rows = []
+
+    def execute(self, sql, params=()):
+        self.executed.append(' '.join(sql.split()))
+        self.rows = next((list(rows) for key, rows in self.responses if key in sql), [])
+
+    def fetchone(self):
+        return self.rows.pop(0) if self.rows else None
+
+    def fetchall(self):
+        rows, self.rows = self.rows, []
+        return rows
+
+    def fetchmany(self, size=1):
+        rows, self.rows = self.rows[:size], self.rows[size:]
+        return rows
+
+    def close(self):
+        pass
+
+class ScriptedConnection:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def cursor(self, **kwargs):
+        return self._cursor
+
+    def close(self):
+        pass
+
+def to_days(value):
+    # TO_DAYS MySQL untuk tanggal
+    return str(value.toordinal() + 365)
+
+def partition_rows(*bounds):
+    rows = [(f"p{bound:%Y%m}", to_days(bound), 10) for bound in bounds]
+    return rows + [('pmax', 'MAXVALUE', 0)]
+
+def archive_row(row_id, user_id, created_at, prediction='Good', quality='High'):
+    return (row_id, user_id, row_id, 20.0, 0.5, None, b'\x00' * 4, prediction, 90.0, quality,
+            'Manual', svc.MODEL_VERSION, created_at, None)
+
+def test_add_months():
+    assert svc.add_months(datetime(2024, 1, 31, 13, 5), 1) == datetime(2024, 2, 1)
+    assert svc.add_months(datetime(2024, 11, 15), 2) == datetime(2025, 1, 1)
+    assert svc.add_months(datetime(2024, 1, 15), -13) == datetime(2022, 12, 1)
+    assert svc.add_months(datetime(2024, 3, 1), 0) == datetime(2024, 3, 1)
+
+def test_partition_bounds_parsed_from_to_days():
+    cursor = ScriptedCursor([('information_schema.PARTITIONS', partition_rows(date(2024, 2, 1), date(2024, 3, 1)))])
+    partitions = svc.list_prediction_partitions(cursor)
+    assert partitions == [
+        {'name': 'p202402', 'upper_bound': datetime(2024, 2, 1), 'rows': 10},
+        {'name': 'p202403', 'upper_bound': datetime(2024, 3, 1), 'rows': 10},
+        {'name': 'pmax', 'upper_bound': None, 'rows': 0}
+    ]
+    assert svc.list_prediction_partitions(ScriptedCursor([])) == []
+
+def test_archive_file_names_parsed(tmp_path, monkeypatch):
+    monkeypatch.setattr(svc, 'PREDICTION_ARCHIVE_DIR', str(tmp_path))
+    for name in ('predictions_20240201_p202401.parquet', 'predictions_20240301_p202402.parquet',
+                 'predictions_20240301_p202402.parquet.tmp', 'notes.txt'):
+        (tmp_path / name).write_bytes(b'')
+    assert svc.prediction_archive_files() == [
+        (datetime(2024, 3, 1), str(tmp_path / 'predictions_20240301_p202402.parquet')),
+        (datetime(2024, 2, 1), str(tmp_path / 'predictions_20240201_p202401.parquet'))
+    ]
+
+def test_ensure_partitions_splits_maxvalue_up_to_premake(monkeypatch):
+    monkeypatch.setattr(svc, 'PREDICTION_PARTITION_PREMAKE_MONTHS', 3)
+    partitions = [{'name': 'p202505', 'upper_bound': datetime(2025, 6, 1), 'rows': 5},
+                  {'name': 'pmax', 'upper_bound': None, 'rows': 0}]
+    cursor = ScriptedCursor([])
+    created = svc.ensure_prediction_partitions(cursor, partitions, now=datetime(2025, 6, 15))
+
+    assert created == ['p202506', 'p202507', 'p202508', 'p202509']
+    assert len(cursor.executed) == 1
+    assert 'REORGANIZE PARTITION pmax INTO' in cursor.executed[0]
+    assert "PARTITION p202509 VALUES LESS THAN (TO_DAYS('2025-10-01'))" in cursor.executed[0]
+    assert cursor.executed[0].endswith('PARTITION pmax VALUES LESS THAN MAXVALUE )')
+
+@pytest.mark.parametrize('partitions', [
+    [{'name': 'p202509', 'upper_bound': datetime(2025, 10, 1), 'rows': 0}, {'name': 'pmax', 'upper_bound': None, 'rows': 0}],
+    [{'name': 'p202509', 'upper_bound': datetime(2025, 10, 1), 'rows': 0}],
+    []
+])
+def test_ensure_partitions_noop(partitions, monkeypatch):
+    monkeypatch.setattr(svc, 'PREDICTION_PARTITION_PREMAKE_MONTHS', 3)
+    cursor = ScriptedCursor([])
+    assert svc.ensure_prediction_partitions(cursor, partitions, now=datetime(2025, 6, 15)) == []
+    assert cursor.executed == []
+
+def test_dry_run_lists_expired_partitions_as_pending(monkeypatch):
+    monkeypatch.setattr(svc, 'PREDICTION_RETENTION_MONTHS', 12)
+    cursor = ScriptedCursor([
+        ('GET_LOCK', [(1,)]),
+        ('information_schema.PARTITIONS', partition_rows(date(2024, 5, 1), date(2024, 6, 1), date(2024, 7, 1)))
+    ])
+    monkeypatch.setattr(svc, 'get_db_connection', lambda: ScriptedConnection(cursor))
+
+    result = svc.apply_prediction_retention(dry_run=True, now=datetime(2025, 6, 15))
+    assert result['pending'] == [{'partition': 'p202405', 'rows': 10}, {'partition': 'p202406', 'rows': 10}]
+    assert result['created'] == [] and result['archived'] == []
+    assert not any('ALTER TABLE' in sql for sql in cursor.executed)
+    assert cursor.executed[-1].startswith('DO RELEASE_LOCK')
+
+def test_retention_skipped_when_lock_held(monkeypatch):
+    cursor = ScriptedCursor([('GET_LOCK', [(0,)])])
+    monkeypatch.setattr(svc, 'get_db_connection', lambda: ScriptedConnection(cursor))
+    assert svc.apply_prediction_retention(dry_run=True)['skipped'] == 'locked'
+
+@pytest.fixture
+def archive_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(svc, 'PREDICTION_ARCHIVE_DIR', str(tmp_path / 'archive'))
+    return tmp_path / 'archive'
+
+PARTITION = {'name': 'p202401', 'upper_bound': datetime(2024, 2, 1), 'rows': 3}
+
+def test_archive_verified_then_partition_dropped(archive_dir):
+    rows = [archive_row(row_id, 1, datetime(2024, 1, row_id)) for row_id in (1, 2, 3)]
+    cursor = ScriptedCursor([('COUNT(*)', [(3,)]), ('PARTITION (p202401)', rows)])
+
+    archived_rows, path = svc.archive_prediction_partition(ScriptedConnection(cursor), PARTITION)
+    assert archived_rows == 3
+    assert path == str(archive_dir / 'predictions_20240201_p202401.parquet')
+    assert svc.pq.read_table(path)['id'].to_pylist() == [1, 2, 3]
+    assert cursor.executed[-1] == 'ALTER TABLE predictions DROP PARTITION p202401'
+    assert not any('excel_inputs' in sql for sql in cursor.executed)
+
+def test_archive_row_count_mismatch_keeps_partition(archive_dir):
+    rows = [archive_row(row_id, 1, datetime(2024, 1, row_id)) for row_id in (1, 2, 3)]
+    cursor = ScriptedCursor([('COUNT(*)', [(4,)]), ('PARTITION (p202401)', rows)])
+
+    with pytest.raises(RuntimeError, match='Verifikasi arsip p202401 gagal'):
+        svc.archive_prediction_partition(ScriptedConnection(cursor), PARTITION)
+    assert os.listdir(archive_dir) == []
+    assert not any('DROP PARTITION' in sql for sql in cursor.executed)
+
+@pytest.fixture
+def archived_history(archive_dir):
+    archive_dir.mkdir()
+    schema = svc.prediction_archive_schema()
+    months = {}
+    for row_id in range(1, 25):
+        # Dua baris per created_at untuk menguji tie-break id; user 2 menyela di setiap baris ke-3
+        created_at = datetime(2024, 1, 10) + timedelta(days=3 * ((row_id - 1) // 2))
+        row = archive_row(row_id, 2 if row_id % 3 == 0 else 1, created_at,
+                          prediction='Good' if row_id % 2 else 'Bad')
+        months.setdefault(svc.add_months(created_at, 1), []).append(row)
+    for upper_bound, rows in months.items():
+        svc.pq.write_table(svc.archive_rows_to_table(rows, schema),
+                           str(archive_dir / f'predictions_{upper_bound:%Y%m%d}_p{rows[0][12]:%Y%m}.parquet'))
+    return sorted((row for rows in months.values() for row in rows), key=lambda row: (row[12], row[0]), reverse=True)
+
+def archived_pages(filters, limit=4):
+    pages, page_cursor = [], None
+    while True:
+        page = svc.read_archived_history(1, filters, page_cursor, limit + 1)
+        pages.append(page[:limit])
+        if len(page) <= limit:
+            return pages
+        page_cursor = (page[limit - 1]['created_at'], page[limit - 1]['id'])
+
+def test_archived_history_pages_across_files(archived_history):
+    pages = archived_pages({})
+    assert [row['id'] for page in pages for row in page] == [row[0] for row in archived_history if row[1] == 1]
+    assert all(row['archived'] for page in pages for row in page)
+    assert len(pages) > 2
+
+def test_archived_history_filters(archived_history):
+    filters = svc.parse_history_filters({'prediction': 'Good', 'from': '2024-01-16', 'to': '2024-02-06'})
+    ids = [row['id'] for page in archived_pages(filters, limit=2) for row in page]
+    expected = [row[0] for row in archived_history
+                if row[1] == 1 and row[7] == 'Good' and datetime(2024, 1, 16) <= row[12] < datetime(2024, 2, 7)]
+    assert ids == expected and ids
+
+def test_archived_history_continues_after_hot_table_cursor(archived_history):
+    newest = archived_history[0]
+    rows = svc.read_archived_history(1, {}, (newest[12], newest[0]), 3)
+    assert all((row['created_at'], row['id']) < (newest[12], newest[0]) for row in rows)
+    assert [row['id'] for row in rows] == [row[0] for row in archived_history[1:] if row[1] == 1][:3]
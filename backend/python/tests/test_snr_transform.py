@@ -0,0 +1,93 @@
+"""
+Transform SNR tervektorisasi (assemble_features / normalize_snr_column) harus identik secara
+numerik dengan MinMaxScaler.transform, termasuk feature_range lain dan clip
+"""
+import os
+import warnings
+
+import joblib
+import numpy as np
+import pytest
+from sklearn.preprocessing import MinMaxScaler, StandardScaler
+
+import app as svc
+
+# Scaler repo di-fit dengan nama kolom; app.py memanggil transform dengan array biasa
+pytestmark = pytest.mark.filterwarnings('ignore:X does not have valid feature names')
+
+def repo_scaler():
+    if not os.path.exists(svc.SNR_SCALER_PATH):
+        pytest.skip('scaler SNR repo tidak ada')
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        return joblib.load(svc.SNR_SCALER_PATH)
+
+SCALERS = {
+    'repo': repo_scaler,
+    'default': lambda: MinMaxScaler().fit([[0.0], [30.0]]),
+    'feature_range': lambda: MinMaxScaler(feature_range=(-1, 1)).fit([[-5.0], [42.5]]),
+    'clip': lambda: MinMaxScaler(clip=True).fit([[2.0], [28.0]])
+}
+
+def snr_sample(scaler, count=4096):
+    # Rentang fit ± 50% agar nilai di luar rentang (dan clip) ikut teruji
+    rng = np.random.default_rng(0)
+    low, high = float(scaler.data_min_[0]), float(scaler.data_max_[0])
+    margin = (high - low) * 0.5
+    return np.concatenate([[low, high, low - margin, high + margin], rng.uniform(low - margin, high + margin, count)])
+
+@pytest.fixture
+def install_scaler(monkeypatch):
+    def install(scaler):
+        monkeypatch.setattr(svc, 'snr_scaler', scaler)
+        monkeypatch.setattr(svc, 'snr_transform', None)
+        monkeypatch.setattr(svc, 'snr_transform_state', {'status': 'not_loaded', 'max_abs_diff': None})
+        svc.prepare_snr_transform()
+        return scaler
+    return install
+
+@pytest.mark.parametrize('name', sorted(SCALERS))
+def test_assemble_features_matches_scaler_transform(install_scaler, monkeypatch, name):
+    scaler = install_scaler(SCALERS[name]())
+    assert svc.snr_transform_state['status'] == 'ready'
+
+    snr_values = snr_sample(scaler)
+    inputs_matrix = np.random.default_rng(1).random((len(snr_values), svc.INPUT_FEATURE_COUNT))
+    expected = scaler.transform(snr_values.astype(np.float32).reshape(-1, 1)).ravel()
+
+    # Jalur tervektorisasi tidak boleh memanggil sklearn
+    monkeypatch.setattr(scaler, 'transform', lambda X: pytest.fail('scaler.transform dipanggil'), raising=False)
+    features_matrix, snr_normalized = svc.assemble_features(scaler, snr_values, inputs_matrix)
+
+    assert features_matrix.dtype == np.float32 and features_matrix.shape == (len(snr_values), 31)
+    assert np.allclose(snr_normalized, expected, rtol=0, atol=svc.SNR_TRANSFORM_PARITY_TOLERANCE)
+    assert np.shares_memory(snr_normalized, features_matrix)
+    assert np.allclose(features_matrix[:, 1:], inputs_matrix.astype(np.float32))
+    if scaler.clip:
+        assert snr_normalized.min() == scaler.feature_range[0] and snr_normalized.max() == scaler.feature_range[1]
+
+def test_normalize_snr_column_matches_scaler_transform(install_scaler):
+    scaler = install_scaler(SCALERS['default']())
+    features_matrix = np.zeros((1000, svc.INPUT_FEATURE_COUNT + 1), dtype=np.float32)
+    features_matrix[:, 0] = np.linspace(-15, 45, 1000)
+    expected = scaler.transform(features_matrix[:, :1]).ravel()
+
+    result = svc.normalize_snr_column(scaler, features_matrix)
+    assert np.allclose(result, expected, rtol=0, atol=svc.SNR_TRANSFORM_PARITY_TOLERANCE)
+    assert np.allclose(features_matrix[:, 0], expected, rtol=0, atol=svc.SNR_TRANSFORM_PARITY_TOLERANCE)
+
+def test_other_scaler_falls_back_to_sklearn(install_scaler):
+    scaler = install_scaler(StandardScaler().fit([[0.0], [30.0]]))
+    assert svc.snr_transform is None
+    assert svc.snr_transform_state['status'] == 'unsupported'
+
+    snr_values = np.linspace(-10, 40, 200)
+    _, snr_normalized = svc.assemble_features(scaler, snr_values, np.zeros((200, svc.INPUT_FEATURE_COUNT)))
+    assert np.allclose(snr_normalized, scaler.transform(snr_values.astype(np.float32).reshape(-1, 1)).ravel())
+
+def test_transform_of_other_scaler_is_not_reused(install_scaler):
+    install_scaler(SCALERS['default']())
+    other = MinMaxScaler().fit([[10.0], [20.0]])
+    snr_values = np.array([5.0, 15.0, 25.0])
+    _, snr_normalized = svc.assemble_features(other, snr_values, np.zeros((3, svc.INPUT_FEATURE_COUNT)))
+    assert np.allclose(snr_normalized, [-0.5, 0.5, 1.5])
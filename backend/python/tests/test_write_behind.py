@@ -0,0 +1,92 @@
+"""
+Journal write-behind: baris yang gagal ditulis masuk journal lalu diputar ulang ke database
+dengan excel_input_id dan status akhir upload tetap utuh
+"""
+import os
+import queue
+import sqlite3
+
+import numpy as np
+import pytest
+
+import app as svc
+
+@pytest.fixture
+def write_behind(sqlite_db, tmp_path, monkeypatch):
+    monkeypatch.setattr(svc, 'WRITE_BEHIND_JOURNAL_DIR', str(tmp_path / 'journal'))
+    monkeypatch.setattr(svc, 'write_behind_queues', [queue.Queue()])
+    monkeypatch.setattr(svc, 'write_behind_uploads', {})
+    monkeypatch.setitem(svc.write_behind_state, 'pending_rows', 0)
+    monkeypatch.setitem(svc.write_behind_state, 'stopping', False)
+    return sqlite_db
+
+def create_upload(path, user_id=1):
+    conn = sqlite3.connect(path)
+    cursor = conn.execute(
+        "INSERT INTO excel_inputs (user_id, file_hash, model_version, status) VALUES (?, 'hash', ?, 'processing')",
+        (user_id, svc.MODEL_VERSION)
+    )
+    conn.commit()
+    conn.close()
+    return cursor.lastrowid
+
+def prediction_rows(count, user_id=1):
+    rng = np.random.default_rng(0)
+    return svc.build_prediction_rows(
+        user_id, 0, rng.uniform(0, 40, count), rng.random(count), rng.random((count, svc.INPUT_FEATURE_COUNT)),
+        ['Normal'] * count, rng.uniform(50, 100, count), 'Excel File'
+    )
+
+def journal_upload_rows(excel_input_id, count):
+    """
+    Daftarkan baris upload seperti enqueue_prediction_rows, lalu paksa masuk journal
+    """
+    item = {
+        'user_id': 1, 'rows': prediction_rows(count), 'excel_input_id': excel_input_id, 'first_number': None,
+        'id': None, 'status': 'queued', 'counted': False, 'done': None
+    }
+    svc.write_behind_uploads[excel_input_id] = {'pending': count, 'finish': None, 'lost': False}
+    svc.journal_write_behind_items([item], 'test')
+    return item
+
+def replay_and_write():
+    svc.replay_write_behind_journal()
+    items = []
+    while not svc.write_behind_queues[0].empty():
+        items.append(svc.write_behind_queues[0].get_nowait())
+    svc.write_prediction_batch(items)
+    return items
+
+def upload_state(path, excel_input_id):
+    conn = sqlite3.connect(path)
+    status = conn.execute("SELECT status, processed_rows FROM excel_inputs WHERE id = ?", (excel_input_id,)).fetchone()
+    linked = conn.execute("SELECT COUNT(*) FROM predictions WHERE excel_input_id = ?", (excel_input_id,)).fetchone()[0]
+    conn.close()
+    return status, linked
+
+def test_journaled_rows_keep_upload_pending_until_replayed(write_behind):
+    excel_input_id = create_upload(write_behind)
+    item = journal_upload_rows(excel_input_id, 3)
+    assert item['status'] == 'journaled'
+
+    svc.finish_upload_when_persisted(excel_input_id, 'completed', 3, 3)
+    assert upload_state(write_behind, excel_input_id) == (('processing', None), 0)
+
+    replayed = replay_and_write()
+    assert [len(item['rows']) for item in replayed] == [3]
+    assert upload_state(write_behind, excel_input_id) == (('completed', 3), 3)
+    assert excel_input_id not in svc.write_behind_uploads
+
+def test_replay_after_restart_restores_upload_finish(write_behind):
+    excel_input_id = create_upload(write_behind)
+    journal_upload_rows(excel_input_id, 2)
+    svc.finish_upload_when_persisted(excel_input_id, 'completed', 2, 2)
+
+    # Shutdown menyimpan status akhir upload ke journal; proses baru tidak mengenal upload ini
+    svc.shutdown_write_behind(timeout=0)
+    svc.write_behind_uploads.clear()
+    svc.write_behind_state['stopping'] = False
+
+    replay_and_write()
+    assert upload_state(write_behind, excel_input_id) == (('completed', 2), 2)
+    assert not os.listdir(svc.WRITE_BEHIND_JOURNAL_DIR)
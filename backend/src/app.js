@@ -12,6 +12,7 @@ const multer = require('multer');
 const FormData = require('form-data');
 const fs = require('fs');
 const path = require('path');
+const readline = require('readline');
 
 const app = express();
 
@@ -327,9 +328,18 @@ app.get('/api/predictions', verifyToken, async (req, res) => {
       return res.status(400).json({ success: false, message: 'Invalid user ID' });
     }
 
+    // Teruskan cursor keyset dan filter opsional ke Flask
+    const params = { limit };
+    for (const key of ['cursor', 'prediction', 'quality', 'from', 'to', 'archived']) {
+      if (req.query[key]) {
+        params[key] = req.query[key];
+      }
+    }
+
     const flaskResponse = await axios.get(
-      `${FLASK_ML_URL}/predictions/${userId}?limit=${limit}`,
+      `${FLASK_ML_URL}/predictions/${userId}`,
       {
+        params,
         timeout: 30000,
         validateStatus: function (status) {
           return status < 600;
@@ -339,6 +349,8 @@ app.get('/api/predictions', verifyToken, async (req, res) => {
 
     if (flaskResponse.status === 200) {
       res.json(flaskResponse.data);
+    } else if (flaskResponse.status === 400) {
+      res.status(400).json(flaskResponse.data);
     } else {
       res.status(flaskResponse.status).json({
         success: false,
@@ -367,6 +379,49 @@ app.get('/api/predictions', verifyToken, async (req, res) => {
   }
 });
 
+// Endpoint analytics history (agregat dihitung di Flask/MySQL)
+app.get('/api/predictions/analytics', verifyToken, async (req, res) => {
+  try {
+    const userId = req.userId;
+
+    if (!userId || isNaN(userId)) {
+      return res.status(400).json({ success: false, message: 'Invalid user ID' });
+    }
+
+    const params = {};
+    for (const key of ['from', 'to', 'prediction', 'quality', 'confidence_bin', 'snr_bin']) {
+      if (req.query[key]) {
+        params[key] = req.query[key];
+      }
+    }
+
+    const flaskResponse = await axios.get(
+      `${FLASK_ML_URL}/predictions/analytics/${userId}`,
+      {
+        params,
+        timeout: 30000,
+        validateStatus: status => status < 600
+      }
+    );
+
+    res.status(flaskResponse.status).json(flaskResponse.data);
+  } catch (error) {
+    console.error('Error getting prediction analytics:', error);
+    if (error.code === 'ECONNREFUSED') {
+      res.status(503).json({
+        success: false,
+        message: 'Flask ML service tidak tersedia. Pastikan Flask berjalan di port 5001.'
+      });
+    } else {
+      res.status(500).json({
+        success: false,
+        message: 'Gagal mengambil analytics predictions',
+        error: error.message
+      });
+    }
+  }
+});
+
 // Delete all predictions
 app.delete('/api/predictions/all', verifyToken, async (req, res) => {
   try {
@@ -386,8 +441,9 @@ app.delete('/api/predictions/all', verifyToken, async (req, res) => {
       }
     );
 
-    if (flaskResponse.status === 200) {
-      res.json(flaskResponse.data);
+    // Penghapusan berjalan sebagai job di Flask (202 + job_id untuk polling)
+    if (flaskResponse.status === 200 || flaskResponse.status === 202) {
+      res.status(flaskResponse.status).json(flaskResponse.data);
     } else {
       res.status(flaskResponse.status).json({
         success: false,
@@ -404,6 +460,20 @@ app.delete('/api/predictions/all', verifyToken, async (req, res) => {
   }
 });
 
+// Status dan progress job delete all predictions
+app.get('/api/predictions/delete-jobs/:jobId', verifyToken, async (req, res) => {
+  try {
+    const flaskResponse = await axios.get(
+      `${FLASK_ML_URL}/predictions/delete-jobs/${encodeURIComponent(req.params.jobId)}`,
+      { params: { userId: req.userId }, timeout: 30000, validateStatus: status => status < 600 }
+    );
+    res.status(flaskResponse.status).json(flaskResponse.data);
+  } catch (error) {
+    console.error('❌ Error /api/predictions/delete-jobs/:jobId:', error.message);
+    res.status(503).json({ success: false, message: 'Flask ML service tidak tersedia' });
+  }
+});
+
 // Delete single prediction
 app.delete('/api/prediction/:id', verifyToken, async (req, res) => {
   try {
@@ -491,6 +561,39 @@ function sanitizeJsonData(obj) {
   return obj;
 }
 
+// Baca response NDJSON dari Flask baris per baris: hanya maxRows hasil pertama
+// yang disimpan, sisanya cukup dihitung sehingga memori tetap kecil
+const MAX_DISPLAYED_ROWS = 10000;
+
+async function readPredictionStream(stream, maxRows) {
+  const rl = readline.createInterface({ input: stream, crlfDelay: Infinity });
+  const results = [];
+  let summary = null;
+
+  for await (const line of rl) {
+    if (!line.trim()) {
+      continue;
+    }
+    const event = sanitizeJsonData(JSON.parse(line.replace(/:\s*(-?Infinity|NaN)\s*([,}\]])/g, ': null$2')));
+    if (event.type === 'rows') {
+      for (const row of event.results || []) {
+        if (results.length >= maxRows) {
+          break;
+        }
+        results.push(row);
+      }
+    } else {
+      summary = event;
+    }
+  }
+
+  if (!summary) {
+    throw new Error('Stream dari Flask ML service terputus sebelum ringkasan diterima');
+  }
+
+  return { ...summary, success: summary.type === 'summary' && Boolean(summary.success), results };
+}
+
 // Endpoint untuk prediksi file batch
 app.post('/api/predict-file', verifyToken, upload.single('file'), async (req, res) => {
   let tempFilePath = null;
@@ -530,12 +633,12 @@ app.post('/api/predict-file', verifyToken, upload.single('file'), async (req, re
       {
         headers: {
           ...formData.getHeaders(),
-          'Accept': 'application/json'
+          'Accept': 'application/x-ndjson'
         },
         maxContentLength: 1000 * 1024 * 1024,
         maxBodyLength: 1000 * 1024 * 1024,
         timeout: timeoutDuration,
-        responseType: 'text',
+        responseType: 'stream',
         validateStatus: function (status) {
           return status < 600;
         }
@@ -543,6 +646,7 @@ app.post('/api/predict-file', verifyToken, upload.single('file'), async (req, re
     );
 
     if (flaskResponse.status >= 400) {
+      flaskResponse.data.resume();
       return res.status(flaskResponse.status).json({
         success: false,
         message: 'Error dari Flask ML service',
@@ -552,16 +656,9 @@ app.post('/api/predict-file', verifyToken, upload.single('file'), async (req, re
 
     let responseData;
     try {
-      let cleanedData = flaskResponse.data;
-      cleanedData = cleanedData.replace(/^\uFEFF/, '').trim();
-      cleanedData = cleanedData.replace(/:\s*NaN\s*([,}])/g, ': null$1');
-      cleanedData = cleanedData.replace(/:\s*Infinity\s*([,}])/g, ': null$1');
-      cleanedData = cleanedData.replace(/:\s*-Infinity\s*([,}])/g, ': null$1');
-      
-      responseData = JSON.parse(cleanedData);
-      responseData = sanitizeJsonData(responseData);
+      responseData = await readPredictionStream(flaskResponse.data, MAX_DISPLAYED_ROWS);
     } catch (parseError) {
-      console.error('JSON parse error:', parseError);
+      console.error('NDJSON parse error:', parseError);
       return res.status(500).json({
         success: false,
         message: 'Response dari Flask ML service mengandung data tidak valid (NaN values)',
@@ -579,13 +676,11 @@ app.post('/api/predict-file', verifyToken, upload.single('file'), async (req, re
       });
     }
 
-    let optimizedResults = responseData.results;
-    let isLimited = false;
+    const optimizedResults = responseData.results;
+    const isLimited = Number(responseData.processed_rows || 0) > optimizedResults.length;
     
-    if (responseData.results && responseData.results.length > 10000) {
-      optimizedResults = responseData.results.slice(0, 10000);
-      isLimited = true;
-      responseData.message = `${responseData.message} (Menampilkan 10,000 baris pertama dari ${responseData.processed_rows} total baris)`;
+    if (isLimited) {
+      responseData.message = `${responseData.message} (Menampilkan ${MAX_DISPLAYED_ROWS.toLocaleString('en-US')} baris pertama dari ${responseData.processed_rows} total baris)`;
     }
 
     const finalResponse = {
@@ -596,31 +691,13 @@ app.post('/api/predict-file', verifyToken, upload.single('file'), async (req, re
       valid_rows: Number(responseData.valid_rows || 0),
       displayed_rows: optimizedResults ? optimizedResults.length : 0,
       is_limited: isLimited,
+      deduplicated: Boolean(responseData.deduplicated),
       user_id: req.userId,
       processing_time: `${Math.round(timeoutDuration/60000)} minutes timeout`,
       results: Array.isArray(optimizedResults) ? optimizedResults : []
     };
 
-    // Simpan ke database
-    try {
-      await db.query(`
-        INSERT INTO excel_inputs (
-          user_id, original_filename, file_size_bytes, total_rows, 
-          valid_rows, processed_rows, status, created_at, processed_at
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, NOW(), NOW())
-      `, [
-        req.userId,
-        req.file.originalname,
-        req.file.size,
-        finalResponse.total_rows,
-        finalResponse.valid_rows,
-        finalResponse.processed_rows,
-        'success'
-      ]);
-    } catch (dbError) {
-      console.log('Database insert error:', dbError.message);
-    }
-
+    // Upload dicatat di excel_inputs oleh Flask ML service (beserta file_hash untuk deduplikasi)
     res.json(finalResponse);
   } catch (error) {
     console.error('❌ Error /api/predict-file:', error.message);
@@ -660,6 +737,99 @@ app.post('/api/predict-file', verifyToken, upload.single('file'), async (req, re
   }
 });
 
+// Endpoint job asinkron: submit file dan langsung dapat job_id
+app.post('/api/predict-file/jobs', verifyToken, upload.single('file'), async (req, res) => {
+  let tempFilePath = null;
+  try {
+    if (!req.file) {
+      return res.status(400).json({ success: false, message: 'File tidak ditemukan dalam request' });
+    }
+
+    tempFilePath = req.file.path;
+
+    if (req.file.size === 0) {
+      return res.status(400).json({ success: false, message: 'File kosong atau tidak valid' });
+    }
+
+    const formData = new FormData();
+    formData.append('file', fs.createReadStream(req.file.path), {
+      filename: req.file.originalname,
+      contentType: req.file.mimetype
+    });
+    formData.append('userId', req.userId.toString());
+
+    const flaskResponse = await axios.post(
+      `${FLASK_ML_URL}/predict-file/jobs`,
+      formData,
+      {
+        headers: formData.getHeaders(),
+        maxContentLength: 1000 * 1024 * 1024,
+        maxBodyLength: 1000 * 1024 * 1024,
+        timeout: 600000,
+        validateStatus: status => status < 600
+      }
+    );
+
+    res.status(flaskResponse.status).json(flaskResponse.data);
+  } catch (error) {
+    console.error('❌ Error /api/predict-file/jobs:', error.message);
+    if (error.code === 'ECONNREFUSED') {
+      res.status(503).json({ success: false, message: 'Flask ML service tidak tersedia' });
+    } else {
+      res.status(500).json({ success: false, message: error.message });
+    }
+  } finally {
+    if (tempFilePath && fs.existsSync(tempFilePath)) {
+      try {
+        fs.unlinkSync(tempFilePath);
+      } catch (cleanupError) {
+        console.log('File cleanup error:', cleanupError.message);
+      }
+    }
+  }
+});
+
+// Status dan progress job
+app.get('/api/predict-file/jobs/:jobId', verifyToken, async (req, res) => {
+  try {
+    const flaskResponse = await axios.get(
+      `${FLASK_ML_URL}/predict-file/jobs/${encodeURIComponent(req.params.jobId)}`,
+      { params: { userId: req.userId }, timeout: 30000, validateStatus: status => status < 600 }
+    );
+    res.status(flaskResponse.status).json(flaskResponse.data);
+  } catch (error) {
+    console.error('❌ Error /api/predict-file/jobs/:jobId:', error.message);
+    res.status(503).json({ success: false, message: 'Flask ML service tidak tersedia' });
+  }
+});
+
+// Hasil job yang sudah selesai: dibatasi MAX_DISPLAYED_ROWS oleh Flask dan diteruskan
+// sebagai stream (hasil tidak di-parse di Node)
+app.get('/api/predict-file/jobs/:jobId/results', verifyToken, async (req, res) => {
+  try {
+    const flaskResponse = await axios.get(
+      `${FLASK_ML_URL}/predict-file/jobs/${encodeURIComponent(req.params.jobId)}/results`,
+      {
+        params: { userId: req.userId, limit: MAX_DISPLAYED_ROWS },
+        timeout: 600000,
+        responseType: 'stream',
+        validateStatus: status => status < 600
+      }
+    );
+
+    res.status(flaskResponse.status);
+    res.type(flaskResponse.headers['content-type'] || 'application/json');
+    flaskResponse.data.on('error', streamError => {
+      console.error('❌ Error streaming job results:', streamError.message);
+      res.destroy(streamError);
+    });
+    flaskResponse.data.pipe(res);
+  } catch (error) {
+    console.error('❌ Error /api/predict-file/jobs/:jobId/results:', error.message);
+    res.status(503).json({ success: false, message: 'Flask ML service tidak tersedia' });
+  }
+});
+
 // ✅ ERROR HANDLING MIDDLEWARE YANG DIPERBAIKI
 app.use((error, req, res, next) => {
   console.error('❌ Global error handler:', error);
@@ -731,8 +901,13 @@ const server = app.listen(PORT, '0.0.0.0', () => {
   console.log(`   - GET  /api/health (detailed health)`);
   console.log(`   - POST /api/predict (manual predict)`);
   console.log(`   - POST /api/predict-file (batch prediction)`);
+  console.log(`   - POST /api/predict-file/jobs (async batch prediction job)`);
+  console.log(`   - GET  /api/predict-file/jobs/:jobId (job status)`);
+  console.log(`   - GET  /api/predict-file/jobs/:jobId/results (job results)`);
   console.log(`   - GET  /api/predictions (history)`);
-  console.log(`   - DELETE /api/predictions/all (delete all)`);
+  console.log(`   - GET  /api/predictions/analytics (history analytics)`);
+  console.log(`   - DELETE /api/predictions/all (delete all, background job)`);
+  console.log(`   - GET  /api/predictions/delete-jobs/:jobId (delete job status)`);
   console.log(`   - DELETE /api/prediction/:id (delete one)`);
   console.log(`   - GET  /api/ml-health (ML service health)`);
 });
@@ -13,6 +13,8 @@ const History = () => {
   const [mounted, setMounted] = useState(false);
   const [deleteLoading, setDeleteLoading] = useState({});
   const [showDeleteAllModal, setShowDeleteAllModal] = useState(false);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
 
   // State untuk modal sukses
   const [showSuccessAlert, setShowSuccessAlert] = useState(false);
@@ -73,11 +75,18 @@ const History = () => {
     }
   }, [authStatus, router]);
 
-  const fetchHistoryData = async (token) => {
+  const fetchHistoryData = async (token, cursor = null) => {
+    const loadingMore = Boolean(cursor);
     try {
       setError(null);
-      setIsLoading(true);
-      const response = await fetch('http://localhost:5000/api/predictions?limit=20', {
+      if (loadingMore) {
+        setIsLoadingMore(true);
+      } else {
+        setIsLoading(true);
+      }
+      // archived=1: setelah data aktif habis, Load More melanjutkan ke prediksi yang sudah diarsipkan
+      const query = cursor ? `limit=20&archived=1&cursor=${encodeURIComponent(cursor)}` : 'limit=20&archived=1';
+      const response = await fetch(`http://localhost:5000/api/predictions?${query}`, {
         method: 'GET',
         headers: {
           'x-access-token': token,
@@ -89,9 +98,11 @@ const History = () => {
       if (response.ok) {
         const result = await response.json();
         if (result.success && result.data) {
-          setHistoryData(result.data);
-        } else {
+          setHistoryData(prev => (loadingMore ? [...prev, ...result.data] : result.data));
+          setNextCursor(result.pagination?.next_cursor || null);
+        } else if (!loadingMore) {
           setHistoryData([]);
+          setNextCursor(null);
         }
       } else {
         let errorMessage = 'Failed to fetch history data';
@@ -116,6 +127,14 @@ const History = () => {
       }
     } finally {
       setIsLoading(false);
+      setIsLoadingMore(false);
+    }
+  };
+
+  const handleLoadMore = async () => {
+    const token = localStorage.getItem('auth_token');
+    if (token && nextCursor) {
+      await fetchHistoryData(token, nextCursor);
     }
   };
 
@@ -150,9 +169,23 @@ const History = () => {
           'Content-Type': 'application/json'
         }
       });
-      const result = await response.json();
+      let result = await response.json();
+
+      // Penghapusan berjalan sebagai job di server: polling status sampai selesai
+      while (result.success && result.job_id && (result.status === 'queued' || result.status === 'running')) {
+        await new Promise(resolve => setTimeout(resolve, 1000));
+        const statusResponse = await fetch(`http://localhost:5000/api/predictions/delete-jobs/${result.job_id}`, {
+          headers: {
+            'x-access-token': token,
+            'Content-Type': 'application/json'
+          }
+        });
+        result = await statusResponse.json();
+      }
+
       if (result.success) {
         setHistoryData([]);
+        setNextCursor(null);
         setShowDeleteAllModal(false);
         setSuccessAlertMessage(`Successfully deleted ${result.deleted_count} predictions. Prediction numbers have been reset.`);
         setShowSuccessAlert(true);
@@ -509,6 +542,17 @@ const History = () => {
                 </div>
               );
             })}
+            {nextCursor && (
+              <div className="text-center">
+                <button
+                  onClick={handleLoadMore}
+                  disabled={isLoadingMore}
+                  className="px-6 py-3 bg-blue-500 text-white rounded-lg hover:bg-blue-600 cursor-pointer transition-colors disabled:opacity-50 disabled:cursor-not-allowed"
+                >
+                  {isLoadingMore ? 'Loading...' : 'Load More'}
+                </button>
+              </div>
+            )}
           </div>
         )}
 